@@ -4,6 +4,9 @@ from __future__ import annotations
 from datetime import timedelta
 from pathlib import Path
 import os
+import tempfile
+
+from corsheaders.defaults import default_headers
 
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -33,6 +36,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.RequestMetricsMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -63,16 +67,80 @@ TEMPLATES = [
 WSGI_APPLICATION = "config.wsgi.application"
 ASGI_APPLICATION = "config.asgi.application"
 
-DATABASES = {
-    "default": {
+POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
+# One psycopg connection pool per database alias and worker process (needs
+# psycopg[pool]).  POSTGRES_POOL=false falls back to persistent per-thread
+# connections, e.g. behind PgBouncer in transaction mode.
+POSTGRES_POOL = os.getenv("POSTGRES_POOL", "true").lower() == "true"
+
+
+def postgres_database(host: str, port: str) -> dict:
+    database = {
         "ENGINE": "django.db.backends.postgresql",
         "NAME": os.getenv("POSTGRES_DB", "medical_records"),
         "USER": os.getenv("POSTGRES_USER", "postgres"),
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", "PostGreSQL"),
-        "HOST": os.getenv("POSTGRES_HOST", "localhost"),
-        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+        "HOST": host,
+        "PORT": port,
+    }
+    if POSTGRES_POOL:
+        from psycopg_pool import ConnectionPool
+
+        database["OPTIONS"] = {
+            "pool": {
+                "min_size": int(os.getenv("POSTGRES_POOL_MIN_SIZE", "2")),
+                # Keep max_size * workers * aliases under the server's max_connections.
+                "max_size": int(os.getenv("POSTGRES_POOL_MAX_SIZE", "10")),
+                "timeout": float(os.getenv("POSTGRES_POOL_TIMEOUT", "10")),
+                "max_idle": float(os.getenv("POSTGRES_POOL_MAX_IDLE", "300")),
+                "max_lifetime": float(os.getenv("POSTGRES_POOL_MAX_LIFETIME", "3600")),
+                # Ping each connection as it is handed out, so connections killed by a
+                # failover or server restart are replaced instead of failing a request.
+                "check": ConnectionPool.check_connection,
+            }
+        }
+    else:
+        database["CONN_MAX_AGE"] = int(os.getenv("POSTGRES_CONN_MAX_AGE", "60"))
+        database["CONN_HEALTH_CHECKS"] = True
+    return database
+
+
+DATABASES = {"default": postgres_database(os.getenv("POSTGRES_HOST", "localhost"), POSTGRES_PORT)}
+
+# Read replicas ("host[:port]", comma-separated; same database name and
+# credentials as the primary) serving safe-method requests on the record
+# viewsets, see core.replicas.  Pointing one at the primary's own host gives a
+# second alias for trying the routing locally.  Keep DELTA_SYNC_LAG above the
+# replication lag, or delta feeds served by a replica can skip rows.
+REPLICA_HOSTS = [host.strip() for host in os.getenv("POSTGRES_REPLICA_HOSTS", "").split(",") if host.strip()]
+DATABASE_REPLICAS: list[str] = []
+for index, replica in enumerate(REPLICA_HOSTS, 1):
+    replica_host, _, replica_port = replica.partition(":")
+    DATABASES[f"replica{index}"] = {
+        **postgres_database(replica_host, replica_port or POSTGRES_PORT),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(f"replica{index}")
+DATABASE_ROUTERS = ["core.replicas.ReplicaRouter"]
+# How long a user's reads stay on the primary after they write.
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+# Shared across workers when REDIS_URL is set (needs the ``redis`` package);
+# otherwise each worker keeps its own in-memory cache.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "medical-records",
+        }
     }
-}
 
 AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator"},
@@ -92,6 +160,26 @@ STATIC_ROOT = BASE_DIR / "static"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Attachment uploads stream into partial files, kept on the same filesystem as
+# MEDIA_ROOT so completing one is a rename rather than a copy.
+ATTACHMENT_MAX_BYTES = int(os.getenv("ATTACHMENT_MAX_BYTES", str(4 * 1024**3)))
+ATTACHMENT_PARTIAL_DIR = Path(os.getenv("ATTACHMENT_PARTIAL_DIR", MEDIA_ROOT / "partial"))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+# Patient imports insert this many rows per transaction and report at most
+# PATIENT_IMPORT_ERROR_LIMIT rejected lines in the response.
+PATIENT_IMPORT_BATCH_SIZE = int(os.getenv("PATIENT_IMPORT_BATCH_SIZE", "2000"))
+PATIENT_IMPORT_ERROR_LIMIT = int(os.getenv("PATIENT_IMPORT_ERROR_LIMIT", "100"))
+# Patients read (and their related rows prefetched) per round trip by the
+# streaming export; memory use grows with this, not with the export's size.
+PATIENT_EXPORT_CHUNK_SIZE = int(os.getenv("PATIENT_EXPORT_CHUNK_SIZE", "500"))
+# Widest window one GET /api/appointments/slots/ may search.
+APPOINTMENT_SLOT_SEARCH_MAX_DAYS = int(os.getenv("APPOINTMENT_SLOT_SEARCH_MAX_DAYS", "31"))
+# Downloads are access-checked by the app and the bytes handed to the front proxy:
+# "x-accel-redirect" (nginx internal location at ATTACHMENT_ACCEL_PREFIX aliased to
+# MEDIA_ROOT) or "x-sendfile" (Apache/lighttpd). Empty streams from the worker.
+ATTACHMENT_SENDFILE = os.getenv("ATTACHMENT_SENDFILE", "").lower()
+ATTACHMENT_ACCEL_PREFIX = os.getenv("ATTACHMENT_ACCEL_PREFIX", "/protected-media/")
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 AUTH_USER_MODEL = "core.User"
@@ -103,13 +191,28 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Let the browser client read validators, send write preconditions and chunk uploads.
+CORS_EXPOSE_HEADERS = ["ETag", "Last-Modified", "X-Sync-Cursor", "Content-Range", "Content-Disposition"]
+CORS_ALLOW_HEADERS = (*default_headers, "if-match", "if-unmodified-since", "content-range", "range", "if-range")
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "core.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "core.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "core.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
+    "DEFAULT_PAGINATION_CLASS": "core.pagination.KeysetCursorPagination",
+    "PAGE_SIZE": int(os.getenv("API_PAGE_SIZE", "50")),
 }
 
 SIMPLE_JWT = {
@@ -117,13 +220,65 @@ SIMPLE_JWT = {
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "BLACKLIST_AFTER_ROTATION": True,
     "ROTATE_REFRESH_TOKENS": False,
+    "TOKEN_REFRESH_SERIALIZER": "core.tokens.CachedBlacklistTokenRefreshSerializer",
 }
 
+# Refresh-token blacklist checks read a per-worker set that catches up with new
+# blacklist rows at most this often (0 = on every check) and fully reloads periodically.
+TOKEN_BLACKLIST_SYNC_INTERVAL = float(os.getenv("TOKEN_BLACKLIST_SYNC_INTERVAL", "1"))
+TOKEN_BLACKLIST_RELOAD_INTERVAL = float(os.getenv("TOKEN_BLACKLIST_RELOAD_INTERVAL", "600"))
+# Each catch-up re-reads rows blacklisted this many seconds before the previous
+# one, for logouts still committing then; keep it above the longest write and
+# the clock skew between workers.
+TOKEN_BLACKLIST_SYNC_LAG = float(os.getenv("TOKEN_BLACKLIST_SYNC_LAG", "30"))
+
+# Warm JWT requests resolve the user and role profile from an in-process LRU.
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "10000"))
+AUTH_USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "60"))
+
+# Per-user dashboard payloads; writes to the underlying models bump a version key
+# so a stale payload is never served past the next write.
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+
+# Rendered GET responses of read-mostly endpoints (doctor roster, admin user
+# list), per worker and in the Django cache; writes make them unreachable at once.
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", "300"))
+RESPONSE_CACHE_LOCAL_SIZE = int(os.getenv("RESPONSE_CACHE_LOCAL_SIZE", "512"))
+
+# ``?updated_since=`` feeds stop this many seconds short of now so rows from
+# transactions still committing are not skipped; keep it above the longest write.
+DELTA_SYNC_LAG = float(os.getenv("DELTA_SYNC_LAG", "5"))
+# Cursors older than this get 410 Gone (prune_tombstones deletes older tombstones).
+TOMBSTONE_RETENTION_DAYS = int(os.getenv("TOMBSTONE_RETENTION_DAYS", "30"))
+
+# Serve record list/detail GETs from async views (core.async_views).  Set by
+# config/asgi.py; under WSGI every async view would need its own event loop.
+ASYNC_READ_VIEWS = os.getenv("ASYNC_READ_VIEWS", "false").lower() == "true"
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
 SESSION_COOKIE_SECURE = not DEBUG
 CSRF_COOKIE_SECURE = not DEBUG
 SECURE_SSL_REDIRECT = False
 
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+# One snapshot file per worker; the metrics endpoint sums them.
+METRICS_DIR = Path(os.getenv("METRICS_DIR", Path(tempfile.gettempdir()) / "medical-records-metrics"))
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Background jobs (manage.py run_jobs).  A failed attempt is retried after
+# JOB_RETRY_BACKOFF_SECONDS, doubling up to the max.  A running job's worker
+# refreshes its heartbeat every JOB_HEARTBEAT_SECONDS; a RUNNING job with no
+# heartbeat for JOB_TIMEOUT_SECONDS is taken to have lost its worker and is
+# queued again.
+JOB_WORKER_THREADS = int(os.getenv("JOB_WORKER_THREADS", "4"))
+JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", "1"))
+JOB_POLL_INTERVAL_SECONDS = float(os.getenv("JOB_POLL_INTERVAL_SECONDS", "1"))
+JOB_RETRY_BACKOFF_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_SECONDS", "10"))
+JOB_RETRY_BACKOFF_MAX_SECONDS = float(os.getenv("JOB_RETRY_BACKOFF_MAX_SECONDS", "3600"))
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "30"))
+JOB_TIMEOUT_SECONDS = float(os.getenv("JOB_TIMEOUT_SECONDS", "900"))
+JOB_RETENTION_DAYS = int(os.getenv("JOB_RETENTION_DAYS", "7"))
+
 LOGGING = {
     "version": 1,
     "disable_existing_loggers": False,
@@ -0,0 +1,174 @@
+"""Maintenance of the denormalized ``CaseAccess`` table."""
+from __future__ import annotations
+
+from typing import Iterable
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Case, CaseAccess, Patient, Prescription
+from .sync import record_revocations
+
+Reason = CaseAccess.Reason
+
+
+def doctor_case_ids(doctor, reason: str | None = None):
+    """Subquery of case ids visible to ``doctor``, for ``id__in`` semi-joins."""
+
+    access = CaseAccess.objects.filter(doctor=doctor)
+    if reason is not None:
+        access = access.filter(reason=reason)
+    return access.values("case_id")
+
+
+def doctor_prescription_ids(doctor):
+    """Subquery of prescription ids visible to ``doctor``: theirs, UNION ALL those on cases assigned to them.
+
+    Each branch is an index search (the prescriber index, then the CaseAccess
+    semi-join), rather than an OR across two tables for the planner to combine.
+    Ids in both branches are harmless under ``id__in``, so no de-duplication.
+    """
+
+    prescribed = Prescription.objects.filter(doctor=doctor).order_by().values("id")
+    assigned = Prescription.objects.filter(case_id__in=doctor_case_ids(doctor, Reason.ASSIGNED)).order_by().values("id")
+    return prescribed.union(assigned, all=True)
+
+
+def grant_assigned(pairs: Iterable[tuple[int, int]]) -> None:
+    """Record ``(case_id, doctor_id)`` assignments; existing rows are left alone."""
+
+    pairs = list(pairs)
+    CaseAccess.objects.bulk_create(
+        [CaseAccess(case_id=case_id, doctor_id=doctor_id, reason=Reason.ASSIGNED) for case_id, doctor_id in pairs],
+        ignore_conflicts=True,
+    )
+    # Assigned doctors also see the case's prescriptions; bump them so delta
+    # feeds hand them to the new doctor.
+    Prescription.objects.filter(case_id__in={case_id for case_id, _doctor_id in pairs}).update(updated_at=timezone.now())
+
+
+def revoke_assigned(case_ids: Iterable[int] | None = None, doctor_ids: Iterable[int] | None = None) -> None:
+    access = CaseAccess.objects.filter(reason=Reason.ASSIGNED)
+    if case_ids is not None:
+        access = access.filter(case_id__in=list(case_ids))
+    if doctor_ids is not None:
+        access = access.filter(doctor_id__in=list(doctor_ids))
+    removed = list(access.values_list("doctor_id", "case_id"))
+    access.delete()
+    if not removed:
+        return
+    revoke_lost_cases(removed)
+    # Prescriptions reached through the assignment go too, except the doctor's own.
+    lost_cases: dict[int, set[int]] = {}
+    for doctor_id, case_id in removed:
+        lost_cases.setdefault(case_id, set()).add(doctor_id)
+    record_revocations(
+        "prescription",
+        (
+            (doctor_id, prescription_id)
+            for prescription_id, case_id, author_id in Prescription.objects.filter(case_id__in=lost_cases).values_list(
+                "id", "case_id", "doctor_id"
+            )
+            for doctor_id in lost_cases[case_id]
+            if doctor_id != author_id
+        ),
+    )
+
+
+def revoke_lost_cases(pairs: list[tuple[int, int]]) -> None:
+    """Tombstone ``(doctor_id, case_id)`` pairs left without any access row."""
+
+    remaining = set(
+        CaseAccess.objects.filter(
+            doctor_id__in={doctor_id for doctor_id, _case_id in pairs},
+            case_id__in={case_id for _doctor_id, case_id in pairs},
+        ).values_list("doctor_id", "case_id")
+    )
+    record_revocations("case", (pair for pair in pairs if pair not in remaining))
+
+
+def sync_case_attending(case: Case) -> None:
+    """Point the case's ATTENDING row at its patient's current attending doctor."""
+
+    doctor_id = Patient.objects.filter(pk=case.patient_id).values_list("attending_doctor_id", flat=True).first()
+    stale = CaseAccess.objects.filter(case=case, reason=Reason.ATTENDING).exclude(doctor_id=doctor_id)
+    previous = list(stale.values_list("doctor_id", "case_id"))
+    stale.delete()
+    if doctor_id is not None:
+        CaseAccess.objects.bulk_create(
+            [CaseAccess(case=case, doctor_id=doctor_id, reason=Reason.ATTENDING)], ignore_conflicts=True
+        )
+    if previous:
+        revoke_lost_cases(previous)
+
+
+def sync_patient_attending(patient: Patient, previous_doctor_id: int | None) -> None:
+    """Move every ATTENDING row of the patient's cases to the current attending doctor.
+
+    The cases are touched as well, since the new doctor must receive them
+    through delta sync and their list ETags change.
+    """
+
+    moved = list(
+        CaseAccess.objects.filter(reason=Reason.ATTENDING, case__patient=patient)
+        .exclude(doctor_id=patient.attending_doctor_id)
+        .values_list("doctor_id", "case_id")
+    )
+    CaseAccess.objects.filter(reason=Reason.ATTENDING, case__patient=patient).exclude(
+        doctor_id=patient.attending_doctor_id
+    ).update(doctor_id=patient.attending_doctor_id)
+    Case.objects.filter(patient=patient).update(updated_at=timezone.now())
+    if moved:
+        revoke_lost_cases(moved)
+    if previous_doctor_id is not None:
+        record_revocations("patient", [(previous_doctor_id, patient.pk)])
+
+
+def expected_rows(case_ids: list[int]) -> set[tuple[int, int, str]]:
+    """``(doctor_id, case_id, reason)`` rows the given cases should have."""
+
+    through = Case.assigned_doctors.through
+    rows = {
+        (doctor_id, case_id, Reason.ASSIGNED.value)
+        for case_id, doctor_id in through.objects.filter(case_id__in=case_ids).values_list("case_id", "doctor_id")
+    }
+    rows.update(
+        (doctor_id, case_id, Reason.ATTENDING.value)
+        for case_id, doctor_id in Case.objects.filter(id__in=case_ids).values_list("id", "patient__attending_doctor_id")
+    )
+    return rows
+
+
+def rebuild(batch_size: int = 5000, apply: bool = True) -> tuple[int, int]:
+    """Reconcile ``CaseAccess`` with its sources, walking cases in id batches.
+
+    Returns ``(missing, stale)`` row counts; with ``apply=False`` nothing is
+    written, which makes it usable as a consistency check.
+    """
+
+    missing_total = stale_total = 0
+    last_id = 0
+    while True:
+        case_ids = list(Case.objects.filter(id__gt=last_id).order_by("id").values_list("id", flat=True)[:batch_size])
+        if not case_ids:
+            break
+        last_id = case_ids[-1]
+        with transaction.atomic():
+            expected = expected_rows(case_ids)
+            actual = {
+                (doctor_id, case_id, reason): row_id
+                for row_id, doctor_id, case_id, reason in CaseAccess.objects.filter(case_id__in=case_ids).values_list(
+                    "id", "doctor_id", "case_id", "reason"
+                )
+            }
+            missing = expected.difference(actual)
+            stale = [row_id for key, row_id in actual.items() if key not in expected]
+            if apply:
+                CaseAccess.objects.filter(id__in=stale).delete()
+                CaseAccess.objects.bulk_create(
+                    [CaseAccess(doctor_id=doctor_id, case_id=case_id, reason=reason) for doctor_id, case_id, reason in missing],
+                    ignore_conflicts=True,
+                )
+        missing_total += len(missing)
+        stale_total += len(stale)
+    return missing_total, stale_total
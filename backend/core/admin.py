@@ -16,6 +16,12 @@ class DoctorAdmin(admin.ModelAdmin):
     search_fields = ("user__username", "license_number")
 
 
+@admin.register(models.DoctorSchedule)
+class DoctorScheduleAdmin(admin.ModelAdmin):
+    list_display = ("doctor", "weekday", "starts_at", "ends_at", "slot_minutes")
+    list_filter = ("weekday",)
+
+
 @admin.register(models.Receptionist)
 class ReceptionistAdmin(admin.ModelAdmin):
     list_display = ("user", "desk_number")
@@ -39,11 +45,13 @@ class PatientAdmin(admin.ModelAdmin):
 class CaseAttachmentInline(admin.TabularInline):
     model = models.CaseAttachment
     extra = 0
+    readonly_fields = ("blob",)
 
 
 class PrescriptionAttachmentInline(admin.TabularInline):
     model = models.PrescriptionAttachment
     extra = 0
+    readonly_fields = ("blob",)
 
 
 @admin.register(models.Case)
@@ -83,8 +91,16 @@ class AppointmentAdmin(admin.ModelAdmin):
         "case",
         "doctor",
         "status",
+        "scheduled_at",
+        "duration_minutes",
         "created_at",
     )
     list_filter = ("status", "doctor", "created_at")
     search_fields = ("appointment_number", "patient__last_name", "patient__first_name")
 
+
+@admin.register(models.Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "run_at", "finished_at")
+    list_filter = ("status", "name")
+    readonly_fields = ("started_at", "heartbeat_at", "finished_at", "locked_by", "last_error", "created_at")
@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "core"
+
+    def ready(self) -> None:
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+
+        from . import jobs, metrics, signals, tasks  # noqa: F401
+
+        connection_created.connect(metrics.install_query_timer)
+        metrics.registry.register_collector(jobs.prometheus_lines)
+        # Connections opened before the app registry was ready.
+        for connection in connections.all(initialized_only=True):
+            metrics.install_query_timer(None, connection)
@@ -0,0 +1,170 @@
+"""Async GET path for the record list and detail routes, served under ASGI.
+
+DRF views are synchronous, so under ASGI every request would otherwise run in
+a worker thread for its whole duration.  ``AsyncReadView`` answers GET/HEAD on
+the event loop instead. It reuses the viewset for everything but I/O:
+- ``get_queryset`` role scoping;
+- sparse fieldsets;
+- serializers;
+- keyset pagination;
+- ETag validators;
+- delta sync.
+
+Only the database calls are awaited.  Writes still go to the sync viewset.
+"""
+from __future__ import annotations
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+from .conditional import ConditionalGetMixin
+from .replicas import ReplicaReadMixin, achoose, read_alias
+from .response_cache import ResponseCacheMixin
+from .sync import SYNC_HEADER, SYNC_PARAM, DeltaSyncMixin, decode_cursor, initial_cursor
+
+LIST_ACTIONS = {"get": "list", "post": "create"}
+DETAIL_ACTIONS = {"get": "retrieve", "put": "update", "patch": "partial_update", "delete": "destroy"}
+
+
+async def authenticate(view, request) -> None:
+    """``Request._authenticate`` with ``aauthenticate`` where the authenticator has one."""
+
+    for authenticator in view.get_authenticators():
+        aauthenticate = getattr(authenticator, "aauthenticate", None)
+        try:
+            if aauthenticate is not None:
+                result = await aauthenticate(request)
+            else:
+                result = await sync_to_async(authenticator.authenticate)(request)
+        except APIException:
+            request._not_authenticated()
+            raise
+        if result is not None:
+            request._authenticator = authenticator
+            request.user, request.auth = result
+            return
+    request._not_authenticated()
+
+
+async def alist(view, request) -> Response:
+    cursor = None
+    if isinstance(view, DeltaSyncMixin):
+        raw = request.query_params.get(SYNC_PARAM)
+        if raw is not None:
+            return await view.adelta(request, decode_cursor(raw))
+        # Taken before the list query, as in DeltaSyncMixin.list.
+        cursor = initial_cursor()
+
+    validators = None
+    response = None
+    if isinstance(view, ConditionalGetMixin):
+        validators = await view.alist_validators()
+        response = view.precondition_response(validators)
+    if response is None:
+        queryset, represent = view.list_rows()
+        page = await view.paginator.apaginate_queryset(queryset, request, view=view) if view.paginator else None
+        if page is not None:
+            response = view.get_paginated_response(await sync_to_async(represent)(page))
+        else:
+            rows = [row async for row in queryset.aiterator(chunk_size=2000)]
+            response = Response(await sync_to_async(represent)(rows))
+    if validators is not None:
+        response = view.with_validators(response, validators)
+    if cursor is not None:
+        response[SYNC_HEADER] = cursor
+    return response
+
+
+async def aretrieve(view, request) -> Response:
+    validators = None
+    if isinstance(view, ConditionalGetMixin):
+        validators = await view.aobject_validators()
+        response = view.precondition_response(validators) if validators else None
+        if response is not None:
+            return view.with_validators(response, validators)
+
+    lookup_url_kwarg = view.lookup_url_kwarg or view.lookup_field
+    queryset = view.filter_queryset(view.get_queryset())
+    try:
+        instance = await queryset.aget(**{view.lookup_field: view.kwargs[lookup_url_kwarg]})
+    except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+        # The message ``get_object_or_404`` gives the sync view.
+        raise Http404(f"No {queryset.model._meta.object_name} matches the given query.")
+    view.check_object_permissions(request, instance)
+    response = Response(view.get_serializer(instance).data)
+    return view.with_validators(response, validators) if validators is not None else response
+
+
+class AsyncReadView:
+    """GET/HEAD of one viewset route on the event loop; other methods go to the sync view."""
+
+    def __init__(self, viewset: type, detail: bool) -> None:
+        self.viewset = viewset
+        self.detail = detail
+        self.action = "retrieve" if detail else "list"
+        self.handler = aretrieve if detail else alist
+        self.actions = {
+            method: action
+            for method, action in (DETAIL_ACTIONS if detail else LIST_ACTIONS).items()
+            if hasattr(viewset, action)
+        }
+        self.sync_view = viewset.as_view(self.actions, detail=detail)
+
+    @classmethod
+    def as_view(cls, viewset: type, detail: bool = False):
+        route = cls(viewset, detail)
+
+        async def view(request, *args, **kwargs):
+            return await route.dispatch(request, *args, **kwargs)
+
+        # Read by the metrics middleware to label requests like the sync routes.
+        view.cls = viewset
+        view.actions = route.actions
+        return csrf_exempt(view)
+
+    async def dispatch(self, request, *args, **kwargs) -> HttpResponse:
+        if request.method not in {"GET", "HEAD"}:
+            return await sync_to_async(self.sync_view)(request, *args, **kwargs)
+
+        # The steps of APIView.dispatch/initial, with authentication and the
+        # handler awaited.
+        view = self.viewset(action_map={"get": self.action, "head": self.action}, detail=self.detail)
+        view.args, view.kwargs = args, kwargs
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request = drf_request
+        view.headers = view.default_response_headers
+        try:
+            await authenticate(view, drf_request)
+            view.format_kwarg = view.get_format_suffix(**kwargs)
+            drf_request.accepted_renderer, drf_request.accepted_media_type = view.perform_content_negotiation(drf_request)
+            drf_request.version, drf_request.versioning_scheme = view.determine_version(drf_request, *args, **kwargs)
+            view.check_permissions(drf_request)
+            view.check_throttles(drf_request)
+            alias = await achoose(drf_request) if isinstance(view, ReplicaReadMixin) else None
+            token = read_alias.set(alias) if alias is not None else None
+            try:
+                response = await self.respond(view, drf_request)
+            finally:
+                if token is not None:
+                    read_alias.reset(token)
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        response = view.finalize_response(drf_request, response, *args, **kwargs)
+        if not isinstance(response, Response):
+            return response
+        # Rendered here, since Django would otherwise hop to a thread to render
+        # a template-style response.
+        response.render()
+        return HttpResponse(response.content, status=response.status_code, headers=response.headers)
+
+    async def respond(self, view, request) -> HttpResponse:
+        if not isinstance(view, ResponseCacheMixin):
+            return await self.handler(view, request)
+        response = await sync_to_async(view.cached_response)(request)
+        if response is None:
+            response = await sync_to_async(view.remember_response)(request, await self.handler(view, request))
+        return response
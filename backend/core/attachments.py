@@ -0,0 +1,271 @@
+"""Resumable attachment uploads and access-checked, range-aware downloads."""
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+import re
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.files import File
+from django.db import transaction
+from django.http import FileResponse, HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe, quote_etag
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from . import blobs
+from .models import CaseAttachment, PrescriptionAttachment, UploadSession
+
+BLOCK_SIZE = 1024 * 1024
+CONTENT_RANGE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+BYTE_RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+MAX_RUNNING_DIGESTS = 256
+
+# SHA-256 of uploads whose chunks reached this worker in order, keyed by session
+# id with the offset hashed so far.  A chunk served by another worker breaks the
+# chain, and completion then re-reads the partial file instead.
+running_digests: OrderedDict = OrderedDict()
+
+
+class UploadConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "Chunk does not start at the session offset; resume from the current offset."
+    default_code = "upload_offset_mismatch"
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class ByteRange:
+    """``length`` bytes of an open file from ``start``, readable by ``FileResponse``."""
+
+    def __init__(self, handle, start: int, length: int) -> None:
+        handle.seek(start)
+        self.handle = handle
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        block = self.handle.read(size)
+        self.remaining -= len(block)
+        return block
+
+    def close(self) -> None:
+        self.handle.close()
+
+
+def chunk_bounds(request, session: UploadSession) -> tuple[int, int]:
+    """``(start, length)`` of the chunk in a PUT body, from ``Content-Range`` or the session offset."""
+
+    try:
+        length = int(request.META.get("CONTENT_LENGTH") or 0)
+    except ValueError:
+        raise ValidationError({"detail": "Invalid Content-Length."})
+    header = request.META.get("HTTP_CONTENT_RANGE")
+    if header is None:
+        start = session.received
+    else:
+        match = CONTENT_RANGE.match(header.strip())
+        if match is None:
+            raise ValidationError({"detail": "Content-Range must be 'bytes <start>-<end>/<size>'."})
+        start, end, total = (int(value) for value in match.groups())
+        if total != session.size or end < start or end - start + 1 != length:
+            raise ValidationError({"detail": "Content-Range does not match the body or the declared size."})
+    if start != session.received:
+        raise UploadConflict()
+    if length < 1 or start + length > session.size:
+        raise ValidationError({"detail": "Chunk is empty or runs past the declared size."})
+    return start, length
+
+
+def take_digest(session: UploadSession, offset: int):
+    """The running digest covering exactly ``offset`` bytes, removed so one writer owns it."""
+
+    entry = running_digests.pop(session.pk, None)
+    if entry is not None and entry[0] == offset:
+        return entry[1]
+    return hashlib.sha256() if offset == 0 else None
+
+
+def keep_digest(session: UploadSession, offset: int, digest) -> None:
+    running_digests[session.pk] = (offset, digest)
+    while len(running_digests) > MAX_RUNNING_DIGESTS:
+        running_digests.popitem(last=False)
+
+
+def write_chunk(session: UploadSession, stream, start: int, length: int) -> UploadSession:
+    """Stream ``length`` bytes from ``stream`` into the partial file at ``start``, hashing as they pass.
+
+    The session row stays locked while the chunk is written, so only one
+    request writes (and truncates) at a given offset; a concurrent PUT waits,
+    then finds the offset moved and is told to resume.  Whatever arrived
+    before a dropped connection is kept and counted, so the client resumes
+    from the last byte actually written.
+    """
+
+    path = session.partial_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    dropped = None
+    with transaction.atomic():
+        if not UploadSession.objects.select_for_update().filter(pk=session.pk, received=start).exists():
+            raise UploadConflict()
+        digest = take_digest(session, start)
+        written = 0
+        with open(path, "r+b" if path.exists() else "wb") as handle:
+            handle.seek(start)
+            try:
+                while written < length:
+                    block = stream.read(min(BLOCK_SIZE, length - written))
+                    if not block:
+                        break
+                    handle.write(block)
+                    if digest is not None:
+                        digest.update(block)
+                    written += len(block)
+            except Exception as exc:
+                # Raised once the bytes that did arrive are recorded.
+                dropped = exc
+            # Drop leftovers of an earlier attempt that wrote past what it recorded.
+            handle.truncate(start + written)
+        UploadSession.objects.filter(pk=session.pk).update(received=start + written, updated_at=timezone.now())
+        if digest is not None:
+            transaction.on_commit(lambda: keep_digest(session, start + written, digest))
+    if dropped is not None:
+        raise dropped
+    session.received = start + written
+    return session
+
+
+def complete_upload(session: UploadSession) -> CaseAttachment | PrescriptionAttachment:
+    """Store the finished partial file as a blob and create the attachment referencing it."""
+
+    digest = take_digest(session, session.size)
+    with open(session.partial_path, "rb") as handle:
+        sha256 = digest.hexdigest() if digest is not None else blobs.sha256_of(handle)
+        if session.case_id is not None:
+            attachment = CaseAttachment(case_id=session.case_id)
+        else:
+            attachment = PrescriptionAttachment(prescription_id=session.prescription_id)
+        attachment.label = session.label
+        attachment.filename = session.filename
+        attachment.size = session.size
+        attachment.content_type = session.content_type or mimetypes.guess_type(session.filename)[0] or ""
+        with transaction.atomic():
+            if not UploadSession.objects.select_for_update().filter(pk=session.pk, received=session.size).exists():
+                raise UploadConflict("Upload session was already completed or cancelled.")
+            blob = blobs.acquire(sha256, session.size, File(handle), local_path=str(session.partial_path))
+            attachment.blob = blob
+            attachment.file.name = blob.name
+            attachment.save()
+            UploadSession.objects.filter(pk=session.pk).delete()
+            transaction.on_commit(lambda: session.partial_path.unlink(missing_ok=True))
+    return attachment
+
+
+def discard_upload(session: UploadSession) -> None:
+    session.partial_path.unlink(missing_ok=True)
+    session.delete()
+
+
+def requested_range(request, size: int, etag: str, last_modified: datetime) -> tuple[int, int] | None:
+    """The single ``(first, last)`` byte range asked for, or ``None`` to send the whole file.
+
+    Multi-range and malformed headers are ignored, as are ranges whose
+    ``If-Range`` validator no longer matches.
+    """
+
+    header = request.META.get("HTTP_RANGE")
+    if not header or size == 0:
+        return None
+    if_range = request.META.get("HTTP_IF_RANGE")
+    if if_range and if_range != etag and parse_http_date_safe(if_range) != int(last_modified.timestamp()):
+        return None
+    match = BYTE_RANGE.match(header.strip())
+    if match is None or match.groups() == ("", ""):
+        return None
+    first, last = match.groups()
+    if not first:
+        suffix = int(last)
+        if suffix == 0:
+            raise RangeNotSatisfiable()
+        return max(size - suffix, 0), size - 1
+    if last and int(last) < int(first):
+        return None
+    if int(first) >= size:
+        raise RangeNotSatisfiable()
+    return int(first), min(int(last), size - 1) if last else size - 1
+
+
+def download_filename(attachment: CaseAttachment | PrescriptionAttachment) -> str:
+    if attachment.filename:
+        return attachment.filename
+    # Rows predating content addressing are stored as "<uuid hex>_<original name>".
+    stored = Path(attachment.file.name).name
+    prefix, _, original = stored.partition("_")
+    return original if len(prefix) == 32 and original else stored
+
+
+def serve_attachment(request, attachment: CaseAttachment | PrescriptionAttachment) -> HttpResponse:
+    """Send an attachment the caller is already known to be allowed to read.
+
+    With ``ATTACHMENT_SENDFILE`` set the response only names the file and the
+    front proxy streams it (and answers Range requests itself); otherwise the
+    worker streams it, honouring a single-range ``Range`` header.
+    """
+
+    filename = download_filename(attachment)
+    content_type = attachment.content_type or mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    # Stored files never change, so the content hash (or, for rows predating
+    # content addressing, the row identity) is a strong validator.
+    if attachment.blob_id is not None:
+        etag = quote_etag(attachment.blob.sha256)
+    else:
+        etag = quote_etag(f"{attachment._meta.model_name}-{attachment.pk}-{attachment.size}")
+    last_modified = int(attachment.uploaded_at.timestamp())
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = attachment_body(request, attachment, content_type, etag)
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(last_modified)
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = content_disposition_header(True, filename)
+    response["Cache-Control"] = "private, no-transform"
+    return response
+
+
+def attachment_body(request, attachment, content_type: str, etag: str) -> HttpResponse:
+    mode = settings.ATTACHMENT_SENDFILE
+    if mode == "x-accel-redirect":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.ATTACHMENT_ACCEL_PREFIX + quote(attachment.file.name)
+        return response
+    if mode == "x-sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = attachment.file.path
+        return response
+
+    size = attachment.size or attachment.file.size
+    try:
+        byte_range = requested_range(request, size, etag, attachment.uploaded_at)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+    handle = attachment.file.storage.open(attachment.file.name, "rb")
+    if byte_range is None:
+        return FileResponse(handle, content_type=content_type)
+    first, last = byte_range
+    response = FileResponse(
+        ByteRange(handle, first, last - first + 1), status=status.HTTP_206_PARTIAL_CONTENT, content_type=content_type
+    )
+    response["Content-Range"] = f"bytes {first}-{last}/{size}"
+    response["Content-Length"] = str(last - first + 1)
+    return response
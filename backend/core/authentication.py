@@ -0,0 +1,167 @@
+"""JWT authentication backed by a bounded in-process user/profile cache."""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import Doctor, Receptionist, User
+
+# The password hash never needs to sit in worker memory; it stays deferred so an
+# accidental ``user.save()`` on a cached instance cannot blank it either.
+USER_FIELDS = [field.attname for field in User._meta.concrete_fields if field.attname != "password"]
+DOCTOR_FIELDS = [field.attname for field in Doctor._meta.concrete_fields]
+RECEPTIONIST_FIELDS = [field.attname for field in Receptionist._meta.concrete_fields]
+
+
+class UserCache:
+    """LRU of user rows plus their role profile, with a TTL per entry.
+
+    Entries hold plain field values; every hit builds fresh model instances so
+    request code can never mutate a shared object.  Local writes invalidate
+    entries through signals (see ``core.signals``); other workers converge
+    within ``AUTH_USER_CACHE_TTL`` seconds.
+    """
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[float, tuple, tuple | None, tuple | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> User | None:
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+        if entry is None:
+            entry = self._load(user_id, now)
+            if entry is None:
+                return None
+        return self._build(entry)
+
+    def invalidate(self, user_id) -> None:
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    async def aget(self, user_id) -> User | None:
+        """``get`` for async views; a miss is loaded with the async ORM."""
+
+        key = str(user_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+            else:
+                entry = None
+        if entry is None:
+            user = await self._query(user_id).afirst()
+            if user is None:
+                return None
+            entry = self._remember(user_id, user, now)
+        return self._build(entry)
+
+    def _load(self, user_id, now: float):
+        user = self._query(user_id).first()
+        if user is None:
+            return None
+        return self._remember(user_id, user, now)
+
+    @staticmethod
+    def _query(user_id):
+        return User.objects.select_related("doctor_profile", "receptionist_profile").filter(
+            **{api_settings.USER_ID_FIELD: user_id}
+        )
+
+    def _remember(self, user_id, user: User, now: float):
+        doctor = getattr(user, "doctor_profile", None)
+        receptionist = getattr(user, "receptionist_profile", None)
+        entry = (
+            now + settings.AUTH_USER_CACHE_TTL,
+            tuple(getattr(user, name) for name in USER_FIELDS),
+            tuple(getattr(doctor, name) for name in DOCTOR_FIELDS) if doctor else None,
+            tuple(getattr(receptionist, name) for name in RECEPTIONIST_FIELDS) if receptionist else None,
+        )
+        with self._lock:
+            self._entries[str(user_id)] = entry
+            self._entries.move_to_end(str(user_id))
+            while len(self._entries) > settings.AUTH_USER_CACHE_SIZE:
+                self._entries.popitem(last=False)
+        return entry
+
+    @staticmethod
+    def _build(entry) -> User:
+        _expires, user_values, doctor_values, receptionist_values = entry
+        user = User.from_db(router.db_for_read(User), USER_FIELDS, user_values)
+        doctor = Doctor.from_db(router.db_for_read(Doctor), DOCTOR_FIELDS, doctor_values) if doctor_values else None
+        receptionist = (
+            Receptionist.from_db(router.db_for_read(Receptionist), RECEPTIONIST_FIELDS, receptionist_values)
+            if receptionist_values
+            else None
+        )
+        # Prime the reverse one-to-one caches (a cached ``None`` means "no profile")
+        # and the forward ``profile.user`` caches so role checks cost no query.
+        User.doctor_profile.related.set_cached_value(user, doctor)
+        User.receptionist_profile.related.set_cached_value(user, receptionist)
+        for profile, model in ((doctor, Doctor), (receptionist, Receptionist)):
+            if profile is not None:
+                model.user.field.set_cached_value(profile, user)
+        return user
+
+
+user_cache = UserCache()
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` that resolves the user and role profile from ``user_cache``."""
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN:
+            # Revocation compares against the password hash, which is never cached.
+            return super().get_user(validated_token)
+        return self.check_user(user_cache.get(self.user_id(validated_token)))
+
+    async def aauthenticate(self, request):
+        """``authenticate`` for async views: token checks are CPU-only, a cache miss awaits the ORM."""
+
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        if api_settings.CHECK_REVOKE_TOKEN:
+            return await sync_to_async(super().get_user)(validated_token), validated_token
+        return self.check_user(await user_cache.aget(self.user_id(validated_token))), validated_token
+
+    @staticmethod
+    def user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def check_user(user: User | None) -> User:
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user
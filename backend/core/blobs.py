@@ -0,0 +1,132 @@
+"""Content-addressed attachment storage: one stored file per distinct SHA-256.
+
+Blobs live in the default storage under ``blobs/<aa>/<bb>/<sha256>``.  Every
+attachment with the same bytes points at the same blob, and the blob's
+``refcount`` (maintained by ``core.signals``) says how many do.
+"""
+from __future__ import annotations
+
+import hashlib
+import os
+from datetime import timedelta
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Blob, CaseAttachment, PrescriptionAttachment
+
+ATTACHMENT_MODELS = (CaseAttachment, PrescriptionAttachment)
+BLOCK_SIZE = 1024 * 1024
+
+
+def sha256_of(handle) -> str:
+    digest = hashlib.sha256()
+    for block in iter(lambda: handle.read(BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+
+def link_into_storage(source: str, name: str) -> bool:
+    """Hard-link a local file into the default storage as ``name``.
+
+    Returns ``False`` when the storage is not local or the file sits on another
+    filesystem, in which case the caller copies it.
+    """
+
+    try:
+        target = default_storage.path(name)
+    except NotImplementedError:
+        return False
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    try:
+        os.link(source, target)
+    except FileExistsError:
+        pass
+    except OSError:
+        return False
+    return True
+
+
+def acquire(digest: str, size: int, content: File, local_path: str | None = None) -> Blob:
+    """The blob for ``digest``, storing ``content`` first if those bytes are not stored yet.
+
+    Call inside a transaction and reference the blob before it commits: the
+    row stays locked until then, so ``gc_blobs`` cannot remove the file under a
+    new reference.  A local source file is linked rather than copied.
+    """
+
+    while True:
+        blob, _created = Blob.objects.get_or_create(sha256=digest, defaults={"size": size})
+        # Collected between the two queries: start over with a fresh row.
+        locked = Blob.objects.select_for_update().filter(pk=blob.pk).first()
+        if locked is not None:
+            break
+    if not default_storage.exists(locked.name):
+        if local_path is None or not link_into_storage(local_path, locked.name):
+            content.seek(0)
+            default_storage.save(locked.name, content)
+    return locked
+
+
+def adjust_refcount(blob_id: int, delta: int) -> None:
+    blobs = Blob.objects.filter(pk=blob_id)
+    if delta < 0:
+        blobs = blobs.filter(refcount__gt=0)
+    blobs.update(refcount=F("refcount") + delta, updated_at=timezone.now())
+
+
+def recount(blob_ids: list[int] | None = None) -> None:
+    """Recompute ``refcount`` from the attachment tables, after writes that bypassed signals."""
+
+    references = [
+        Coalesce(
+            Subquery(
+                model.objects.filter(blob=OuterRef("pk")).order_by().values("blob").annotate(total=Count("pk")).values("total")
+            ),
+            Value(0),
+        )
+        for model in ATTACHMENT_MODELS
+    ]
+    blobs = Blob.objects.all() if blob_ids is None else Blob.objects.filter(pk__in=blob_ids)
+    blobs.update(refcount=references[0] + references[1], updated_at=timezone.now())
+
+
+def collect(grace: timedelta, batch_size: int = 500) -> tuple[int, int]:
+    """Delete blobs unreferenced for longer than ``grace``; returns ``(removed, bytes_freed)``.
+
+    The grace period covers uploads that look a blob up just before its last
+    reference goes.  Each blob is re-checked under its row lock against the
+    attachment tables, and a drifted refcount is repaired instead of deleted.
+    """
+
+    cutoff = timezone.now() - grace
+    removed = freed = 0
+    last_id = 0
+    while True:
+        candidates = list(
+            Blob.objects.filter(refcount=0, updated_at__lt=cutoff, pk__gt=last_id)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:batch_size]
+        )
+        if not candidates:
+            break
+        last_id = candidates[-1]
+        for blob_id in candidates:
+            with transaction.atomic():
+                blob = Blob.objects.select_for_update().filter(pk=blob_id, refcount=0).first()
+                if blob is None:
+                    continue
+                if any(model.objects.filter(blob=blob).exists() for model in ATTACHMENT_MODELS):
+                    recount([blob.pk])
+                    continue
+                # Deleted before the row: if the commit fails, the next upload of
+                # these bytes finds the file missing and stores it again.
+                default_storage.delete(blob.name)
+                blob.delete()
+            removed += 1
+            freed += blob.size
+    return removed, freed
@@ -0,0 +1,40 @@
+"""Version counters that let cached payloads expire on the next relevant write.
+
+Each scope (``"cases"``, ``"patients"`` ...) has an integer in the Django cache
+that ``core.signals`` bumps whenever a model in that scope is written.  Cache
+keys embed the current versions of every scope they read, so a write makes the
+old entries unreachable without having to know which users they belong to.
+"""
+from __future__ import annotations
+
+import time
+
+from django.core.cache import cache
+
+VERSION_KEY = "scope-version:{}"
+
+
+def get_versions(*scopes: str) -> tuple[int, ...]:
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    for key in keys:
+        if key not in found:
+            # Seed from the clock so a version evicted from the cache can never
+            # come back at a value an older cached payload was keyed with.
+            cache.add(key, time.time_ns(), timeout=None)
+            found[key] = cache.get(key)
+    return tuple(found[key] for key in keys)
+
+
+def bump_versions(*scopes: str) -> None:
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, time.time_ns(), timeout=None)
+
+
+def versioned_key(prefix: str, scopes: tuple[str, ...], *parts) -> str:
+    versions = ".".join(str(version) for version in get_versions(*scopes))
+    return ":".join([prefix, *(str(part) for part in parts), versions])
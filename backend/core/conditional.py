@@ -0,0 +1,132 @@
+"""ETag / Last-Modified validators for the record viewsets."""
+from __future__ import annotations
+
+import hashlib
+from datetime import datetime
+
+from django.db import router, transaction
+from django.db.models import Count, Max, QuerySet
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class Validators:
+    __slots__ = ("etag", "last_modified")
+
+    def __init__(self, etag: str, last_modified: datetime | None) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @property
+    def timestamp(self) -> int | None:
+        return int(self.last_modified.timestamp()) if self.last_modified else None
+
+
+def make_validators(*parts) -> Validators:
+    """Hash the parts into a strong ETag; the newest datetime among them is Last-Modified."""
+
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+    stamps = [part for part in parts if isinstance(part, datetime)]
+    return Validators(quote_etag(digest), max(stamps) if stamps else None)
+
+
+class ConditionalGetMixin:
+    """Conditional GET and write preconditions from ``updated_at`` columns.
+
+    Validators come from one cheap query that never loads or serializes the
+    rows: ``(count, max(updated_at))`` over the role-scoped list queryset, or the
+    object's own ``updated_at`` for details.  ``etag_related`` names further
+    ``updated_at`` paths whose rows are rendered inline (e.g. the patient name on
+    a case); child rows instead touch their parent (see ``core.signals``).
+    Staff names are not tracked, since users and doctors carry no timestamp.
+    """
+
+    etag_field = "updated_at"
+    etag_related: tuple[str, ...] = ()
+
+    def list(self, request, *args, **kwargs):
+        validators = self.list_validators()
+        response = self.precondition_response(validators)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+        return self.with_validators(response, validators)
+
+    def retrieve(self, request, *args, **kwargs):
+        validators = self.object_validators()
+        response = self.precondition_response(validators) if validators else None
+        if response is None:
+            response = super().retrieve(request, *args, **kwargs)
+        return self.with_validators(response, validators)
+
+    def update(self, request, *args, **kwargs):
+        if "HTTP_IF_MATCH" not in request.META and "HTTP_IF_UNMODIFIED_SINCE" not in request.META:
+            response = super().update(request, *args, **kwargs)
+            return self.with_validators(response, self.object_validators())
+        # Check and save against the locked row in one transaction: of two writers
+        # holding the same ETag, the second waits and then sees the first one's change.
+        with transaction.atomic(using=router.db_for_write(self.queryset.model)):
+            validators = self.object_validators(lock=True)
+            failed = self.precondition_response(validators) if validators else None
+            if failed is not None:
+                return failed
+            response = super().update(request, *args, **kwargs)
+        return self.with_validators(response, self.object_validators())
+
+    def list_validators(self) -> Validators:
+        queryset, aggregates = self.list_validator_query()
+        return self.list_validators_from(queryset.aggregate(**aggregates))
+
+    async def alist_validators(self) -> Validators:
+        queryset, aggregates = self.list_validator_query()
+        return self.list_validators_from(await queryset.aaggregate(**aggregates))
+
+    def list_validator_query(self) -> tuple[QuerySet, dict]:
+        queryset = self.filter_queryset(self.get_queryset()).order_by().prefetch_related(None)
+        aggregates = {"count": Count("pk"), "latest": Max(self.etag_field)}
+        aggregates.update({f"related_{index}": Max(path) for index, path in enumerate(self.etag_related)})
+        return queryset, aggregates
+
+    def list_validators_from(self, values: dict) -> Validators:
+        return make_validators(
+            self.request.get_full_path(),
+            self.request.user.pk,
+            self.request.accepted_renderer.format,
+            *values.values(),
+        )
+
+    def object_validators(self, lock: bool = False) -> Validators | None:
+        query = self.object_validator_query()
+        if lock:
+            query = query.select_for_update(of=("self",))
+        return self.object_validators_from(query.first())
+
+    async def aobject_validators(self) -> Validators | None:
+        return self.object_validators_from(await self.object_validator_query().afirst())
+
+    def object_validator_query(self) -> QuerySet:
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        return (
+            self.filter_queryset(self.get_queryset())
+            .prefetch_related(None)
+            .filter(**{self.lookup_field: self.kwargs[lookup_url_kwarg]})
+            .values_list("pk", self.etag_field, *self.etag_related)
+        )
+
+    def object_validators_from(self, row) -> Validators | None:
+        if row is None:
+            return None
+        return make_validators(self.queryset.model._meta.label, self.request.accepted_renderer.format, *row)
+
+    def precondition_response(self, validators: Validators):
+        """The 304/412 response the request's conditional headers call for, or ``None``."""
+
+        return get_conditional_response(self.request, etag=validators.etag, last_modified=validators.timestamp)
+
+    @staticmethod
+    def with_validators(response, validators: Validators | None):
+        if validators is None or response.status_code >= 400:
+            return response
+        response["ETag"] = validators.etag
+        if validators.last_modified is not None:
+            response["Last-Modified"] = http_date(validators.timestamp)
+        return response
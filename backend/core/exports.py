@@ -0,0 +1,260 @@
+"""Streaming export of complete patient records as NDJSON or CSV.
+
+A patient's bundle is the patient with their cases (assigned doctors, attachment
+metadata and prescriptions with theirs) and appointments.  Patients are read in
+primary-key order with ``QuerySet.iterator(chunk_size=...)``: on PostgreSQL
+through a server-side cursor, and each chunk's related rows with one query per
+relation (six per chunk).  Only one chunk of bundles is in
+memory at a time, however many patients are exported.
+
+Output is written as it is produced, in pieces of about ``WRITE_SIZE`` bytes.
+Every bundle carries its patient id, so an interrupted export resumes from the
+last complete one with ``after=<that id>``.  ``save_export`` writes one to
+storage instead, for the ``export_patients`` background job.
+
+- NDJSON: one bundle per line.
+- CSV: one row per record (``patient``, ``case``, ``prescription``,
+  ``appointment``), with the owning patient and parent record ids and the
+  record's own fields as a JSON object; attachments and assigned doctors stay
+  inside their case's or prescription's ``data``.
+"""
+from __future__ import annotations
+
+import csv
+import io
+import tempfile
+from typing import AsyncIterator, Iterable, Iterator
+
+import orjson
+from asgiref.sync import sync_to_async
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db.models import Prefetch, QuerySet
+from rest_framework import serializers
+
+from .models import (
+    Appointment,
+    Case,
+    CaseAttachment,
+    Doctor,
+    Patient,
+    Prescription,
+    PrescriptionAttachment,
+    Receptionist,
+)
+
+DEFAULT_CHUNK_SIZE = 500
+WRITE_SIZE = 64 * 1024
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CSV_HEADER = ["record", "id", "patient", "parent", "data"]
+
+PATIENT_FIELDS = [
+    "id",
+    "first_name",
+    "last_name",
+    "date_of_birth",
+    "attending_doctor",
+    "created_by",
+    "created_at",
+    "updated_at",
+]
+CASE_FIELDS = [
+    "id",
+    "case_number",
+    "name",
+    "description",
+    "symptoms",
+    "details",
+    "created_by",
+    "created_at",
+    "updated_at",
+]
+PRESCRIPTION_FIELDS = ["id", "prescription_number", "doctor", "details", "created_at", "updated_at"]
+APPOINTMENT_FIELDS = [
+    "id",
+    "appointment_number",
+    "case",
+    "doctor",
+    "created_by",
+    "notes",
+    "status",
+    "scheduled_at",
+    "duration_minutes",
+    "ends_at",
+    "created_at",
+    "updated_at",
+]
+ATTACHMENT_FIELDS = ["id", "filename", "size", "content_type", "label", "uploaded_at"]
+
+
+def attnames(model, names: list[str]) -> list[tuple[str, str]]:
+    """``(output key, attribute)`` pairs; foreign keys are exported as their id."""
+
+    return [(name, model._meta.get_field(name).attname) for name in names]
+
+
+COLUMNS = {
+    model: attnames(model, names)
+    for model, names in [
+        (Patient, PATIENT_FIELDS),
+        (Case, CASE_FIELDS),
+        (Prescription, PRESCRIPTION_FIELDS),
+        (Appointment, APPOINTMENT_FIELDS),
+        (CaseAttachment, ATTACHMENT_FIELDS),
+        (PrescriptionAttachment, ATTACHMENT_FIELDS),
+    ]
+}
+
+
+class ExportParamsSerializer(serializers.Serializer):
+    """Query parameters of the admin patient export, the arguments of ``patients_to_export``."""
+
+    type = serializers.ChoiceField(choices=sorted(FORMATS), default="ndjson")
+    after = serializers.IntegerField(min_value=0, required=False)
+    doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all(), required=False)
+    receptionist = serializers.PrimaryKeyRelatedField(queryset=Receptionist.objects.all(), required=False)
+
+
+def fields(instance) -> dict:
+    return {key: getattr(instance, attribute) for key, attribute in COLUMNS[type(instance)]}
+
+
+def patients_to_export(
+    after: int | None = None, doctor: Doctor | None = None, receptionist: Receptionist | None = None
+) -> QuerySet:
+    """Patients in export order, with the bundle prefetches.
+
+    ``doctor`` and ``receptionist`` narrow the export to what that user sees
+    in the patient list: the doctor's patients, or those the receptionist
+    registered.  ``after`` resumes after that patient id.
+    """
+
+    queryset = Patient.objects.all()
+    if doctor is not None:
+        queryset = queryset.filter(attending_doctor=doctor)
+    if receptionist is not None:
+        queryset = queryset.filter(created_by=receptionist)
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    # ``to_attr`` lists: filling a related manager's cache builds a queryset per row.
+    prescriptions = Prescription.objects.order_by("id").prefetch_related(
+        Prefetch(
+            "attachments",
+            PrescriptionAttachment.objects.select_related("blob").order_by("id"),
+            to_attr="export_attachments",
+        )
+    )
+    cases = Case.objects.order_by("id").prefetch_related(
+        Prefetch("assigned_doctors", Doctor.objects.only("id").order_by("id"), to_attr="export_doctors"),
+        Prefetch(
+            "attachments", CaseAttachment.objects.select_related("blob").order_by("id"), to_attr="export_attachments"
+        ),
+        Prefetch("prescriptions", prescriptions, to_attr="export_prescriptions"),
+    )
+    return queryset.order_by("pk").prefetch_related(
+        Prefetch("cases", cases, to_attr="export_cases"),
+        Prefetch("appointments", Appointment.objects.order_by("id"), to_attr="export_appointments"),
+    )
+
+
+def attachment(instance) -> dict:
+    return {**fields(instance), "file": instance.file.name, "sha256": instance.blob.sha256 if instance.blob else None}
+
+
+def bundle(patient: Patient) -> dict:
+    """The patient and everything recorded about them, from prefetched relations."""
+
+    return {
+        "patient": fields(patient),
+        "cases": [
+            {
+                **fields(case),
+                "assigned_doctors": [doctor.pk for doctor in case.export_doctors],
+                "attachments": [attachment(item) for item in case.export_attachments],
+                "prescriptions": [
+                    {
+                        **fields(prescription),
+                        "attachments": [attachment(item) for item in prescription.export_attachments],
+                    }
+                    for prescription in case.export_prescriptions
+                ],
+            }
+            for case in patient.export_cases
+        ],
+        "appointments": [fields(appointment) for appointment in patient.export_appointments],
+    }
+
+
+def bundles(queryset: QuerySet, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[dict]:
+    for patient in queryset.iterator(chunk_size=chunk_size):
+        yield bundle(patient)
+
+
+def ndjson_lines(items: Iterable[dict]) -> Iterator[bytes]:
+    for item in items:
+        yield orjson.dumps(item, option=orjson.OPT_APPEND_NEWLINE)
+
+
+def csv_lines(items: Iterable[dict]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def row(*values) -> bytes:
+        writer.writerow(values)
+        line = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return line.encode()
+
+    def data(record: dict, *nested: str) -> str:
+        return orjson.dumps({key: value for key, value in record.items() if key not in nested}).decode()
+
+    yield row(*CSV_HEADER)
+    for item in items:
+        patient_id = item["patient"]["id"]
+        yield row("patient", patient_id, patient_id, "", data(item["patient"]))
+        for case in item["cases"]:
+            yield row("case", case["id"], patient_id, patient_id, data(case, "prescriptions"))
+            for prescription in case["prescriptions"]:
+                yield row("prescription", prescription["id"], patient_id, case["id"], data(prescription))
+        for appointment in item["appointments"]:
+            yield row("appointment", appointment["id"], patient_id, patient_id, data(appointment))
+
+
+def export(queryset: QuerySet, file_format: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """The encoded export of ``queryset`` (from ``patients_to_export``), in pieces of about ``WRITE_SIZE`` bytes."""
+
+    encode = csv_lines if file_format == "csv" else ndjson_lines
+    pending: list[bytes] = []
+    size = 0
+    for line in encode(bundles(queryset, chunk_size)):
+        pending.append(line)
+        size += len(line)
+        if size >= WRITE_SIZE:
+            yield b"".join(pending)
+            pending, size = [], 0
+    if pending:
+        yield b"".join(pending)
+
+
+def save_export(path: str, queryset: QuerySet, file_format: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Write the export of ``queryset`` to ``path`` in default storage, replacing any earlier attempt's file."""
+
+    with tempfile.TemporaryFile() as output:
+        for piece in export(queryset, file_format, chunk_size):
+            output.write(piece)
+        output.seek(0)
+        default_storage.delete(path)
+        default_storage.save(path, File(output))
+
+
+async def aiterate(pieces: Iterator[bytes]) -> AsyncIterator[bytes]:
+    """``pieces`` for an ASGI response, which would read a synchronous iterator into a list first.
+
+    Each piece is produced on the request's sync thread, so the database
+    cursor stays on the connection that opened it.
+    """
+
+    produce = sync_to_async(next, thread_sensitive=True)
+    while (piece := await produce(pieces, None)) is not None:
+        yield piece
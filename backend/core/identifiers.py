@@ -0,0 +1,111 @@
+"""Monotonic case, prescription and appointment numbers from database sequences.
+
+On PostgreSQL each kind of number has a sequence (``core_<name>_number_seq``,
+created by migration 0012) that steps by ``BLOCK_SIZE``.  One ``nextval``
+reserves a whole block for the calling process, which then hands the numbers
+out from memory, so only one insert in ``BLOCK_SIZE`` pays a round trip.
+
+Numbers are unique across workers and increase within each worker.  Across
+workers they are ordered by block, and a worker that exits leaves the rest of
+its block unused.  ``nextval`` ignores transactions, so a rolled-back insert
+skips its number rather than handing it out twice.
+
+Other databases have no sequences.  There an ``IdentifierSequence`` row is
+upserted once per number, inside the caller's transaction.  A block held
+across a rollback would be handed out again, so blocks have size 1 there; that
+costs a query per insert, which is fine for development.
+
+Models draw their number when first saved (see ``core.models.NumberedModel``),
+never on instantiation, so unsaved instances cost nothing.  ``bulk_create``
+skips ``save()``: its callers take numbers for the whole batch with one
+``next_numbers`` call, which reserves as many blocks as it needs at once.
+"""
+from __future__ import annotations
+
+import os
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# The sequences' INCREMENT BY; changing it needs a migration that alters them.
+BLOCK_SIZE = 50
+WIDTH = 8
+PREFIXES = {"case": "CASE", "prescription": "RX", "appointment": "APT"}
+
+
+def sequence_name(name: str) -> str:
+    return f"core_{name}_number_seq"
+
+
+def reserve(name: str, count: int = 1) -> list[range]:
+    """Newly reserved blocks of ``name`` numbers, holding at least ``count`` of them."""
+
+    connection = connections[DEFAULT_DB_ALIAS]
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT nextval(%s) FROM generate_series(1, %s)", [sequence_name(name), -(-count // BLOCK_SIZE)]
+            )
+            return [range(start, start + BLOCK_SIZE) for (start,) in cursor.fetchall()]
+
+    from .models import IdentifierSequence
+
+    table = connection.ops.quote_name(IdentifierSequence._meta.db_table)
+    with connection.cursor() as cursor:
+        # One statement, so it needs no transaction of its own (SQLite 3.35+ for RETURNING).
+        cursor.execute(
+            f"INSERT INTO {table} (name, last_value) VALUES (%s, %s) "
+            "ON CONFLICT (name) DO UPDATE SET last_value = last_value + excluded.last_value RETURNING last_value",
+            [name, count],
+        )
+        last = cursor.fetchone()[0]
+        return [range(last - count + 1, last + 1)]
+
+
+class BlockAllocator:
+    """Numbers of one sequence, handed out from blocks this process has reserved."""
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self.lock = threading.Lock()
+        self.next_value = self.end = 0
+        self.pid: int | None = None
+
+    def allocate(self) -> int:
+        return self.allocate_many(1)[0]
+
+    def allocate_many(self, count: int) -> list[int]:
+        with self.lock:
+            # A forked worker must not hand out the rest of its parent's block.
+            if self.pid != os.getpid():
+                self.next_value = self.end = 0
+                self.pid = os.getpid()
+            values = list(range(self.next_value, min(self.end, self.next_value + count)))
+            self.next_value += len(values)
+            if len(values) < count:
+                for block in reserve(self.name, count - len(values)):
+                    taken = block[: count - len(values)]
+                    values.extend(taken)
+                    self.next_value, self.end = taken.stop, block.stop
+            return values
+
+
+ALLOCATORS = {name: BlockAllocator(name) for name in PREFIXES}
+
+
+def format_number(prefix: str, value: int) -> str:
+    """Zero-padded, so numbers sort (and insert into the unique index) in allocation order."""
+
+    return f"{prefix}-{value:0{WIDTH}d}"
+
+
+def next_number(name: str) -> str:
+    """The next ``case``/``prescription``/``appointment`` number, e.g. ``CASE-00000042``."""
+
+    return format_number(PREFIXES[name], ALLOCATORS[name].allocate())
+
+
+def next_numbers(name: str, count: int) -> list[str]:
+    """``count`` numbers for a ``bulk_create`` batch, reserved together."""
+
+    return [format_number(PREFIXES[name], value) for value in ALLOCATORS[name].allocate_many(count)]
@@ -0,0 +1,138 @@
+"""Streaming bulk import of patient records from CSV or NDJSON.
+
+Records are parsed a line at a time and handled in batches:
+- the batch's ``attending_doctor`` pks are loaded with one query;
+- each record is validated by ``PatientSerializer``, as a POST would be;
+- the valid records are inserted with one ``bulk_create`` in a transaction of
+  their own.
+
+Invalid records are reported by line and skipped; the rest of their batch is
+still imported.  Only one batch is held in memory, whatever the file size.
+``bulk_create`` sends no signals, so each batch bumps the patient cache scopes
+itself.  New patients have no cases, so there is no ``CaseAccess`` to derive.
+"""
+from __future__ import annotations
+
+import codecs
+import csv
+from itertools import islice
+from pathlib import PurePath
+from typing import Any, Callable, Iterable, Iterator
+
+import orjson
+from django.db import transaction
+from rest_framework import serializers
+
+from .models import Patient, Receptionist
+from .serializers import PatientSerializer
+from .signals import MODEL_SCOPES, bump_cache_versions
+
+DEFAULT_BATCH_SIZE = 2000
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+# ``(line number, payload, errors)``; a record that could not be parsed has errors and no payload.
+Record = tuple[int, dict | None, dict | None]
+
+
+class ImportFileError(ValueError):
+    """The file could not be read as the expected format; rows before it may have been imported."""
+
+
+class ImportReport:
+    """Row counts of an import and the first ``error_limit`` rejected lines."""
+
+    def __init__(self, error_limit: int | None = None, on_error: Callable[[int, Any], None] | None = None) -> None:
+        self.created = 0
+        self.failed = 0
+        self.errors: list[dict] = []
+        self.error_limit = error_limit
+        self.on_error = on_error
+
+    def reject(self, line: int, errors) -> None:
+        self.failed += 1
+        if self.on_error is not None:
+            self.on_error(line, errors)
+        if self.error_limit is None or len(self.errors) < self.error_limit:
+            self.errors.append({"line": line, "errors": errors})
+
+    def as_dict(self) -> dict:
+        return {
+            "created": self.created,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+def detect_format(filename: str | None, content_type: str | None = None) -> str | None:
+    """``"csv"``/``"ndjson"`` from the file extension, else the content type."""
+
+    by_extension = EXTENSIONS.get(PurePath(filename or "").suffix.lower())
+    return by_extension or CONTENT_TYPES.get((content_type or "").split(";")[0].strip().lower())
+
+
+def csv_records(lines: Iterable[bytes]) -> Iterator[Record]:
+    """Rows of a UTF-8 CSV with a header line; the line number is where the row ends."""
+
+    reader = csv.DictReader(codecs.iterdecode(lines, "utf-8-sig"))
+    for row in reader:
+        yield reader.line_num, row, None
+
+
+def ndjson_records(lines: Iterable[bytes]) -> Iterator[Record]:
+    """One JSON object per line; blank lines are skipped."""
+
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            payload = orjson.loads(line)
+        except orjson.JSONDecodeError as exc:
+            yield line_number, None, {"non_field_errors": [f"Invalid JSON: {exc}"]}
+            continue
+        if not isinstance(payload, dict):
+            yield line_number, None, {"non_field_errors": ["Expected a JSON object."]}
+            continue
+        yield line_number, payload, None
+
+
+def import_patients(
+    lines: Iterable[bytes],
+    file_format: str,
+    created_by: Receptionist | None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    report: ImportReport | None = None,
+) -> ImportReport:
+    """Import the records in ``lines`` (an open binary file or upload) as patients of ``created_by``."""
+
+    records = csv_records(lines) if file_format == "csv" else ndjson_records(lines)
+    report = report if report is not None else ImportReport()
+    try:
+        while batch := list(islice(records, batch_size)):
+            import_batch(batch, created_by, report)
+    except (UnicodeDecodeError, csv.Error) as exc:
+        raise ImportFileError(f"Could not read the file as {file_format}: {exc}") from exc
+    return report
+
+
+def import_batch(batch: list[Record], created_by: Receptionist | None, report: ImportReport) -> None:
+    serializer = PatientSerializer()
+    serializer.preload_related([payload for _line, payload, errors in batch if errors is None])
+    patients = []
+    for line, payload, errors in batch:
+        if errors is None:
+            try:
+                attrs = serializer.run_validation(payload)
+            except serializers.ValidationError as exc:
+                errors = exc.detail
+            else:
+                patients.append(Patient(**attrs, created_by=created_by))
+                continue
+        report.reject(line, errors)
+    if not patients:
+        return
+    with transaction.atomic():
+        Patient.objects.bulk_create(patients)
+        bump_cache_versions(*MODEL_SCOPES[Patient])
+    report.created += len(patients)
@@ -0,0 +1,276 @@
+"""Database-backed background jobs, run by ``manage.py run_jobs`` without a broker.
+
+- Tasks are plain functions registered under a name with ``@task``.  They take
+  the job's JSON payload as keyword arguments.
+- ``enqueue`` saves the ``Job`` row with ``transaction.on_commit``, so a job
+  queued by a view or signal only exists if the caller's transaction commits.
+  Outside a transaction the row is saved immediately.
+- Workers claim the oldest due job with ``SELECT ... FOR UPDATE SKIP LOCKED``,
+  so concurrent claims never block on or hand out the same row.  The claim
+  is committed before the task runs, and the task runs outside any
+  transaction.
+- A failed attempt is retried after an exponential backoff with jitter, until
+  ``max_attempts`` is reached.
+- While a task runs, a heartbeat thread refreshes the job's ``heartbeat_at``
+  every ``JOB_HEARTBEAT_SECONDS``.  A RUNNING job whose heartbeat is older
+  than ``JOB_TIMEOUT_SECONDS`` (its worker died) is queued again; a long task
+  on a live worker is not.
+- Each attempt's queue wait and run time go to the metrics registry.  The
+  metrics endpoint adds them to live queue gauges read from the table.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, transaction
+from django.db.models import Count, F, Min, Q
+from django.utils import timezone
+
+from . import metrics
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class Task(NamedTuple):
+    function: Callable[..., object]
+    max_attempts: int
+
+
+TASKS: dict[str, Task] = {}
+
+
+def task(name: str | None = None, *, max_attempts: int = 5):
+    """Register the decorated function as the job ``name`` (default: its ``__name__``)."""
+
+    def register(function):
+        TASKS[name or function.__name__] = Task(function, max_attempts)
+        return function
+
+    return register
+
+
+def enqueue(name: str, payload: dict | None = None, *, delay: timedelta | None = None, using: str | None = None) -> Job:
+    """Queue the job ``name`` for when the current transaction commits; returns the (then saved) row."""
+
+    if name not in TASKS:
+        raise LookupError(f"No job named {name!r} is registered.")
+    job = Job(name=name, payload=payload or {}, max_attempts=TASKS[name].max_attempts)
+    if delay is not None:
+        job.run_at = timezone.now() + delay
+    transaction.on_commit(job.save, using=using)
+    return job
+
+
+def backoff(attempts: int) -> timedelta:
+    """Delay before retrying after ``attempts`` failures: doubling from JOB_RETRY_BACKOFF_SECONDS, capped, jittered."""
+
+    delay = min(settings.JOB_RETRY_BACKOFF_SECONDS * 2 ** (attempts - 1), settings.JOB_RETRY_BACKOFF_MAX_SECONDS)
+    return timedelta(seconds=delay * random.uniform(0.5, 1.0))
+
+
+def claim(worker: str) -> Job | None:
+    """Mark the oldest due job RUNNING for ``worker`` and return it, or None if none is due."""
+
+    now = timezone.now()
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status=Job.Status.QUEUED, run_at__lte=now)
+            .order_by("run_at", "id")
+            .first()
+        )
+        if job is None:
+            return None
+        # Also the claim on databases without row locks (SQLite), where two
+        # workers can read the same row.
+        claimed = Job.objects.filter(pk=job.pk, status=Job.Status.QUEUED).update(
+            status=Job.Status.RUNNING, attempts=F("attempts") + 1, started_at=now, heartbeat_at=now, locked_by=worker
+        )
+    if not claimed:
+        return None
+    job.status, job.attempts, job.started_at, job.locked_by = Job.Status.RUNNING, job.attempts + 1, now, worker
+    job.heartbeat_at = now
+    return job
+
+
+def owned(job: Job):
+    """The job's row while this attempt still holds it; a job requeued as stale and claimed again has a new owner."""
+
+    return Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by, attempts=job.attempts)
+
+
+def beat(job: Job) -> None:
+    owned(job).update(heartbeat_at=timezone.now())
+
+
+def heartbeat(job: Job, done: threading.Event) -> None:
+    """Refresh ``job``'s heartbeat every JOB_HEARTBEAT_SECONDS until ``done`` is set (run on its own thread)."""
+
+    try:
+        while not done.wait(settings.JOB_HEARTBEAT_SECONDS):
+            try:
+                beat(job)
+            except DatabaseError as exc:
+                # Missed beats only matter once they add up to JOB_TIMEOUT_SECONDS.
+                logger.warning("Job %s #%s heartbeat: %s", job.name, job.pk, exc)
+    finally:
+        connection.close()
+
+
+def run(job: Job) -> str:
+    """Run a claimed job and record the outcome; returns ``"done"``, ``"retry"`` or ``"failed"``."""
+
+    started = time.perf_counter()
+    registered = TASKS.get(job.name)
+    done = threading.Event()
+    beating = threading.Thread(target=heartbeat, args=(job, done), daemon=True)
+    beating.start()
+    try:
+        if registered is None:
+            raise LookupError(f"No job named {job.name!r} is registered.")
+        registered.function(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        logger.warning("Job %s #%s failed (attempt %s/%s)", job.name, job.pk, job.attempts, job.max_attempts)
+        if registered is not None and job.attempts < job.max_attempts:
+            outcome, changes = "retry", {"status": Job.Status.QUEUED, "run_at": timezone.now() + backoff(job.attempts)}
+        else:
+            outcome, changes = "failed", {"status": Job.Status.FAILED, "finished_at": timezone.now()}
+        changes["last_error"] = error
+    else:
+        outcome, changes = "done", {"status": Job.Status.DONE, "finished_at": timezone.now(), "last_error": ""}
+    finally:
+        done.set()
+        beating.join()
+    runtime = time.perf_counter() - started
+
+    owned(job).update(**changes)
+    if settings.METRICS_ENABLED:
+        wait = max((job.started_at - job.run_at).total_seconds(), 0.0)
+        metrics.registry.record_job(job.name, outcome, wait, runtime)
+    return outcome
+
+
+def requeue_stale() -> int:
+    """Queue again (or fail, out of attempts) the jobs whose worker stopped sending heartbeats."""
+
+    now = timezone.now()
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING, heartbeat_at__lt=now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    )
+    error = "Worker stopped before the job finished."
+    failed = stale.filter(attempts__gte=F("max_attempts")).update(
+        status=Job.Status.FAILED, finished_at=now, last_error=error
+    )
+    return failed + stale.update(status=Job.Status.QUEUED, run_at=now, last_error=error)
+
+
+class Worker:
+    """Runs jobs on ``threads`` threads of this process until ``stop`` is set (or, in burst mode, none is due)."""
+
+    def __init__(self, threads: int = 1, poll_interval: float = 1.0, burst: bool = False) -> None:
+        self.threads = threads
+        self.poll_interval = poll_interval
+        self.burst = burst
+
+    def run(self, stop: threading.Event) -> None:
+        # Taken here rather than in __init__: worker processes are forked from the command.
+        identity = f"{socket.gethostname()}:{os.getpid()}"
+        try:
+            if self.threads == 1:
+                self.loop(stop, identity)
+                return
+            pool = [
+                threading.Thread(target=self.loop, args=(stop, f"{identity}:{index}"), daemon=True)
+                for index in range(self.threads)
+            ]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+        finally:
+            if settings.METRICS_ENABLED:
+                metrics.registry.flush()
+
+    def loop(self, stop: threading.Event, worker: str) -> None:
+        last_sweep = 0.0
+        try:
+            while not stop.is_set():
+                # As the request cycle does: drop connections that the last job
+                # broke or that outlived CONN_MAX_AGE.  Skipped inside a
+                # transaction a caller wrapped the worker in.
+                if not connection.in_atomic_block:
+                    close_old_connections()
+                try:
+                    if time.monotonic() - last_sweep >= settings.JOB_TIMEOUT_SECONDS / 4:
+                        requeue_stale()
+                        last_sweep = time.monotonic()
+                    job = claim(worker)
+                    if job is not None:
+                        run(job)
+                        continue
+                except DatabaseError as exc:
+                    # A dropped connection, or on SQLite another writer: try again
+                    # after a pause.  A job whose outcome was lost is requeued as stale.
+                    logger.warning("Job worker %s: %s", worker, exc)
+                    stop.wait(self.poll_interval)
+                    continue
+                if self.burst:
+                    return
+                stop.wait(self.poll_interval)
+        finally:
+            if threading.current_thread() is not threading.main_thread():
+                connection.close()
+
+
+def prometheus_lines(snapshots: list[dict]) -> list[str]:
+    """Queue gauges from the job table plus per-job counters from every process's metrics ``snapshots``."""
+
+    now = timezone.now()
+    states = Job.objects.filter(status__in=[Job.Status.QUEUED, Job.Status.RUNNING, Job.Status.FAILED])
+    counts = dict(states.values_list("status").annotate(total=Count("id")).order_by())
+    oldest_due = Job.objects.filter(status=Job.Status.QUEUED).aggregate(
+        oldest=Min("run_at", filter=Q(run_at__lte=now))
+    )["oldest"]
+    lines = ["# HELP job_queue_jobs Background jobs by state.", "# TYPE job_queue_jobs gauge"]
+    for status in (Job.Status.QUEUED, Job.Status.RUNNING, Job.Status.FAILED):
+        lines.append(f'job_queue_jobs{{status="{status.lower()}"}} {counts.get(status, 0)}')
+    lines += [
+        "# HELP job_queue_oldest_due_seconds How long the oldest due job has been waiting for a worker.",
+        "# TYPE job_queue_oldest_due_seconds gauge",
+        f"job_queue_oldest_due_seconds {(now - oldest_due).total_seconds() if oldest_due else 0:.3f}",
+    ]
+
+    totals = metrics.registry.merged_jobs(snapshots)
+    lines += ["# HELP jobs_total Finished job attempts by outcome.", "# TYPE jobs_total counter"]
+    for name, job_totals in sorted(totals.items()):
+        label = metrics.escape_label(name)
+        for outcome, count in sorted(job_totals["outcomes"].items()):
+            lines.append(f'jobs_total{{job="{label}",outcome="{outcome}"}} {count}')
+    lines += [
+        "# HELP job_wait_seconds Time from a job being due to a worker claiming it.",
+        "# TYPE job_wait_seconds histogram",
+    ]
+    for name, job_totals in sorted(totals.items()):
+        label = f'job="{metrics.escape_label(name)}"'
+        cumulative = 0
+        for bound, count in zip(metrics.JOB_BUCKETS, job_totals["wait_buckets"]):
+            cumulative += count
+            lines.append(f'job_wait_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+        lines.append(f'job_wait_seconds_bucket{{{label},le="+Inf"}} {job_totals["count"]}')
+        lines.append(f"job_wait_seconds_sum{{{label}}} {job_totals['wait_seconds']:.6f}")
+        lines.append(f"job_wait_seconds_count{{{label}}} {job_totals['count']}")
+    lines += ["# HELP job_run_seconds_total Wall time spent running jobs.", "# TYPE job_run_seconds_total counter"]
+    for name, job_totals in sorted(totals.items()):
+        lines.append(f'job_run_seconds_total{{job="{metrics.escape_label(name)}"}} {job_totals["run_seconds"]:.6f}')
+    return lines
@@ -0,0 +1,243 @@
+"""Compare the read API under ASGI (uvicorn) and threaded WSGI (gunicorn) at rising concurrency."""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.management.commands.benchmark_endpoints import summarize
+from core.management.routes import iter_role_routes, sample_users
+from core.urls import router
+
+DEFAULT_CONCURRENCY = [1, 16, 64, 256]
+RECORD_PREFIXES = [prefix for prefix, _viewset, _basename in router.registry]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, process: subprocess.Popen, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f"Server exited with status {process.returncode} before accepting connections.")
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f"Server did not listen on port {port} within {timeout:.0f}s.")
+
+
+async def read_response(reader: asyncio.StreamReader) -> int:
+    """Read one HTTP/1.1 response and return its status; bodies are drained, not kept."""
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("Connection closed by server.")
+    length = None
+    chunked = False
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        name = name.strip().lower()
+        if name == "content-length":
+            length = int(value)
+        elif name == "transfer-encoding" and "chunked" in value.lower():
+            chunked = True
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b";")[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    return int(status_line.split()[1])
+
+
+async def client(host: str, port: int, requests: list[bytes], stop_at: float, samples: list, errors: list) -> None:
+    """One keep-alive connection issuing requests back to back until ``stop_at``."""
+
+    reader = writer = None
+    index = 0
+    while time.monotonic() < stop_at:
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            request = requests[index % len(requests)]
+            index += 1
+            started = time.perf_counter()
+            writer.write(request)
+            status = await read_response(reader)
+            samples.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+        except (ConnectionError, OSError, asyncio.IncompleteReadError, ValueError) as exc:
+            errors.append(type(exc).__name__)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(url: str, requests: list[bytes], concurrency: int, duration: float) -> tuple[list[float], list, float]:
+    parts = urlsplit(url)
+    stop_at = time.monotonic() + duration
+    samples: list[float] = []
+    errors: list = []
+    started = time.perf_counter()
+    await asyncio.gather(
+        *(client(parts.hostname, parts.port or 80, requests, stop_at, samples, errors) for _ in range(concurrency))
+    )
+    return samples, errors, time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the record list/detail routes with N concurrent keep-alive clients against uvicorn (ASGI) "
+        "and gunicorn (threaded WSGI), and store req/s and latency percentiles as JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--concurrency", type=int, action="append", default=[], help=f"Client count (default: {DEFAULT_CONCURRENCY})."
+        )
+        parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level.")
+        parser.add_argument("--endpoint", action="append", default=[], help="Limit to these URL prefixes.")
+        parser.add_argument("--workers", type=int, default=1, help="Worker processes per server.")
+        parser.add_argument("--threads", type=int, default=8, help="Threads per gunicorn worker.")
+        parser.add_argument("--asgi-url", help="Benchmark an already running ASGI server instead of starting uvicorn.")
+        parser.add_argument("--wsgi-url", help="Benchmark an already running WSGI server instead of starting gunicorn.")
+        parser.add_argument("--output", help="Result file (default: benchmarks/concurrency-<timestamp>.json).")
+
+    def handle(self, *args, **options):
+        users = sample_users()
+        if not users:
+            raise CommandError("No staff users found; seed data first (manage.py seed_synthetic).")
+        levels = options["concurrency"] or DEFAULT_CONCURRENCY
+        if min(levels) < 1 or options["duration"] <= 0:
+            raise CommandError("--concurrency must be at least 1 and --duration positive.")
+        endpoints = options["endpoint"] or RECORD_PREFIXES
+        if not set(endpoints) <= set(RECORD_PREFIXES):
+            raise CommandError(f"--endpoint must be one of {', '.join(RECORD_PREFIXES)}.")
+
+        paths = self.paths(users, endpoints)
+        results = []
+        for server, command, url in self.servers(options):
+            process = None
+            if url is None:
+                port = free_port()
+                url = f"http://127.0.0.1:{port}"
+                process = self.start(command + self.bind_args(server, port), port)
+            try:
+                results.extend(self.run(server, url, paths, levels, options["duration"]))
+            finally:
+                if process is not None:
+                    process.terminate()
+                    process.wait(timeout=30)
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "duration_s": options["duration"],
+            "workers": options["workers"],
+            "threads": options["threads"],
+            "results": results,
+        }
+        output = Path(options["output"] or f"benchmarks/concurrency-{timezone.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+    def paths(self, users, endpoints) -> dict[str, list[tuple[str, str]]]:
+        """``{"list"|"detail": [(path, bearer token), ...]}`` across roles."""
+
+        paths: dict[str, list[tuple[str, str]]] = {"list": [], "detail": []}
+        api = APIClient()
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for prefix, _viewset, _role, user in iter_role_routes(users, endpoints):
+                token = str(AccessToken.for_user(user))
+                paths["list"].append((f"/api/{prefix}/", token))
+                api.force_authenticate(user)
+                response = api.get(f"/api/{prefix}/", {"page_size": 1})
+                rows = response.json().get("results", []) if response.status_code == 200 else []
+                if rows:
+                    paths["detail"].append((f"/api/{prefix}/{rows[0]['id']}/", token))
+        return {kind: entries for kind, entries in paths.items() if entries}
+
+    def servers(self, options):
+        """``(name, command, external url)`` per server under test; the command is unused with a url."""
+
+        workers = ["--workers", str(options["workers"])]
+        yield "asgi", [
+            sys.executable, "-m", "uvicorn", "config.asgi:application", *workers, "--no-access-log", "--log-level", "warning"
+        ], options["asgi_url"]
+        yield "wsgi", [
+            sys.executable, "-m", "gunicorn", "config.wsgi:application", *workers, "--threads", str(options["threads"]),
+            "--log-level", "warning",
+        ], options["wsgi_url"]
+
+    @staticmethod
+    def bind_args(server: str, port: int) -> list[str]:
+        return ["--host", "127.0.0.1", "--port", str(port)] if server == "asgi" else ["--bind", f"127.0.0.1:{port}"]
+
+    def start(self, command: list[str], port: int) -> subprocess.Popen:
+        try:
+            process = subprocess.Popen(command, cwd=settings.BASE_DIR, env={**os.environ, "DJANGO_DEBUG": "false"})
+        except OSError as exc:
+            raise CommandError(f"Could not start {' '.join(command[:3])}: {exc}")
+        wait_for_port(port, process)
+        return process
+
+    def run(self, server: str, url: str, paths, levels: list[int], duration: float) -> list[dict]:
+        host = urlsplit(url).netloc
+        results = []
+        for kind, entries in paths.items():
+            requests = [
+                f"GET {path} HTTP/1.1\r\nHost: {host}\r\nAuthorization: Bearer {token}\r\n\r\n".encode()
+                for path, token in entries
+            ]
+            asyncio.run(load(url, requests, 1, min(duration, 2.0)))  # warm caches and connections
+            for concurrency in levels:
+                samples, errors, elapsed = asyncio.run(load(url, requests, concurrency, duration))
+                if not samples:
+                    raise CommandError(f"No successful requests against {url}; errors: {errors[:5]}")
+                result = summarize(samples, queries=0, size=0)
+                for unused in ("queries", "response_bytes", "throughput_rps"):
+                    result.pop(unused)
+                result.update(
+                    {
+                        "server": server,
+                        "routes": kind,
+                        "concurrency": concurrency,
+                        "throughput_rps": round(len(samples) / elapsed, 2),
+                        "errors": len(errors),
+                    }
+                )
+                results.append(result)
+                self.stdout.write(
+                    f"{server:<5} {kind:<7} c={concurrency:<4} rps={result['throughput_rps']:<9} "
+                    f"p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms errors={result['errors']}"
+                )
+        return results
@@ -0,0 +1,134 @@
+"""Measure latency, throughput and query count of the read API for each role."""
+from __future__ import annotations
+
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.management.routes import iter_role_routes, sample_users
+
+# Non-router GET routes exercised for every role.  Login, refresh, signup and
+# logout are writes with side effects (token rows, password hashing) and are
+# deliberately left out.
+EXTRA_ROUTES = ["auth/me"]
+
+
+def summarize(samples: list[float], queries: int, size: int) -> dict:
+    ordered = sorted(samples)
+    if len(ordered) > 1:
+        percentiles = statistics.quantiles(ordered, n=100, method="inclusive")
+        p50, p95 = percentiles[49], percentiles[94]
+    else:
+        p50 = p95 = ordered[0]
+    total = sum(ordered)
+    return {
+        "iterations": len(ordered),
+        "p50_ms": round(p50 * 1000, 3),
+        "p95_ms": round(p95 * 1000, 3),
+        "mean_ms": round(total / len(ordered) * 1000, 3),
+        "throughput_rps": round(len(ordered) / total, 2) if total else None,
+        "queries": queries,
+        "response_bytes": size,
+    }
+
+
+class Command(BaseCommand):
+    help = "Benchmark every GET route in core/urls.py under each role and store the results as JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--endpoint", action="append", default=[], help="Limit to these URL prefixes.")
+        parser.add_argument("--output", help="Result file (default: benchmarks/endpoints-<timestamp>.json).")
+        parser.add_argument("--compare", help="Earlier result file to diff against.")
+
+    def handle(self, *args, **options):
+        users = sample_users()
+        if not users:
+            raise CommandError("No staff users found; seed data first (manage.py seed_synthetic).")
+        if options["iterations"] < 1:
+            raise CommandError("--iterations must be at least 1.")
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for role, user, path in self.routes(users, options["endpoint"]):
+                client = APIClient()
+                client.force_authenticate(user)
+                result = self.measure(client, f"/api/{path}/", options["iterations"], options["warmup"])
+                result.update({"route": f"{path}/", "role": role})
+                results.append(result)
+                self.stdout.write(
+                    f"{result['route']:<28} {role:<13} status={result['status']} "
+                    f"p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+                    f"rps={result['throughput_rps']} queries={result['queries']}"
+                )
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "iterations": options["iterations"],
+            "results": results,
+        }
+        output = Path(options["output"] or f"benchmarks/endpoints-{timezone.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+        if options["compare"]:
+            self.compare(json.loads(Path(options["compare"]).read_text()), report)
+
+    def routes(self, users, endpoints):
+        """Yield ``(role, user, path)`` for list routes, one detail route each, and extras."""
+
+        client = APIClient()
+        for prefix, _viewset, role, user in iter_role_routes(users, endpoints):
+            yield role, user, prefix
+            client.force_authenticate(user)
+            response = client.get(f"/api/{prefix}/", {"page_size": 1})
+            rows = response.json().get("results", []) if response.status_code == 200 else []
+            if rows:
+                yield role, user, f"{prefix}/{rows[0]['id']}"
+        for path in EXTRA_ROUTES:
+            if endpoints and path not in endpoints:
+                continue
+            for role, user in users.items():
+                yield role, user, path
+
+    def measure(self, client: APIClient, url: str, iterations: int, warmup: int) -> dict:
+        for _ in range(warmup):
+            client.get(url)
+        samples = []
+        with CaptureQueriesContext(connection) as captured:
+            response = client.get(url)
+        # The captured slice is read lazily from a log each request resets.
+        query_count = len(captured)
+        for _ in range(iterations):
+            started = time.perf_counter()
+            response = client.get(url)
+            samples.append(time.perf_counter() - started)
+        result = summarize(samples, query_count, len(response.content))
+        result["status"] = response.status_code
+        return result
+
+    def compare(self, baseline: dict, current: dict) -> None:
+        previous = {(row["route"], row["role"]): row for row in baseline.get("results", [])}
+        self.stdout.write("")
+        self.stdout.write(f"Compared with run from {baseline.get('created_at', '?')}:")
+        for row in current["results"]:
+            before = previous.get((row["route"], row["role"]))
+            if before is None:
+                continue
+            delta = row["p50_ms"] - before["p50_ms"]
+            change = delta / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+            self.stdout.write(
+                f"{row['route']:<28} {row['role']:<13} p50 {before['p50_ms']:.1f} -> {row['p50_ms']:.1f}ms "
+                f"({change:+.0f}%) queries {before['queries']} -> {row['queries']}"
+            )
@@ -0,0 +1,141 @@
+"""Insert throughput and unique-index size: timestamp+random record numbers vs sequence-allocated ones."""
+from __future__ import annotations
+
+import json
+import time
+import uuid
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import identifiers
+from core.models import IdentifierSequence
+
+TABLE = "core_identifier_benchmark"
+INDEX = "core_identifier_benchmark_number"
+SEQUENCE = "benchmark"
+
+
+def random_number() -> str:
+    """The scheme ``generate_case_number`` used before sequences."""
+
+    return f"CASE-{timezone.now():%Y%m%d%H%M%S}-{uuid.uuid4().hex[:6].upper()}"
+
+
+class Command(BaseCommand):
+    help = (
+        "Insert rows one statement at a time into a scratch table with a unique index on the number, once with "
+        "timestamp+random numbers and once with sequence-allocated ones, and compare throughput and index size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=20000, help="Rows inserted per scheme.")
+        parser.add_argument("--batch", type=int, default=100, help="Rows per transaction.")
+        parser.add_argument("--output", help="Result file (default: benchmarks/identifiers-<timestamp>.json).")
+
+    def handle(self, *args, **options):
+        if options["rows"] < 1 or options["batch"] < 1:
+            raise CommandError("--rows and --batch must be at least 1.")
+
+        sequential = identifiers.BlockAllocator(SEQUENCE)
+        results = [
+            self.run("random", random_number, options["rows"], options["batch"]),
+            self.run(
+                "sequence",
+                lambda: identifiers.format_number("CASE", sequential.allocate()),
+                options["rows"],
+                options["batch"],
+            ),
+        ]
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "block_size": identifiers.BLOCK_SIZE if connection.vendor == "postgresql" else 1,
+            "batch": options["batch"],
+            "results": results,
+        }
+        output = Path(options["output"] or f"benchmarks/identifiers-{timezone.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+    def run(self, scheme: str, generate, rows: int, batch: int) -> dict:
+        table = connection.ops.quote_name(TABLE)
+        primary_key = "bigserial" if connection.vendor == "postgresql" else "integer"
+        insert = f"INSERT INTO {table} (number) VALUES (%s) ON CONFLICT (number) DO NOTHING"
+        self.create_sequence()
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            cursor.execute(f"CREATE TABLE {table} (id {primary_key} PRIMARY KEY, number varchar(64) NOT NULL)")
+            cursor.execute(f"CREATE UNIQUE INDEX {INDEX} ON {table} (number)")
+        try:
+            collisions = 0
+            started = time.perf_counter()
+            for offset in range(0, rows, batch):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    for _ in range(min(batch, rows - offset)):
+                        cursor.execute(insert, [generate()])
+                        collisions += cursor.rowcount == 0
+            seconds = time.perf_counter() - started
+            size, leaf_density = self.index_stats()
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {table}")
+            self.drop_sequence()
+
+        result = {
+            "scheme": scheme,
+            "rows": rows,
+            "seconds": round(seconds, 3),
+            "rows_per_s": round(rows / seconds) if seconds else None,
+            "collisions": collisions,
+            "index_bytes": size,
+            "index_leaf_density": leaf_density,
+        }
+        self.stdout.write(
+            f"{scheme:<9} {result['rows_per_s']} rows/s  collisions={collisions}  "
+            f"index={size} bytes  leaf density={leaf_density}"
+        )
+        return result
+
+    @staticmethod
+    def index_stats() -> tuple[int | None, float | None]:
+        """Index size in bytes and percent of leaf space in use, where the database can tell."""
+
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SELECT pg_relation_size(%s)", [INDEX])
+                size = cursor.fetchone()[0]
+                cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pgstattuple'")
+                if cursor.fetchone() is None:
+                    return size, None
+                cursor.execute("SELECT avg_leaf_density FROM pgstatindex(%s)", [INDEX])
+                return size, cursor.fetchone()[0]
+            if connection.vendor == "sqlite":
+                try:
+                    cursor.execute("SELECT SUM(pgsize), SUM(unused) FROM dbstat WHERE name = %s", [INDEX])
+                except Exception:
+                    # SQLite built without SQLITE_ENABLE_DBSTAT_VTAB.
+                    return None, None
+                size, unused = cursor.fetchone()
+                return size, round(100 * (size - unused) / size, 2) if size else None
+        return None, None
+
+    @staticmethod
+    def create_sequence() -> None:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE SEQUENCE IF NOT EXISTS {identifiers.sequence_name(SEQUENCE)} "
+                    f"INCREMENT BY {identifiers.BLOCK_SIZE} MINVALUE 1 START 1"
+                )
+
+    @staticmethod
+    def drop_sequence() -> None:
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP SEQUENCE IF EXISTS {identifiers.sequence_name(SEQUENCE)}")
+        else:
+            IdentifierSequence.objects.filter(name=SEQUENCE).delete()
@@ -0,0 +1,110 @@
+"""Rows per second of list serialization: model serializers + JSONRenderer vs ``.values()`` + orjson."""
+from __future__ import annotations
+
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.management.routes import sample_users
+from core.models import User
+from core.renderers import ORJSONRenderer
+from core.views import AppointmentViewSet, PatientViewSet, PrescriptionViewSet
+
+VIEWSETS = {"patients": PatientViewSet, "appointments": AppointmentViewSet, "prescriptions": PrescriptionViewSet}
+
+
+def timed(function):
+    started = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - started
+
+
+def timings(rows: list, fetch: float, serialize: float, render: float, body: bytes) -> dict:
+    total = fetch + serialize + render
+    return {"rows": len(rows), "fetch": fetch, "serialize": serialize, "render": render, "total": total, "body": body}
+
+
+class Command(BaseCommand):
+    help = "Compare instance-based and values()-based list serialization for the fast-path serializers."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=5000, help="Rows serialized per run.")
+        parser.add_argument("--repeat", type=int, default=3, help="Runs per path; the best one is reported.")
+        parser.add_argument("--endpoint", action="append", default=[], choices=sorted(VIEWSETS))
+        parser.add_argument("--output", help="Result file (default: benchmarks/serializers-<timestamp>.json).")
+
+    def handle(self, *args, **options):
+        admin = sample_users().get(User.Role.ADMIN)
+        if admin is None:
+            raise CommandError("No admin user found; seed data first (manage.py seed_synthetic).")
+        if options["rows"] < 1 or options["repeat"] < 1:
+            raise CommandError("--rows and --repeat must be at least 1.")
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name in options["endpoint"] or sorted(VIEWSETS):
+                results.append(self.compare(name, admin, options["rows"], options["repeat"]))
+
+        report = {
+            "created_at": timezone.now().isoformat(),
+            "database": connection.vendor,
+            "repeat": options["repeat"],
+            "results": results,
+        }
+        output = Path(options["output"] or f"benchmarks/serializers-{timezone.now():%Y%m%d-%H%M%S}.json")
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(report, indent=2))
+        self.stdout.write(self.style.SUCCESS(f"Wrote {output}"))
+
+    def compare(self, name: str, admin: User, limit: int, repeat: int) -> dict:
+        view = self.view(VIEWSETS[name], admin)
+        before = min((self.instance_path(view, limit) for _ in range(repeat)), key=lambda run: run["total"])
+        after = min((self.values_path(view, limit) for _ in range(repeat)), key=lambda run: run["total"])
+        if before.pop("body") != after.pop("body"):
+            raise CommandError(f"{name}: the values() path rendered different bytes than the serializer.")
+        rows = after.pop("rows")
+        before.pop("rows")
+        result = {
+            "endpoint": name,
+            "rows": rows,
+            "before_ms": {step: round(seconds * 1000, 2) for step, seconds in before.items()},
+            "after_ms": {step: round(seconds * 1000, 2) for step, seconds in after.items()},
+            "before_rows_per_s": round(rows / before["total"]) if before["total"] else None,
+            "after_rows_per_s": round(rows / after["total"]) if after["total"] else None,
+        }
+        self.stdout.write(
+            f"{name:<14} rows={rows:<6} before={result['before_rows_per_s']} rows/s "
+            f"after={result['after_rows_per_s']} rows/s  ms {result['before_ms']} -> {result['after_ms']}"
+        )
+        return result
+
+    @staticmethod
+    def view(viewset: type, user: User):
+        request = Request(APIRequestFactory().get("/api/"))
+        request.user = user
+        return viewset(action="list", request=request, format_kwarg=None, args=(), kwargs={})
+
+    @staticmethod
+    def instance_path(view, limit: int) -> dict:
+        queryset = view.filter_queryset(view.get_queryset())[:limit]
+        rows, fetch = timed(lambda: list(queryset))
+        data, serialize = timed(lambda: view.get_serializer(rows, many=True).data)
+        body, render = timed(lambda: JSONRenderer().render(data))
+        return timings(rows, fetch, serialize, render, body)
+
+    @staticmethod
+    def values_path(view, limit: int) -> dict:
+        queryset, represent = view.list_rows()
+        rows, fetch = timed(lambda: list(queryset[:limit]))
+        data, serialize = timed(lambda: represent(rows))
+        body, render = timed(lambda: ORJSONRenderer().render(data))
+        return timings(rows, fetch, serialize, render, body)
@@ -0,0 +1,78 @@
+"""Move existing attachment files into content-addressed blobs, dropping duplicates."""
+from __future__ import annotations
+
+import mimetypes
+from collections import Counter
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from core import blobs
+from core.attachments import download_filename
+from core.models import Blob
+
+
+class Command(BaseCommand):
+    help = "Hash attachments stored under their upload_to paths into shared blobs and delete the files they replace."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=200)
+        parser.add_argument("--dry-run", action="store_true", help="Only report how much would be reclaimed.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be >= 1.")
+        stats: Counter = Counter()
+        seen: set[str] = set()
+        for model in blobs.ATTACHMENT_MODELS:
+            last_id = 0
+            while True:
+                batch = list(model.objects.filter(blob__isnull=True, pk__gt=last_id).order_by("pk")[: options["batch_size"]])
+                if not batch:
+                    break
+                last_id = batch[-1].pk
+                for attachment in batch:
+                    self.dedupe(attachment, stats, seen, options["dry_run"])
+        verb = "Would reclaim" if options["dry_run"] else "Reclaimed"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{stats['hashed']} attachments hashed, {stats['duplicates']} duplicates. "
+                f"{verb} {stats['reclaimed']} bytes. {stats['missing']} rows skipped with missing files."
+            )
+        )
+
+    def dedupe(self, attachment, stats: Counter, seen: set[str], dry_run: bool) -> None:
+        old_name = attachment.file.name
+        if not old_name or not default_storage.exists(old_name):
+            stats["missing"] += 1
+            return
+        size = default_storage.size(old_name)
+        with default_storage.open(old_name, "rb") as handle:
+            digest = blobs.sha256_of(handle)
+            stats["hashed"] += 1
+            duplicate = digest in seen or Blob.objects.filter(sha256=digest).exists()
+            seen.add(digest)
+            if duplicate:
+                stats["duplicates"] += 1
+                stats["reclaimed"] += size
+            if dry_run:
+                return
+            try:
+                local_path = default_storage.path(old_name)
+            except NotImplementedError:
+                local_path = None
+            with transaction.atomic():
+                # The blob is linked (or copied) before the row moves and the old
+                # file goes only after commit, so a crash never leaves a dangling row.
+                blob = blobs.acquire(digest, size, handle, local_path=local_path)
+                attachment.filename = attachment.filename or download_filename(attachment)
+                attachment.content_type = attachment.content_type or mimetypes.guess_type(attachment.filename)[0] or ""
+                attachment.size = size
+                attachment.blob = blob
+                attachment.file.name = blob.name
+                attachment.save(update_fields=["filename", "content_type", "size", "blob", "file"])
+                blobs.adjust_refcount(blob.pk, 1)
+                # Rows copied outside the app may still share the old file.
+                if not any(model.objects.filter(file=old_name).exists() for model in blobs.ATTACHMENT_MODELS):
+                    transaction.on_commit(lambda: default_storage.delete(old_name))
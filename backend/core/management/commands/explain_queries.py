@@ -0,0 +1,83 @@
+"""Run EXPLAIN on every role-scoped list query and check the planned indexes."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.management.routes import iter_role_routes, sample_users
+from core.models import User
+
+# (url prefix, role) -> index names we expect the planner to pick for the list query.
+EXPECTED_INDEXES: dict[tuple[str, str], tuple[str, ...]] = {
+    ("patients", User.Role.ADMIN): ("patient_name_idx",),
+    ("patients", User.Role.DOCTOR): ("patient_doctor_name_idx",),
+    ("patients", User.Role.RECEPTIONIST): ("patient_creator_name_idx",),
+    ("cases", User.Role.ADMIN): ("case_recent_idx",),
+    ("cases", User.Role.DOCTOR): ("case_access_doctor_case_reason_uniq",),
+    ("cases", User.Role.RECEPTIONIST): ("case_creator_recent_idx",),
+    ("prescriptions", User.Role.ADMIN): ("rx_recent_idx",),
+    # UNION of the prescriber branch (either doctor index) and the CaseAccess semi-join branch.
+    ("prescriptions", User.Role.DOCTOR): (
+        "rx_doctor_recent_idx",
+        "core_prescription_doctor_id",
+        "case_access_doctor_case_reason_uniq",
+    ),
+    ("prescriptions", User.Role.RECEPTIONIST): ("case_creator_recent_idx",),
+    ("appointments", User.Role.ADMIN): ("appt_recent_idx",),
+    ("appointments", User.Role.DOCTOR): ("appt_doctor_recent_idx",),
+    ("appointments", User.Role.RECEPTIONIST): ("appt_creator_recent_idx",),
+    ("admin/patients", User.Role.ADMIN): ("patient_name_idx",),
+}
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN each role/endpoint list query against the current data and report index usage."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--analyze", action="store_true", help="Run EXPLAIN ANALYZE (Postgres only).")
+        parser.add_argument("--show-plan", action="store_true", help="Print the full plan for every query.")
+        parser.add_argument("--endpoint", action="append", default=[], help="Limit to these URL prefixes.")
+
+    def handle(self, *args, **options):
+        users = sample_users()
+        if not users:
+            raise CommandError("No staff users found; seed data first (manage.py seed_synthetic).")
+
+        explain_options = {}
+        if options["analyze"] and connection.vendor == "postgresql":
+            explain_options = {"analyze": True, "buffers": True}
+
+        missing = 0
+        for prefix, role, queryset in self.role_querysets(users, options["endpoint"]):
+            plan = queryset.explain(**explain_options)
+            expected = EXPECTED_INDEXES.get((prefix, role), ())
+            used = [name for name in expected if name in plan]
+            if expected and not used:
+                missing += 1
+                verdict = self.style.WARNING("MISSING")
+            elif expected:
+                verdict = self.style.SUCCESS("used")
+            else:
+                verdict = "n/a"
+            self.stdout.write(f"{prefix:<16} {role:<13} {verdict:<8} expected={','.join(expected) or '-'}")
+            if options["show_plan"]:
+                self.stdout.write(plan)
+                self.stdout.write("")
+
+        if missing:
+            self.stdout.write(self.style.WARNING(f"{missing} queries did not use their planned index."))
+
+    def role_querysets(self, users: dict[str, User], endpoints: list[str]):
+        factory = APIRequestFactory()
+        for prefix, viewset, role, user in iter_role_routes(users, endpoints):
+            request = Request(factory.get(f"/api/{prefix}/"))
+            request.user = user
+            view = viewset(action="list", request=request, format_kwarg=None, args=(), kwargs={})
+            queryset = view.get_queryset()
+            paginator = view.paginator
+            if paginator is not None:
+                ordering = paginator.get_ordering(request, queryset, view)
+                queryset = queryset.order_by(*ordering)[: paginator.get_page_size(request)]
+            yield prefix, role, queryset
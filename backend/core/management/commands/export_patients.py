@@ -0,0 +1,52 @@
+"""Stream complete patient bundles (cases, prescriptions, attachment metadata, appointments) to NDJSON or CSV."""
+from __future__ import annotations
+
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import exports
+from core.models import Doctor, Receptionist
+
+
+class Command(BaseCommand):
+    help = (
+        "Export every patient with their cases, assigned doctors, prescriptions, attachment metadata and "
+        "appointments, one NDJSON line (or CSV rows) per patient in id order. Resume with --after <last patient id>."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--output", default="-", help="File to write; '-' (default) writes standard output.")
+        parser.add_argument("--format", choices=sorted(exports.FORMATS), help="Default: from --output, else ndjson.")
+        parser.add_argument("--after", type=int, help="Start after this patient id.")
+        parser.add_argument("--doctor", help="Only this doctor's patients (username).")
+        parser.add_argument("--receptionist", help="Only the patients this receptionist registered (username).")
+        parser.add_argument("--chunk-size", type=int, default=exports.DEFAULT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options["chunk_size"] < 1:
+            raise CommandError("--chunk-size must be at least 1.")
+        file_format = options["format"] or (options["output"].lower().endswith(".csv") and "csv") or "ndjson"
+        doctor = receptionist = None
+        if options["doctor"]:
+            doctor = Doctor.objects.filter(user__username=options["doctor"]).first()
+            if doctor is None:
+                raise CommandError(f"No doctor with username {options['doctor']!r}.")
+        if options["receptionist"]:
+            receptionist = Receptionist.objects.filter(user__username=options["receptionist"]).first()
+            if receptionist is None:
+                raise CommandError(f"No receptionist with username {options['receptionist']!r}.")
+
+        queryset = exports.patients_to_export(after=options["after"], doctor=doctor, receptionist=receptionist)
+        try:
+            output = sys.stdout.buffer if options["output"] == "-" else open(options["output"], "wb")
+        except OSError as exc:
+            raise CommandError(str(exc))
+        try:
+            for piece in exports.export(queryset, file_format, options["chunk_size"]):
+                output.write(piece)
+        finally:
+            if output is not sys.stdout.buffer:
+                output.close()
+        if output is not sys.stdout.buffer:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}"))
@@ -0,0 +1,27 @@
+"""Delete attachment blobs that no attachment references any more."""
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import blobs
+
+
+class Command(BaseCommand):
+    help = "Delete blobs whose refcount has been zero for longer than the grace period, with their files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--grace-hours", type=float, default=24)
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument(
+            "--recount", action="store_true", help="Recompute every refcount first (after writes that bypassed signals)."
+        )
+
+    def handle(self, *args, **options):
+        if options["grace_hours"] < 0 or options["batch_size"] < 1:
+            raise CommandError("--grace-hours must be >= 0 and --batch-size >= 1.")
+        if options["recount"]:
+            blobs.recount()
+        removed, freed = blobs.collect(timedelta(hours=options["grace_hours"]), options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} unreferenced blobs ({freed} bytes)."))
@@ -0,0 +1,55 @@
+"""Stream a CSV or NDJSON file of patients into the database in batches."""
+from __future__ import annotations
+
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import imports
+from core.models import Receptionist
+
+
+class Command(BaseCommand):
+    help = (
+        "Import patients from a CSV (header: first_name,last_name,date_of_birth,attending_doctor) or NDJSON file, "
+        "validating each batch and inserting it with bulk_create. Rejected lines are written as NDJSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to import; '-' reads standard input.")
+        parser.add_argument("--format", choices=sorted(set(imports.EXTENSIONS.values())), help="Default: from the extension.")
+        parser.add_argument("--batch-size", type=int, default=imports.DEFAULT_BATCH_SIZE)
+        parser.add_argument("--created-by", help="Username of the receptionist recorded as creator (default: none).")
+        parser.add_argument("--errors", help="Write rejected lines here instead of to stderr.")
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        file_format = options["format"] or imports.detect_format(options["path"])
+        if file_format is None:
+            raise CommandError("Cannot tell the format from the file name; pass --format.")
+        created_by = None
+        if options["created_by"]:
+            created_by = Receptionist.objects.filter(user__username=options["created_by"]).first()
+            if created_by is None:
+                raise CommandError(f"No receptionist with username {options['created_by']!r}.")
+
+        try:
+            source = sys.stdin.buffer if options["path"] == "-" else open(options["path"], "rb")
+            errors = open(options["errors"], "w") if options["errors"] else self.stderr
+        except OSError as exc:
+            raise CommandError(str(exc))
+        report = imports.ImportReport(
+            error_limit=0,
+            on_error=lambda line, detail: errors.write(json.dumps({"line": line, "errors": detail}) + "\n"),
+        )
+        try:
+            with source:
+                imports.import_patients(source, file_format, created_by, options["batch_size"], report)
+        except imports.ImportFileError as exc:
+            raise CommandError(f"{exc} ({report.created} patients imported before it)")
+        finally:
+            if errors is not self.stderr:
+                errors.close()
+        self.stdout.write(self.style.SUCCESS(f"Imported {report.created} patients; rejected {report.failed} lines."))
@@ -0,0 +1,23 @@
+"""Remove expired JWT outstanding/blacklisted tokens in small batches."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from core.tokens import purge_expired_tokens
+
+
+class Command(BaseCommand):
+    help = "Delete expired outstanding and blacklisted refresh tokens without long locks on the auth tables."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--pause", type=float, default=0.05, help="Seconds to sleep between batches.")
+        parser.add_argument("--max-batches", type=int, default=None)
+
+    def handle(self, *args, **options):
+        removed = purge_expired_tokens(
+            batch_size=options["batch_size"],
+            pause=options["pause"],
+            max_batches=options["max_batches"],
+        )
+        self.stdout.write(self.style.SUCCESS(f"Removed {removed} expired tokens."))
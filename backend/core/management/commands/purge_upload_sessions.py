@@ -0,0 +1,53 @@
+"""Delete abandoned attachment upload sessions and their partial files."""
+from __future__ import annotations
+
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete upload sessions idle for longer than UPLOAD_SESSION_TTL_HOURS, plus orphaned partial files."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=None, help="Override UPLOAD_SESSION_TTL_HOURS.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        hours = settings.UPLOAD_SESSION_TTL_HOURS if options["hours"] is None else options["hours"]
+        if hours < 0 or options["batch_size"] < 1:
+            raise CommandError("--hours must be >= 0 and --batch-size >= 1.")
+        cutoff = timezone.now() - timedelta(hours=hours)
+        removed = 0
+        while True:
+            sessions = list(UploadSession.objects.filter(updated_at__lt=cutoff).order_by("updated_at")[: options["batch_size"]])
+            if not sessions:
+                break
+            for session in sessions:
+                session.partial_path.unlink(missing_ok=True)
+            UploadSession.objects.filter(pk__in=[session.pk for session in sessions]).delete()
+            removed += len(sessions)
+            if len(sessions) < options["batch_size"]:
+                break
+
+        # Partial files whose session went with its case or prescription.
+        orphans = 0
+        partial_dir = Path(settings.ATTACHMENT_PARTIAL_DIR)
+        if partial_dir.is_dir():
+            stale = [path for path in partial_dir.glob("*.part") if path.stat().st_mtime < cutoff.timestamp()]
+            live = {
+                str(pk)
+                for pk in UploadSession.objects.filter(pk__in=[path.stem for path in stale]).values_list("pk", flat=True)
+            }
+            for path in stale:
+                if path.stem not in live:
+                    path.unlink(missing_ok=True)
+                    orphans += 1
+        self.stdout.write(
+            self.style.SUCCESS(f"Removed {removed} upload sessions and {orphans} orphaned partial files older than {hours}h.")
+        )
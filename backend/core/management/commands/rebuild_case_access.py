@@ -0,0 +1,25 @@
+"""Backfill or verify the denormalized doctor -> case access table."""
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import access
+
+
+class Command(BaseCommand):
+    help = "Reconcile CaseAccess with case assignments and attending doctors."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="Report drift without writing; exit non-zero if any.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        missing, stale = access.rebuild(batch_size=options["batch_size"], apply=not options["check"])
+        if options["check"]:
+            if missing or stale:
+                raise CommandError(f"CaseAccess is out of date: {missing} missing and {stale} stale rows.")
+            self.stdout.write(self.style.SUCCESS("CaseAccess is consistent."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Added {missing} and removed {stale} CaseAccess rows."))
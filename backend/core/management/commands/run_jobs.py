@@ -0,0 +1,55 @@
+"""Run queued background jobs (see ``core.jobs``) on a pool of threads, optionally in several processes."""
+from __future__ import annotations
+
+import multiprocessing
+import signal
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from core.jobs import Worker
+
+
+class Command(BaseCommand):
+    help = "Claim and run background jobs until SIGINT/SIGTERM; with --burst, until no job is due."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=settings.JOB_WORKER_THREADS, help="Threads per process.")
+        parser.add_argument("--processes", type=int, default=settings.JOB_WORKER_PROCESSES)
+        parser.add_argument("--poll-interval", type=float, default=settings.JOB_POLL_INTERVAL_SECONDS)
+        parser.add_argument("--burst", action="store_true", help="Exit once the queue has no due jobs.")
+
+    def handle(self, *args, **options):
+        if options["threads"] < 1 or options["processes"] < 1:
+            raise CommandError("--threads and --processes must be at least 1.")
+        worker = Worker(options["threads"], options["poll_interval"], options["burst"])
+        stop = threading.Event()
+        previous = {sig: signal.signal(sig, lambda *_: stop.set()) for sig in (signal.SIGINT, signal.SIGTERM)}
+        try:
+            if options["processes"] == 1:
+                worker.run(stop)
+            else:
+                self.run_processes(worker, stop, options["processes"])
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+
+    @staticmethod
+    def run_processes(worker: Worker, stop: threading.Event, count: int) -> None:
+        # Forked children must open their own connections.
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+        children = [context.Process(target=worker.run, args=(stop,)) for _ in range(count)]
+        for child in children:
+            child.start()
+        while any(child.is_alive() for child in children):
+            if stop.wait(1.0):
+                # Each child stops after its running jobs, on its own copy of the handler.
+                for child in children:
+                    if child.is_alive():
+                        child.terminate()
+                break
+        for child in children:
+            child.join()
@@ -0,0 +1,262 @@
+"""Bulk-generate a production-sized synthetic dataset."""
+from __future__ import annotations
+
+import itertools
+import math
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from core import identifiers
+from core.models import (
+    Appointment,
+    Case,
+    CaseAccess,
+    CaseAttachment,
+    Doctor,
+    Patient,
+    Prescription,
+    PrescriptionAttachment,
+    Receptionist,
+    User,
+)
+
+FIRST_NAMES = [
+    "Ada", "Alan", "Amara", "Ben", "Carmen", "Chen", "Dara", "Elena", "Farah", "Gus",
+    "Hana", "Ivan", "Jade", "Kofi", "Lena", "Malik", "Nia", "Omar", "Priya", "Quinn",
+    "Rosa", "Sven", "Tara", "Uma", "Victor", "Wen", "Ximena", "Yusuf", "Zoe",
+]
+LAST_NAMES = [
+    "Adams", "Baker", "Chen", "Diaz", "Evans", "Fischer", "Garcia", "Haddad", "Ito", "Jensen",
+    "Khan", "Lopez", "Miller", "Nguyen", "Okafor", "Patel", "Quist", "Rossi", "Smith", "Tanaka",
+    "Usman", "Varga", "Wang", "Xu", "Yilmaz", "Zimmer",
+]
+SPECIALTIES = ["General Practice", "Cardiology", "Dermatology", "Neurology", "Oncology", "Orthopedics", "Pediatrics"]
+CASE_NAMES = ["Migraine", "Hypertension", "Fracture", "Rash", "Follow-up", "Diabetes review", "Chest pain", "Check-up"]
+APPOINTMENT_STATUSES = ["PENDING", "IN_PROGRESS", "COMPLETED", "CANCELLED"]
+APPOINTMENT_STATUS_WEIGHTS = [0.25, 0.05, 0.6, 0.1]
+
+
+def zipf_cum_weights(count: int, exponent: float) -> list[float]:
+    """Cumulative Zipf weights so a few doctors/patients get most of the traffic."""
+
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+
+class Command(BaseCommand):
+    help = "Bulk-generate doctors, receptionists, patients, cases, prescriptions, attachments and appointments."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--doctors", type=int, default=200)
+        parser.add_argument("--receptionists", type=int, default=50)
+        parser.add_argument("--patients", type=int, default=100_000)
+        parser.add_argument("--cases", type=int, default=1_000_000)
+        parser.add_argument("--prescriptions-per-case", type=float, default=1.2)
+        parser.add_argument("--attachments-per-case", type=float, default=0.3)
+        parser.add_argument("--appointments", type=int, default=300_000)
+        parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for doctor/patient popularity.")
+        parser.add_argument("--batch-size", type=int, default=5_000)
+        parser.add_argument("--password", default="securePass123", help="Password shared by all generated staff.")
+        parser.add_argument("--prefix", default="synthetic", help="Username prefix for generated staff.")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if options["doctors"] < 1 or options["receptionists"] < 1 or options["patients"] < 1:
+            raise CommandError("At least one doctor, receptionist and patient is required.")
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.skew = options["skew"]
+        self.run = timezone.now().strftime("%Y%m%d%H%M%S")
+        started = time.perf_counter()
+
+        doctor_ids, receptionist_ids = self.create_staff(options)
+        self.log(f"staff: {len(doctor_ids)} doctors, {len(receptionist_ids)} receptionists", started)
+        patients = self.create_patients(options["patients"], doctor_ids, receptionist_ids)
+        self.log(f"patients: {len(patients)}", started)
+        case_count = self.create_cases(options, patients, doctor_ids)
+        self.log(f"cases: {case_count} with prescriptions and attachments", started)
+        appointment_count = self.create_appointments(options["appointments"], patients)
+        self.log(f"appointments: {appointment_count}", started)
+
+    def log(self, message: str, started: float) -> None:
+        self.stdout.write(f"[{time.perf_counter() - started:8.1f}s] {message}")
+
+    def batched(self, iterable, size: int | None = None):
+        iterator = iter(iterable)
+        while batch := list(itertools.islice(iterator, size or self.batch_size)):
+            yield batch
+
+    def create_staff(self, options) -> tuple[list[int], list[int]]:
+        password = make_password(options["password"])
+        prefix = options["prefix"]
+        users = []
+        for role, count in ((User.Role.DOCTOR, options["doctors"]), (User.Role.RECEPTIONIST, options["receptionists"])):
+            for index in range(count):
+                users.append(
+                    User(
+                        username=f"{prefix}-{role.lower()}-{self.run}-{index}",
+                        password=password,
+                        first_name=self.rng.choice(FIRST_NAMES),
+                        last_name=self.rng.choice(LAST_NAMES),
+                        role=role,
+                    )
+                )
+        with transaction.atomic():
+            users = User.objects.bulk_create(users, batch_size=self.batch_size)
+            doctors = Doctor.objects.bulk_create(
+                [
+                    Doctor(user=user, specialty=self.rng.choice(SPECIALTIES), license_number=f"LIC-{user.username}")
+                    for user in users
+                    if user.role == User.Role.DOCTOR
+                ],
+                batch_size=self.batch_size,
+            )
+            receptionists = Receptionist.objects.bulk_create(
+                [
+                    Receptionist(user=user, desk_number=str(index % 20 + 1))
+                    for index, user in enumerate(users)
+                    if user.role == User.Role.RECEPTIONIST
+                ],
+                batch_size=self.batch_size,
+            )
+        return [doctor.id for doctor in doctors], [receptionist.id for receptionist in receptionists]
+
+    def create_patients(self, count: int, doctor_ids: list[int], receptionist_ids: list[int]) -> list[tuple[int, int, int | None]]:
+        """Return ``(patient_id, attending_doctor_id, created_by_id)`` for every new patient."""
+
+        doctor_weights = zipf_cum_weights(len(doctor_ids), self.skew)
+        today = date.today()
+        patients: list[tuple[int, int, int | None]] = []
+        for batch in self.batched(range(count)):
+            rows = [
+                Patient(
+                    first_name=self.rng.choice(FIRST_NAMES),
+                    last_name=self.rng.choice(LAST_NAMES),
+                    date_of_birth=today - timedelta(days=self.rng.randint(365, 365 * 95)),
+                    attending_doctor_id=self.rng.choices(doctor_ids, cum_weights=doctor_weights)[0],
+                    created_by_id=self.rng.choice(receptionist_ids),
+                )
+                for _ in batch
+            ]
+            with transaction.atomic():
+                Patient.objects.bulk_create(rows)
+            patients.extend((row.id, row.attending_doctor_id, row.created_by_id) for row in rows)
+        return patients
+
+    def create_cases(self, options, patients: list[tuple[int, int, int | None]], doctor_ids: list[int]) -> int:
+        patient_weights = zipf_cum_weights(len(patients), 0.6)
+        doctor_weights = zipf_cum_weights(len(doctor_ids), self.skew)
+        assignment_model = Case.assigned_doctors.through
+        prescriptions_per_case = options["prescriptions_per_case"]
+        attachments_per_case = options["attachments_per_case"]
+        created = 0
+        for batch in self.batched(range(options["cases"])):
+            picks = self.rng.choices(patients, cum_weights=patient_weights, k=len(batch))
+            # bulk_create skips the save() that numbers records, so each batch reserves its numbers at once.
+            numbers = identifiers.next_numbers("case", len(picks))
+            cases = [
+                Case(
+                    case_number=number,
+                    name=self.rng.choice(CASE_NAMES),
+                    description="Synthetic case",
+                    symptoms="Synthetic symptoms",
+                    patient_id=patient_id,
+                    created_by_id=created_by_id,
+                )
+                for number, (patient_id, _doctor_id, created_by_id) in zip(numbers, picks)
+            ]
+            with transaction.atomic():
+                Case.objects.bulk_create(cases)
+                assignments = []
+                access = []
+                prescriptions = []
+                attachments = []
+                for case, (patient_id, attending_id, _created_by_id) in zip(cases, picks):
+                    assigned = {attending_id}
+                    # Most cases stay with the attending doctor; some pull in specialists.
+                    if self.rng.random() < 0.3:
+                        assigned.update(self.rng.choices(doctor_ids, cum_weights=doctor_weights, k=self.rng.randint(1, 2)))
+                    assignments.extend(assignment_model(case_id=case.id, doctor_id=doctor_id) for doctor_id in assigned)
+                    # bulk_create skips the signals that normally maintain CaseAccess.
+                    access.append(CaseAccess(case_id=case.id, doctor_id=attending_id, reason=CaseAccess.Reason.ATTENDING))
+                    access.extend(
+                        CaseAccess(case_id=case.id, doctor_id=doctor_id, reason=CaseAccess.Reason.ASSIGNED)
+                        for doctor_id in assigned
+                    )
+                    for _ in range(self.poisson(prescriptions_per_case)):
+                        prescriptions.append(
+                            Prescription(
+                                case_id=case.id,
+                                doctor_id=self.rng.choice(tuple(assigned)),
+                                patient_id=patient_id,
+                                details="Synthetic prescription",
+                            )
+                        )
+                    for index in range(self.poisson(attachments_per_case)):
+                        attachments.append(
+                            CaseAttachment(
+                                case_id=case.id,
+                                file=f"cases/{case.case_number}/synthetic-{index}.pdf",
+                                label="Synthetic scan",
+                            )
+                        )
+                assignment_model.objects.bulk_create(assignments, ignore_conflicts=True)
+                CaseAccess.objects.bulk_create(access, ignore_conflicts=True)
+                numbers = identifiers.next_numbers("prescription", len(prescriptions))
+                for prescription, number in zip(prescriptions, numbers):
+                    prescription.prescription_number = number
+                Prescription.objects.bulk_create(prescriptions)
+                CaseAttachment.objects.bulk_create(attachments)
+                PrescriptionAttachment.objects.bulk_create(
+                    [
+                        PrescriptionAttachment(
+                            prescription_id=prescription.id,
+                            file=f"prescriptions/{prescription.prescription_number}/synthetic.pdf",
+                            label="Synthetic label",
+                        )
+                        for prescription in prescriptions
+                        if self.rng.random() < attachments_per_case / 2
+                    ]
+                )
+            created += len(cases)
+        return created
+
+    def create_appointments(self, count: int, patients: list[tuple[int, int, int | None]]) -> int:
+        patient_weights = zipf_cum_weights(len(patients), 0.6)
+        now = timezone.now()
+        created = 0
+        for batch in self.batched(range(count)):
+            picks = self.rng.choices(patients, cum_weights=patient_weights, k=len(batch))
+            numbers = identifiers.next_numbers("appointment", len(picks))
+            rows = [
+                Appointment(
+                    appointment_number=number,
+                    patient_id=patient_id,
+                    doctor_id=doctor_id,
+                    created_by_id=created_by_id,
+                    status=self.rng.choices(APPOINTMENT_STATUSES, weights=APPOINTMENT_STATUS_WEIGHTS)[0],
+                    scheduled_at=now + timedelta(minutes=15 * self.rng.randint(-20_000, 5_000)),
+                )
+                for number, (patient_id, doctor_id, created_by_id) in zip(numbers, picks)
+            ]
+            with transaction.atomic():
+                Appointment.objects.bulk_create(rows)
+            created += len(rows)
+        return created
+
+    def poisson(self, mean: float) -> int:
+        """Small-mean Poisson sample (Knuth), good enough for per-case child counts."""
+
+        if mean <= 0:
+            return 0
+        limit = math.exp(-mean)
+        count, product = 0, self.rng.random()
+        while product > limit:
+            count += 1
+            product *= self.rng.random()
+        return count
@@ -0,0 +1,41 @@
+"""Helpers shared by the management commands that exercise the API per role."""
+from __future__ import annotations
+
+from typing import Iterator
+
+from core.models import User
+from core.permissions import IsAdmin
+from core.urls import admin_router, router
+
+PROFILE_FILTERS = {
+    User.Role.ADMIN: {},
+    User.Role.DOCTOR: {"doctor_profile__isnull": False},
+    User.Role.RECEPTIONIST: {"receptionist_profile__isnull": False},
+}
+
+
+def sample_users() -> dict[str, User]:
+    """Pick one active user per role, preferring the lowest id for repeatable runs."""
+
+    users = {}
+    for role, profile_filter in PROFILE_FILTERS.items():
+        user = User.objects.filter(role=role, is_active=True, **profile_filter).order_by("id").first()
+        if user is not None:
+            users[role] = user
+    return users
+
+
+def iter_role_routes(users: dict[str, User], endpoints: list[str] | None = None) -> Iterator[tuple[str, type, str, User]]:
+    """Yield ``(url prefix, viewset, role, user)`` for every router viewset a role may list."""
+
+    registries = [("", router.registry), ("admin/", admin_router.registry)]
+    for namespace, registry in registries:
+        for prefix, viewset, _basename in registry:
+            prefix = f"{namespace}{prefix}"
+            if endpoints and prefix not in endpoints:
+                continue
+            admin_only = IsAdmin in viewset.permission_classes
+            for role, user in users.items():
+                if admin_only and role != User.Role.ADMIN:
+                    continue
+                yield prefix, viewset, role, user
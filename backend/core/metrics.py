@@ -0,0 +1,377 @@
+"""In-process request metrics with file-based aggregation across workers.
+
+Each worker keeps cumulative counters in memory and periodically writes them to
+its own JSON file under ``METRICS_DIR``.  The metrics endpoint sums every
+worker's file, so totals stay monotonic across gunicorn workers and restarts
+without any shared memory or external service.
+
+A file is named after its process id and start time, so a new process that
+reuses a pid never overwrites a dead one's totals.  When the endpoint finds
+the file of a process on this host that is gone, the worker serving it
+claims the file and adds its totals to its own, so files do not pile up and
+the sums do not go backwards.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Callable, Iterator
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Background jobs wait and run far longer than requests.
+JOB_BUCKETS = (0.1, 0.5, 1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 3600.0)
+
+logger = logging.getLogger(__name__)
+
+
+class RequestStats:
+    """Mutable per-request accumulator shared by the middleware and serializers."""
+
+    __slots__ = ("view", "queries", "db_seconds", "serializer_seconds", "serializer_depth")
+
+    def __init__(self) -> None:
+        self.view = "unresolved"
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serializer_seconds = 0.0
+        self.serializer_depth = 0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request_metrics", default=None)
+
+
+@contextmanager
+def track_serializer() -> Iterator[None]:
+    """Attribute the wrapped block to serializer time; nested calls are counted once."""
+
+    stats = current_request.get()
+    if stats is None or stats.serializer_depth:
+        yield
+        return
+    stats.serializer_depth += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats.serializer_seconds += time.perf_counter() - started
+        stats.serializer_depth -= 1
+
+
+def install_query_timer(sender, connection, **kwargs) -> None:
+    """``connection_created`` receiver wrapping every connection with ``query_timer``.
+
+    Installed once per connection rather than per request: the async ORM runs
+    queries on other threads (so other connections), and ``current_request``
+    follows the request there while a per-thread wrapper would not.
+    """
+
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+
+def query_timer(execute, sql, params, many, context):
+    """``connection.execute_wrapper`` hook counting queries and their wall time."""
+
+    stats = current_request.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.queries += 1
+        stats.db_seconds += time.perf_counter() - started
+
+
+def empty_view_totals() -> dict:
+    return {
+        "count": 0,
+        "buckets": [0] * len(LATENCY_BUCKETS),
+        "latency_seconds": 0.0,
+        "db_queries": 0,
+        "db_seconds": 0.0,
+        "serializer_seconds": 0.0,
+        "response_bytes": 0,
+        "statuses": {},
+    }
+
+
+def empty_job_totals() -> dict:
+    return {"outcomes": {}, "wait_buckets": [0] * len(JOB_BUCKETS), "wait_seconds": 0.0, "run_seconds": 0.0, "count": 0}
+
+
+def add_view_totals(target: dict, totals: dict) -> None:
+    for key in ("count", "latency_seconds", "db_queries", "db_seconds", "serializer_seconds", "response_bytes"):
+        target[key] += totals[key]
+    target["buckets"] = [a + b for a, b in zip(target["buckets"], totals["buckets"])]
+    for status, count in totals["statuses"].items():
+        target["statuses"][status] = target["statuses"].get(status, 0) + count
+
+
+def add_job_totals(target: dict, totals: dict) -> None:
+    for key in ("count", "wait_seconds", "run_seconds"):
+        target[key] += totals[key]
+    target["wait_buckets"] = [a + b for a, b in zip(target["wait_buckets"], totals["wait_buckets"])]
+    for outcome, count in totals["outcomes"].items():
+        target["outcomes"][outcome] = target["outcomes"].get(outcome, 0) + count
+
+
+HAS_PROC = Path("/proc/self/stat").exists()
+
+
+def process_start(pid: int) -> str | None:
+    """Start time of process ``pid`` (clock ticks since boot, from /proc), or None if it is gone."""
+
+    try:
+        stat = Path(f"/proc/{pid}/stat").read_text()
+    except OSError:
+        return None
+    # The command name in parentheses may itself contain spaces; starttime is the 22nd field.
+    return stat.rsplit(")", 1)[1].split()[19]
+
+
+def process_alive(pid: int, start: str | None) -> bool:
+    if HAS_PROC and start is not None:
+        return process_start(pid) == start
+    # Without /proc (or a start time) only the pid can be checked; a reused one keeps the file.
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def bucket_index(buckets: tuple[float, ...], value: float) -> int | None:
+    for index, bound in enumerate(buckets):
+        if value <= bound:
+            return index
+    return None
+
+
+class MetricsRegistry:
+    """Cumulative per-view (and per-job) totals for this process, flushed to ``METRICS_DIR``."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._views: dict[str, dict] = {}
+        self._jobs: dict[str, dict] = {}
+        # Serializes snapshot writes, so an older snapshot never replaces a newer one.
+        self._write_lock = threading.Lock()
+        self._last_flush = 0.0
+        self._collectors: list[Callable[[list[dict]], list[str]]] = []
+        self._identity: dict | None = None
+
+    @property
+    def identity(self) -> dict:
+        """Host, pid and start time of this process; taken again in a forked child."""
+
+        pid = os.getpid()
+        if self._identity is None or self._identity["pid"] != pid:
+            start = process_start(pid) if HAS_PROC else None
+            self._identity = {"host": socket.gethostname(), "pid": pid, "start": start or f"{time.time():.0f}"}
+        return self._identity
+
+    @property
+    def directory(self) -> Path:
+        return Path(settings.METRICS_DIR)
+
+    def flush_due(self) -> bool:
+        """Whether a flush is due, claiming it if so; call with ``_lock`` held so only one thread flushes."""
+
+        now = time.monotonic()
+        if now - self._last_flush < settings.METRICS_FLUSH_INTERVAL:
+            return False
+        self._last_flush = now
+        return True
+
+    def record(self, stats: RequestStats, latency: float, status: int, size: int, flush: bool = True) -> bool:
+        """Count one response; returns whether a flush was due (and, unless ``flush`` is false, done)."""
+
+        with self._lock:
+            totals = self._views.get(stats.view)
+            if totals is None:
+                totals = self._views[stats.view] = empty_view_totals()
+            totals["count"] += 1
+            index = bucket_index(LATENCY_BUCKETS, latency)
+            if index is not None:
+                totals["buckets"][index] += 1
+            totals["latency_seconds"] += latency
+            totals["db_queries"] += stats.queries
+            totals["db_seconds"] += stats.db_seconds
+            totals["serializer_seconds"] += stats.serializer_seconds
+            totals["response_bytes"] += size
+            key = str(status)
+            totals["statuses"][key] = totals["statuses"].get(key, 0) + 1
+            due = self.flush_due()
+        if due and flush:
+            self.flush()
+        return due
+
+    def record_job(self, name: str, outcome: str, wait: float, runtime: float) -> None:
+        """One finished attempt of a background job: how long it waited once due, and ran."""
+
+        with self._lock:
+            totals = self._jobs.get(name)
+            if totals is None:
+                totals = self._jobs[name] = empty_job_totals()
+            totals["count"] += 1
+            totals["outcomes"][outcome] = totals["outcomes"].get(outcome, 0) + 1
+            index = bucket_index(JOB_BUCKETS, wait)
+            if index is not None:
+                totals["wait_buckets"][index] += 1
+            totals["wait_seconds"] += wait
+            totals["run_seconds"] += runtime
+            due = self.flush_due()
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write this process's snapshot; a failure is logged, never raised into a request or job."""
+
+        identity = self.identity
+        target = self.directory / f"metrics-{identity['pid']}-{identity['start']}.json"
+        with self._write_lock:
+            with self._lock:
+                snapshot = json.dumps({**identity, "views": self._views, "jobs": self._jobs})
+                self._last_flush = time.monotonic()
+            temporary = None
+            try:
+                target.parent.mkdir(parents=True, exist_ok=True)
+                with tempfile.NamedTemporaryFile(
+                    "w", dir=target.parent, prefix=".metrics-", suffix=".tmp", delete=False
+                ) as handle:
+                    temporary = handle.name
+                    handle.write(snapshot)
+                os.replace(temporary, target)
+            except OSError as exc:
+                logger.warning("Could not write metrics snapshot %s: %s", target, exc)
+                if temporary is not None:
+                    Path(temporary).unlink(missing_ok=True)
+
+    def files(self) -> Iterator[tuple[Path, dict]]:
+        for path in sorted(self.directory.glob("metrics-*.json")):
+            try:
+                yield path, json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+
+    def prune(self) -> None:
+        """Take over the totals of this host's exited processes and remove their files, then flush."""
+
+        identity = self.identity
+        claimed = []
+        for path, snapshot in self.files():
+            if snapshot.get("host", identity["host"]) != identity["host"] or snapshot.get("pid") is None:
+                continue
+            if snapshot["pid"] == identity["pid"] and snapshot.get("start") == identity["start"]:
+                continue
+            if process_alive(snapshot["pid"], snapshot.get("start")):
+                continue
+            # Renaming is the claim: of several workers pruning at once, one wins.
+            taken = path.with_name(f"{path.name}.{identity['pid']}.pruned")
+            try:
+                os.rename(path, taken)
+            except OSError:
+                continue
+            claimed.append((taken, snapshot))
+        with self._lock:
+            for _path, snapshot in claimed:
+                for view, totals in snapshot.get("views", {}).items():
+                    add_view_totals(self._views.setdefault(view, empty_view_totals()), totals)
+                for name, totals in snapshot.get("jobs", {}).items():
+                    add_job_totals(self._jobs.setdefault(name, empty_job_totals()), totals)
+        self.flush()
+        for path, _snapshot in claimed:
+            path.unlink(missing_ok=True)
+
+    def snapshots(self) -> Iterator[dict]:
+        """Every live worker's last snapshot, this one's freshly flushed."""
+
+        self.prune()
+        for _path, snapshot in self.files():
+            yield snapshot
+
+    def merged(self, snapshots: list[dict] | None = None) -> dict[str, dict]:
+        """Sum the view totals of every worker, including this one (or of ``snapshots``, already read)."""
+
+        merged: dict[str, dict] = {}
+        for snapshot in self.snapshots() if snapshots is None else snapshots:
+            for view, totals in snapshot.get("views", {}).items():
+                add_view_totals(merged.setdefault(view, empty_view_totals()), totals)
+        return merged
+
+    def merged_jobs(self, snapshots: list[dict] | None = None) -> dict[str, dict]:
+        """Sum the job totals of every process (job workers included), by job name."""
+
+        merged: dict[str, dict] = {}
+        for snapshot in self.snapshots() if snapshots is None else snapshots:
+            for name, totals in snapshot.get("jobs", {}).items():
+                add_job_totals(merged.setdefault(name, empty_job_totals()), totals)
+        return merged
+
+    def register_collector(self, collector: Callable[[list[dict]], list[str]]) -> None:
+        """Add a callable returning extra exposition lines (e.g. job queue gauges).
+
+        It is passed the snapshots the scrape already read, so it need not read them again.
+        """
+
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def render_prometheus(self) -> str:
+        snapshots = list(self.snapshots())
+        views = self.merged(snapshots)
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by resolved view and action.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for view, totals in sorted(views.items()):
+            label = f'view="{escape_label(view)}"'
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS, totals["buckets"]):
+                cumulative += count
+                lines.append(f'http_request_duration_seconds_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'http_request_duration_seconds_bucket{{{label},le="+Inf"}} {totals["count"]}')
+            lines.append(f"http_request_duration_seconds_sum{{{label}}} {totals['latency_seconds']:.6f}")
+            lines.append(f"http_request_duration_seconds_count{{{label}}} {totals['count']}")
+
+        counters = [
+            ("http_db_queries_total", "Database queries issued while handling requests.", "db_queries", "{}"),
+            ("http_db_seconds_total", "Wall time spent in database calls.", "db_seconds", "{:.6f}"),
+            ("http_serializer_seconds_total", "Wall time spent serializing responses.", "serializer_seconds", "{:.6f}"),
+            ("http_response_bytes_total", "Response body bytes.", "response_bytes", "{}"),
+        ]
+        for name, help_text, key, template in counters:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for view, totals in sorted(views.items()):
+                lines.append(f'{name}{{view="{escape_label(view)}"}} {template.format(totals[key])}')
+
+        lines.append("# HELP http_responses_total Responses by view and status code.")
+        lines.append("# TYPE http_responses_total counter")
+        for view, totals in sorted(views.items()):
+            for status, count in sorted(totals["statuses"].items()):
+                lines.append(f'http_responses_total{{view="{escape_label(view)}",status="{status}"}} {count}')
+
+        for collector in self._collectors:
+            lines.extend(collector(snapshots))
+        return "\n".join(lines) + "\n"
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,80 @@
+"""Project middleware."""
+from __future__ import annotations
+
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+
+from . import metrics
+
+
+def view_label(request, view_func) -> str:
+    """Name a resolved view the way dashboards group it, e.g. ``CaseViewSet.list``."""
+
+    view_class = getattr(view_func, "cls", None) or getattr(view_func, "view_class", None)
+    if view_class is None:
+        return f"{view_func.__module__}.{getattr(view_func, '__qualname__', view_func.__class__.__name__)}"
+    method = request.method.lower()
+    actions = getattr(view_func, "actions", None)
+    if actions:
+        return f"{view_class.__name__}.{actions.get(method, method)}"
+    return f"{view_class.__name__}.{method}"
+
+
+class RequestMetricsMiddleware:
+    """Record latency, DB queries/time, serializer time and response size per view.
+
+    Runs natively in sync and async chains, so async views are not pushed back
+    onto a thread by it.  Queries reach the request's stats through the
+    ``current_request`` context variable (see ``metrics.install_query_timer``).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not settings.METRICS_ENABLED:
+            return self.get_response(request)
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        self.record(request, response, stats, started)
+        return response
+
+    async def __acall__(self, request):
+        if not settings.METRICS_ENABLED:
+            return await self.get_response(request)
+
+        stats = metrics.RequestStats()
+        token = metrics.current_request.set(stats)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current_request.reset(token)
+        # The snapshot file is written on a thread, off the event loop.
+        if self.record(request, response, stats, started, flush=False):
+            await sync_to_async(metrics.registry.flush, thread_sensitive=False)()
+        return response
+
+    @staticmethod
+    def record(request, response, stats: metrics.RequestStats, started: float, flush: bool = True) -> bool:
+        latency = time.perf_counter() - started
+        match = getattr(request, "resolver_match", None)
+        if match is not None:
+            stats.view = view_label(request, match.func)
+        size = 0 if response.streaming else len(response.content)
+        return metrics.registry.record(stats, latency, response.status_code, size, flush=flush)
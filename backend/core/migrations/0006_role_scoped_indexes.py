@@ -0,0 +1,75 @@
+# Generated by Django 5.1.1 on 2026-10-17 05:55
+
+from django.db import migrations, models
+
+from core.schema import AddIndexConcurrently, create_index, drop_index
+
+ASSIGNMENT_INDEX = "case_assignment_doctor_covering_idx"
+
+
+def create_assignment_covering_index(apps, schema_editor):
+    """Index-only doctor -> case lookups on the auto-created M2M table (Postgres only)."""
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    table = apps.get_model("core", "Case").assigned_doctors.through._meta.db_table
+    create_index(schema_editor, ASSIGNMENT_INDEX, table, "doctor_id", include="case_id")
+
+
+def drop_assignment_covering_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    drop_index(schema_editor, ASSIGNMENT_INDEX)
+
+
+class Migration(migrations.Migration):
+    # Indexes on existing tables are built concurrently on PostgreSQL (see core.schema).
+    atomic = False
+
+    dependencies = [
+        ('core', '0005_alter_prescription_prescription_number'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['-created_at', '-id'], name='appt_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', '-created_at', '-id'], include=('status',), name='appt_doctor_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], include=('status',), name='appt_creator_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='case',
+            index=models.Index(fields=['-created_at', '-id'], name='case_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='case',
+            index=models.Index(fields=['created_by', '-created_at', '-id'], name='case_creator_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(fields=['last_name', 'first_name', 'id'], name='patient_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(fields=['attending_doctor', 'last_name', 'first_name', 'id'], name='patient_doctor_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(fields=['created_by', 'last_name', 'first_name', 'id'], name='patient_creator_name_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='prescription',
+            index=models.Index(fields=['-created_at', '-id'], name='rx_recent_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='prescription',
+            index=models.Index(fields=['doctor', '-created_at', '-id'], name='rx_doctor_recent_idx'),
+        ),
+        migrations.RunPython(create_assignment_covering_index, drop_assignment_covering_index, atomic=False),
+    ]
@@ -0,0 +1,30 @@
+from django.db import migrations
+
+from core.schema import create_index, drop_index
+
+
+def create_expires_at_index(apps, schema_editor):
+    create_index(schema_editor, "token_outstanding_expires_idx", "token_blacklist_outstandingtoken", "expires_at")
+
+
+def drop_expires_at_index(apps, schema_editor):
+    drop_index(schema_editor, "token_outstanding_expires_idx")
+
+
+class Migration(migrations.Migration):
+    """Index simplejwt's outstanding token expiry so the batched purge never scans the table.
+
+    Runs on every supported backend: ``CREATE INDEX CONCURRENTLY`` on PostgreSQL,
+    so token writes are not blocked while it builds, and a plain build elsewhere.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0006_role_scoped_indexes'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_expires_at_index, drop_expires_at_index, atomic=False),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 5000
+
+
+def backfill_case_access(apps, schema_editor):
+    """Populate access rows from existing assignments and attending doctors, in case id batches."""
+
+    Case = apps.get_model("core", "Case")
+    CaseAccess = apps.get_model("core", "CaseAccess")
+    through = Case.assigned_doctors.through
+    last_id = 0
+    while True:
+        cases = list(
+            Case.objects.filter(id__gt=last_id)
+            .order_by("id")
+            .values_list("id", "patient__attending_doctor_id")[:BATCH_SIZE]
+        )
+        if not cases:
+            break
+        last_id = cases[-1][0]
+        case_ids = [case_id for case_id, _doctor_id in cases]
+        rows = [CaseAccess(case_id=case_id, doctor_id=doctor_id, reason="ATTENDING") for case_id, doctor_id in cases]
+        rows.extend(
+            CaseAccess(case_id=case_id, doctor_id=doctor_id, reason="ASSIGNED")
+            for case_id, doctor_id in through.objects.filter(case_id__in=case_ids).values_list("case_id", "doctor_id")
+        )
+        CaseAccess.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_outstanding_token_expiry_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CaseAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reason', models.CharField(choices=[('ASSIGNED', 'Assigned'), ('ATTENDING', 'Attending')], max_length=16)),
+                ('case', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='core.case')),
+                ('doctor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='case_access', to='core.doctor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'case', 'reason'), name='case_access_doctor_case_reason_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill_case_access, migrations.RunPython.noop),
+    ]
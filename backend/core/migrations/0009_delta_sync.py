@@ -0,0 +1,67 @@
+# Generated by Django 5.1.1 on 2026-10-17 06:12
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+from core.schema import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # Indexes on existing tables are built concurrently on PostgreSQL (see core.schema).
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_case_access'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=32)),
+                ('object_id', models.BigIntegerField()),
+                ('reason', models.CharField(choices=[('DELETED', 'Deleted'), ('REVOKED', 'Access revoked')], default='DELETED', max_length=16)),
+                ('deleted_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at', 'id'], name='appt_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='case',
+            index=models.Index(fields=['updated_at', 'id'], name='case_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(fields=['updated_at', 'id'], name='patient_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='prescription',
+            index=models.Index(fields=['updated_at', 'id'], name='rx_updated_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='doctor',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.doctor'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='receptionist',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.receptionist'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['model', 'deleted_at', 'id'], name='tombstone_model_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['doctor', 'model', 'deleted_at', 'id'], name='tombstone_doctor_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['receptionist', 'model', 'deleted_at', 'id'], name='tombstone_receptionist_idx'),
+        ),
+    ]
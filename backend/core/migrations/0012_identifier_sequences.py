@@ -0,0 +1,41 @@
+# Generated by Django 5.1.1 on 2026-10-17 07:04
+
+from django.db import migrations, models
+
+# Must match core.identifiers.BLOCK_SIZE: one nextval reserves a block of this many numbers.
+BLOCK_SIZE = 50
+SEQUENCES = ["core_case_number_seq", "core_prescription_number_seq", "core_appointment_number_seq"]
+
+
+def create_number_sequences(apps, schema_editor):
+    """Postgres only; other databases count in IdentifierSequence rows."""
+
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sequence in SEQUENCES:
+        schema_editor.execute(f"CREATE SEQUENCE IF NOT EXISTS {sequence} INCREMENT BY {BLOCK_SIZE} MINVALUE 1 START 1")
+
+
+def drop_number_sequences(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sequence in SEQUENCES:
+        schema_editor.execute(f"DROP SEQUENCE IF EXISTS {sequence}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_content_addressed_blobs'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IdentifierSequence',
+            fields=[
+                ('name', models.CharField(max_length=32, primary_key=True, serialize=False)),
+                ('last_value', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(create_number_sequences, drop_number_sequences),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-17 07:12
+
+from datetime import timedelta
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+from core.schema import AddIndexConcurrently
+
+
+def backfill_appointment_ends(apps, schema_editor):
+    """Existing appointments take the default 30 minutes."""
+
+    Appointment = apps.get_model("core", "Appointment")
+    Appointment.objects.filter(scheduled_at__isnull=False).update(ends_at=models.F("scheduled_at") + timedelta(minutes=30))
+
+
+class Migration(migrations.Migration):
+    # The appointment index is built concurrently on PostgreSQL (see core.schema).
+    atomic = False
+
+    dependencies = [
+        ('core', '0012_identifier_sequences'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DoctorSchedule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Monday'), (1, 'Tuesday'), (2, 'Wednesday'), (3, 'Thursday'), (4, 'Friday'), (5, 'Saturday'), (6, 'Sunday')])),
+                ('starts_at', models.TimeField()),
+                ('ends_at', models.TimeField()),
+                ('slot_minutes', models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5)])),
+            ],
+            options={
+                'ordering': ['doctor', 'weekday', 'starts_at'],
+            },
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='duration_minutes',
+            field=models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5), django.core.validators.MaxValueValidator(480)]),
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='ends_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_appointment_ends, migrations.RunPython.noop, atomic=True),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'scheduled_at'], include=('ends_at', 'status'), name='appt_doctor_schedule_idx'),
+        ),
+        migrations.AddField(
+            model_name='doctorschedule',
+            name='doctor',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedules', to='core.doctor'),
+        ),
+        migrations.AddConstraint(
+            model_name='doctorschedule',
+            constraint=models.UniqueConstraint(fields=('doctor', 'weekday', 'starts_at'), name='doctor_schedule_block_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='doctorschedule',
+            constraint=models.CheckConstraint(condition=models.Q(('ends_at__gt', models.F('starts_at'))), name='doctor_schedule_ends_after_start'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+from core.schema import create_index, drop_index
+
+
+def create_blacklisted_at_index(apps, schema_editor):
+    create_index(schema_editor, "token_blacklisted_at_idx", "token_blacklist_blacklistedtoken", "blacklisted_at")
+
+
+def drop_blacklisted_at_index(apps, schema_editor):
+    drop_index(schema_editor, "token_blacklisted_at_idx")
+
+
+class Migration(migrations.Migration):
+    """Index simplejwt's blacklist time so the blacklist cache's catch-up window is an index range scan.
+
+    Built ``CONCURRENTLY`` on PostgreSQL, so logouts are not blocked while it builds.
+    """
+
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_background_jobs'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_blacklisted_at_index, drop_blacklisted_at_index, atomic=False),
+    ]
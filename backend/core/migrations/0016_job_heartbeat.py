@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-17 07:53
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def start_heartbeats(apps, schema_editor):
+    """Jobs already running count from their start, as the stale sweep did before heartbeats."""
+
+    Job = apps.get_model("core", "Job")
+    Job.objects.filter(status="RUNNING").update(heartbeat_at=F("started_at"))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_blacklisted_token_time_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='job',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(start_heartbeats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.1.1 on 2026-10-17 08:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='appointment',
+            name='appointment_number',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='case',
+            name='case_number',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='prescription',
+            name='prescription_number',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
@@ -2,11 +2,17 @@
 from __future__ import annotations
 
 import uuid
+from datetime import timedelta
+from pathlib import Path
 
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 from django.utils import timezone
 
+from . import identifiers
+
 
 class User(AbstractUser):
     """Custom user model with role information."""
@@ -30,6 +36,35 @@ class Doctor(models.Model):
         return f"Dr. {self.user.get_full_name() or self.user.username}"
 
 
+class DoctorSchedule(models.Model):
+    """A weekly block of a doctor's working hours, in ``TIME_ZONE`` local time, split into bookable slots."""
+
+    class Weekday(models.IntegerChoices):
+        MONDAY = 0, "Monday"
+        TUESDAY = 1, "Tuesday"
+        WEDNESDAY = 2, "Wednesday"
+        THURSDAY = 3, "Thursday"
+        FRIDAY = 4, "Friday"
+        SATURDAY = 5, "Saturday"
+        SUNDAY = 6, "Sunday"
+
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="schedules")
+    weekday = models.PositiveSmallIntegerField(choices=Weekday.choices)
+    starts_at = models.TimeField()
+    ends_at = models.TimeField()
+    slot_minutes = models.PositiveSmallIntegerField(default=30, validators=[MinValueValidator(5)])
+
+    class Meta:
+        ordering = ["doctor", "weekday", "starts_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["doctor", "weekday", "starts_at"], name="doctor_schedule_block_uniq"),
+            models.CheckConstraint(condition=models.Q(ends_at__gt=models.F("starts_at")), name="doctor_schedule_ends_after_start"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.doctor} {self.get_weekday_display()} {self.starts_at:%H:%M}-{self.ends_at:%H:%M}"
+
+
 class Receptionist(models.Model):
     """Tracks receptionist details for auditing."""
 
@@ -60,16 +95,54 @@ class Patient(models.Model):
 
     class Meta:
         ordering = ["last_name", "first_name"]
+        indexes = [
+            models.Index(fields=["last_name", "first_name", "id"], name="patient_name_idx"),
+            models.Index(fields=["attending_doctor", "last_name", "first_name", "id"], name="patient_doctor_name_idx"),
+            models.Index(fields=["created_by", "last_name", "first_name", "id"], name="patient_creator_name_idx"),
+            models.Index(fields=["updated_at", "id"], name="patient_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"{self.last_name}, {self.first_name}"
 
 
+class IdentifierSequence(models.Model):
+    """Counter behind case/prescription/appointment numbers where the database has no sequences.
+
+    PostgreSQL uses real sequences instead; see ``core.identifiers``.
+    """
+
+    name = models.CharField(max_length=32, primary_key=True)
+    last_value = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.name}: {self.last_value}"
+
+
 def generate_case_number() -> str:
-    """Produce a unique, human-readable case identifier."""
+    """Produce a unique, human-readable case identifier (the field default in migrations before 0017)."""
+
+    return identifiers.next_number("case")
+
+
+class NumberedModel(models.Model):
+    """A record whose ``number_field`` is drawn from ``core.identifiers`` when it is first saved.
+
+    Not a field default: those run on every instantiation, so unsaved instances
+    would use up numbers.  ``bulk_create`` skips ``save()``; its callers set the
+    numbers themselves with ``identifiers.next_numbers``.
+    """
 
-    timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
-    return f"CASE-{timestamp}-{uuid.uuid4().hex[:6].upper()}"
+    number_field: str
+    number_sequence: str
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs) -> None:
+        if self._state.adding and not getattr(self, self.number_field):
+            setattr(self, self.number_field, identifiers.next_number(self.number_sequence))
+        super().save(*args, **kwargs)
 
 
 def case_attachment_upload_path(instance: "CaseAttachment", filename: str) -> str:
@@ -84,10 +157,38 @@ def prescription_attachment_upload_path(instance: "PrescriptionAttachment", file
     return f"prescriptions/{instance.prescription.prescription_number}/{uuid.uuid4().hex}_{filename}"
 
 
-class Case(models.Model):
+class Blob(models.Model):
+    """Attachment bytes stored once under their SHA-256 and shared by every attachment with that content.
+
+    ``refcount`` counts the case and prescription attachments pointing at the
+    blob and is kept by ``core.signals``; blobs left at zero are deleted by
+    ``gc_blobs`` after a grace period.
+    """
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    refcount = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"], condition=models.Q(refcount=0), name="blob_unreferenced_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.sha256} ({self.refcount} refs)"
+
+    @property
+    def name(self) -> str:
+        return f"blobs/{self.sha256[:2]}/{self.sha256[2:4]}/{self.sha256}"
+
+
+class Case(NumberedModel):
     """Represents a medical case for a patient."""
 
-    case_number = models.CharField(max_length=64, unique=True, default=generate_case_number, editable=False)
+    number_field = "case_number"
+    number_sequence = "case"
+
+    case_number = models.CharField(max_length=64, unique=True, editable=False)
     name = models.CharField(max_length=255, blank=True)
     description = models.TextField(blank=True)
     symptoms = models.TextField(blank=True)
@@ -106,6 +207,11 @@ class Case(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="case_recent_idx"),
+            models.Index(fields=["created_by", "-created_at", "-id"], name="case_creator_recent_idx"),
+            models.Index(fields=["updated_at", "id"], name="case_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         if self.name:
@@ -113,11 +219,44 @@ class Case(models.Model):
         return self.case_number
 
 
+class CaseAccess(models.Model):
+    """Denormalized doctor -> case visibility, one row per reason.
+
+    Derived from ``Case.assigned_doctors`` and ``Patient.attending_doctor`` and
+    kept in step by ``core.signals``; ``manage.py rebuild_case_access`` backfills
+    and repairs it after bulk writes that bypass signals.
+    """
+
+    class Reason(models.TextChoices):
+        ASSIGNED = "ASSIGNED", "Assigned"
+        ATTENDING = "ATTENDING", "Attending"
+
+    # The unique constraint below already indexes doctor_id as its leading column.
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, related_name="case_access", db_index=False)
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="access")
+    reason = models.CharField(max_length=16, choices=Reason.choices)
+
+    class Meta:
+        constraints = [
+            # Leads with doctor, so it also serves the doctor -> case semi-join index-only.
+            models.UniqueConstraint(fields=["doctor", "case", "reason"], name="case_access_doctor_case_reason_uniq"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.doctor_id} -> {self.case_id} ({self.reason})"
+
+
 class CaseAttachment(models.Model):
     """File uploads associated with a case."""
 
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="attachments")
     file = models.FileField(upload_to=case_attachment_upload_path)
+    # Set for content-addressed uploads, whose ``file`` is the blob's name;
+    # older rows keep their own upload_to path until ``dedupe_attachments`` runs.
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(default=0)
+    content_type = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     label = models.CharField(max_length=255, blank=True)
 
@@ -129,15 +268,17 @@ class CaseAttachment(models.Model):
 
 
 def generate_prescription_number() -> str:
-    """Generate a unique prescription identifier."""
-    timestamp = timezone.now().strftime("%Y%m%d%H%M%S")
-    return f"RX-{timestamp}-{uuid.uuid4().hex[:6].upper()}"
+    """Generate a unique prescription identifier (the field default in migrations before 0017)."""
+    return identifiers.next_number("prescription")
 
 
-class Prescription(models.Model):
+class Prescription(NumberedModel):
     """Stores prescription details linked to a case."""
 
-    prescription_number = models.CharField(max_length=64, unique=True, default=generate_prescription_number, editable=False)
+    number_field = "prescription_number"
+    number_sequence = "prescription"
+
+    prescription_number = models.CharField(max_length=64, unique=True, editable=False)
     case = models.ForeignKey(Case, on_delete=models.CASCADE, related_name="prescriptions")
     doctor = models.ForeignKey(Doctor, on_delete=models.PROTECT, related_name="prescriptions")
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="prescriptions")
@@ -147,6 +288,11 @@ class Prescription(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="rx_recent_idx"),
+            models.Index(fields=["doctor", "-created_at", "-id"], name="rx_doctor_recent_idx"),
+            models.Index(fields=["updated_at", "id"], name="rx_updated_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Prescription {self.prescription_number}"
@@ -161,6 +307,11 @@ class PrescriptionAttachment(models.Model):
         related_name="attachments",
     )
     file = models.FileField(upload_to=prescription_attachment_upload_path)
+    # See CaseAttachment.blob.
+    blob = models.ForeignKey(Blob, on_delete=models.PROTECT, null=True, blank=True, related_name="+")
+    filename = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField(default=0)
+    content_type = models.CharField(max_length=255, blank=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     label = models.CharField(max_length=255, blank=True)
 
@@ -171,21 +322,59 @@ class PrescriptionAttachment(models.Model):
         return self.label or self.file.name
 
 
+class UploadSession(models.Model):
+    """A resumable attachment upload; the bytes received so far sit in a partial file.
+
+    Exactly one of ``case`` and ``prescription`` is set.  Sessions abandoned for
+    ``UPLOAD_SESSION_TTL_HOURS`` are removed by ``purge_upload_sessions``.
+    """
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    case = models.ForeignKey(Case, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    prescription = models.ForeignKey(Prescription, on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    filename = models.CharField(max_length=255)
+    label = models.CharField(max_length=255, blank=True)
+    content_type = models.CharField(max_length=255, blank=True)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [models.Index(fields=["updated_at"], name="upload_session_updated_idx")]
+        constraints = [
+            models.CheckConstraint(
+                condition=models.Q(case__isnull=False, prescription__isnull=True)
+                | models.Q(case__isnull=True, prescription__isnull=False),
+                name="upload_session_one_owner",
+            )
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def partial_path(self) -> Path:
+        return Path(settings.ATTACHMENT_PARTIAL_DIR) / f"{self.pk}.part"
+
+
+# Bounds how far before a search window a booking overlapping it can start.
+MAX_APPOINTMENT_MINUTES = 8 * 60
+
+
 def generate_appointment_number() -> str:
-    """Generate a unique appointment identifier based on today's date."""
-    date_str = timezone.now().strftime("%Y%m%d")
-    return f"APT-{date_str}-{uuid.uuid4().hex[:8].upper()}"
+    """Generate a unique appointment identifier (the field default in migrations before 0017)."""
+    return identifiers.next_number("appointment")
 
 
-class Appointment(models.Model):
+class Appointment(NumberedModel):
     """Represents an appointment for a patient, optionally linked to a case."""
 
-    appointment_number = models.CharField(
-        max_length=64,
-        unique=True,
-        default=generate_appointment_number,
-        editable=False,
-    )
+    number_field = "appointment_number"
+    number_sequence = "appointment"
+
+    appointment_number = models.CharField(max_length=64, unique=True, editable=False)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name="appointments")
     case = models.ForeignKey(
         Case,
@@ -214,12 +403,100 @@ class Appointment(models.Model):
         default="PENDING",
     )
     scheduled_at = models.DateTimeField(null=True, blank=True)
+    duration_minutes = models.PositiveSmallIntegerField(
+        default=30, validators=[MinValueValidator(5), MaxValueValidator(MAX_APPOINTMENT_MINUTES)]
+    )
+    # scheduled_at + duration, stored so booking overlaps are an index range scan.
+    ends_at = models.DateTimeField(null=True, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="appt_recent_idx"),
+            models.Index(fields=["doctor", "scheduled_at"], include=["ends_at", "status"], name="appt_doctor_schedule_idx"),
+            models.Index(fields=["doctor", "-created_at", "-id"], include=["status"], name="appt_doctor_recent_idx"),
+            models.Index(fields=["created_by", "-created_at", "-id"], include=["status"], name="appt_creator_recent_idx"),
+            models.Index(fields=["updated_at", "id"], name="appt_updated_idx"),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        self.ends_at = self.scheduled_at + timedelta(minutes=self.duration_minutes) if self.scheduled_at else None
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"scheduled_at", "duration_minutes"} & set(update_fields):
+            kwargs["update_fields"] = {*update_fields, "ends_at"}
+        super().save(*args, **kwargs)
 
     def __str__(self) -> str:
         case_info = self.case.case_number if self.case else "New Case"
         return f"{self.appointment_number} - {self.patient} ({case_info})"
+
+
+class Tombstone(models.Model):
+    """A record that left someone's scope, kept so delta-sync clients can evict it.
+
+    A deletion writes one row for admins and the creating receptionist
+    (``doctor`` empty) plus one per doctor who could see the record; a doctor
+    losing access to a record that still exists gets a REVOKED row of their own.
+    """
+
+    class Reason(models.TextChoices):
+        DELETED = "DELETED", "Deleted"
+        REVOKED = "REVOKED", "Access revoked"
+
+    model = models.CharField(max_length=32)
+    object_id = models.BigIntegerField()
+    reason = models.CharField(max_length=16, choices=Reason.choices, default=Reason.DELETED)
+    # Both FKs lead one of the composite indexes below.
+    doctor = models.ForeignKey(Doctor, on_delete=models.CASCADE, null=True, blank=True, related_name="+", db_index=False)
+    receptionist = models.ForeignKey(
+        Receptionist, on_delete=models.SET_NULL, null=True, blank=True, related_name="+", db_index=False
+    )
+    deleted_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["model", "deleted_at", "id"], name="tombstone_model_idx"),
+            models.Index(fields=["doctor", "model", "deleted_at", "id"], name="tombstone_doctor_idx"),
+            models.Index(fields=["receptionist", "model", "deleted_at", "id"], name="tombstone_receptionist_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.model} {self.object_id} ({self.reason})"
+
+
+class Job(models.Model):
+    """A unit of background work, claimed and run by ``manage.py run_jobs`` (see ``core.jobs``)."""
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    name = models.CharField(max_length=64)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=16, choices=Status.choices, default=Status.QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # When the job is next due: enqueue time, or the end of a retry's backoff.
+    run_at = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed by the running worker; RUNNING jobs without a recent one are requeued.
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=128, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            # Claims (QUEUED, due, oldest first) and the per-status gauges.
+            models.Index(fields=["status", "run_at", "id"], name="job_claim_idx"),
+            models.Index(fields=["status", "finished_at"], name="job_finished_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.name} #{self.pk} ({self.status})"
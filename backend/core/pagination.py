@@ -0,0 +1,168 @@
+"""Keyset pagination shared by the core API viewsets."""
+from __future__ import annotations
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date, datetime, time
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, _reverse_ordering
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    """Cursor pagination keyed on the full model ordering plus an ``id`` tie-breaker.
+
+    DRF's stock cursor only filters on the first ordering column and falls back to
+    an OFFSET for ties.  Here the cursor carries every ordering value, so each page
+    is a single range scan on the matching index no matter how deep it is, and rows
+    inserted concurrently never shift a page boundary.
+    """
+
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    ordering = None
+
+    def get_ordering(self, request, queryset, view) -> tuple[str, ...]:
+        if self.ordering:
+            return tuple(self.ordering)
+        ordering = [field for field in queryset.model._meta.ordering if isinstance(field, str)]
+        if not ordering:
+            return ("id",)
+        if ordering[-1].lstrip("-") not in {"id", "pk"}:
+            ordering.append("-id" if ordering[0].startswith("-") else "id")
+        return tuple(ordering)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        return self.set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """``paginate_queryset`` for async views."""
+
+        queryset = self.page_queryset(queryset, request, view)
+        if queryset is None:
+            return None
+        # A chunk size is required for prefetches; one chunk holds the whole page.
+        return self.set_page([row async for row in queryset.aiterator(chunk_size=self.page_size + 1)])
+
+    def page_queryset(self, queryset, request, view=None):
+        """The query for the requested page plus one look-ahead row, or ``None`` when unpaginated."""
+
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+        self.current_position = self.cursor.position if self.cursor else None
+
+        if reverse:
+            queryset = queryset.order_by(*_reverse_ordering(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if self.current_position is not None:
+            queryset = queryset.filter(self._keyset_filter(self.current_position, reverse))
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results: list) -> list:
+        reverse = bool(self.cursor and self.cursor.reverse)
+        current_position = self.current_position
+        self.page = results[: self.page_size]
+        has_following = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = has_following
+        else:
+            self.has_next = has_following
+            self.has_previous = current_position is not None
+
+        if self.page:
+            self.next_position = self._get_position_from_instance(self.page[-1], self.ordering)
+            self.previous_position = self._get_position_from_instance(self.page[0], self.ordering)
+        else:
+            # An empty page keeps the incoming cursor so the client can step back.
+            self.next_position = self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def _keyset_filter(self, position: list, reverse: bool) -> Q:
+        """Rows strictly after ``position`` in the (possibly reversed) ordering.
+
+        The lexicographic comparison is expanded into OR-ed clauses, with the first
+        column's inclusive bound AND-ed in front so the planner gets an index range
+        to start from.
+        """
+
+        if len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = None
+        equal: dict[str, object] = {}
+        lead_bound = None
+        for field, value in zip(self.ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") != reverse else "gt"
+            clause = Q(**equal, **{f"{name}__{lookup}": value})
+            condition = clause if condition is None else condition | clause
+            if lead_bound is None:
+                lead_bound = Q(**{f"{name}__{lookup}e": value})
+            equal[name] = value
+        if len(self.ordering) == 1:
+            return condition
+        return lead_bound & condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self.next_position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self.previous_position))
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode("ascii")))
+            reverse = bool(payload.get("r", False))
+            position = payload["p"]
+        except (TypeError, ValueError, KeyError, AttributeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+    def encode_cursor(self, cursor):
+        payload = {"p": cursor.position}
+        if cursor.reverse:
+            payload["r"] = 1
+        encoded = urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("ascii")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _get_position_from_instance(self, instance, ordering) -> list:
+        position = []
+        for field in ordering:
+            name = field.lstrip("-")
+            if isinstance(instance, dict):
+                value = instance[name]
+            else:
+                # A foreign key's column: the related object would cost a query
+                # (and cannot be fetched from an async view).
+                value = getattr(instance, instance._meta.get_field(name).attname if name != "pk" else "pk")
+            if isinstance(value, (datetime, date, time)):
+                value = value.isoformat()
+            position.append(value)
+        return position
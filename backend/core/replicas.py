@@ -0,0 +1,100 @@
+"""Read-replica routing for the record viewsets, with read-your-writes stickiness.
+
+Safe-method requests on the viewsets using ``ReplicaReadMixin`` (and their
+async read views) read from one of ``DATABASE_REPLICAS``.  Everything else
+(writes, auth, dashboards, upload sessions) stays on the primary.  A user who
+has just written through those viewsets or an upload session is pinned to the
+primary for ``REPLICA_STICKY_SECONDS``, so their next reads see their own
+writes even while the replicas lag behind.  The pin lives in the Django cache,
+so it only follows the user across workers with a shared cache (``REDIS_URL``).
+"""
+from __future__ import annotations
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+# Alias the current request reads from; ``None`` means the primary.
+read_alias: ContextVar[str | None] = ContextVar("read_alias", default=None)
+
+
+def sticky_key(user_id: int) -> str:
+    return f"replica-sticky:{user_id}"
+
+
+def pin(user) -> None:
+    """Send ``user``'s reads to the primary until their writes have replicated."""
+
+    if settings.DATABASE_REPLICAS and settings.REPLICA_STICKY_SECONDS > 0:
+        cache.set(sticky_key(user.pk), True, settings.REPLICA_STICKY_SECONDS)
+
+
+def choose(request, pinned: bool | None = None) -> str | None:
+    """The replica alias for an authenticated request, or ``None`` for the primary."""
+
+    if not settings.DATABASE_REPLICAS or request.method not in SAFE_METHODS:
+        return None
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    if pinned is None:
+        pinned = cache.get(sticky_key(user.pk), False)
+    return None if pinned else random.choice(settings.DATABASE_REPLICAS)
+
+
+async def achoose(request) -> str | None:
+    if not settings.DATABASE_REPLICAS or not request.user.is_authenticated:
+        return None
+    return choose(request, pinned=await cache.aget(sticky_key(request.user.pk), False))
+
+
+class ReplicaRouter:
+    """Reads go to the request's replica, if one was chosen; writes and migrations to the primary."""
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        # Reads inside a transaction on the primary must see its uncommitted writes.
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return alias
+
+    def db_for_write(self, model, **hints):
+        # Rows read from a replica carry its alias; save them to the primary anyway.
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        return obj1._state.db in databases and obj2._state.db in databases or None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return False if db in settings.DATABASE_REPLICAS else None
+
+
+class StickyWritesMixin:
+    """Pin the user to the primary after each successful write through this view."""
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS and response.status_code < 400 and request.user.is_authenticated:
+            pin(request.user)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ReplicaReadMixin(StickyWritesMixin):
+    """Run the ORM reads of safe-method requests on a replica chosen by ``choose``."""
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        alias = choose(request)
+        if alias is not None:
+            self.read_alias_token = read_alias.set(alias)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, "read_alias_token", None)
+        if token is not None:
+            read_alias.reset(token)
+            self.read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
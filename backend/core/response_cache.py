@@ -0,0 +1,111 @@
+"""Rendered-response cache for read-mostly list/detail endpoints.
+
+Entries are the rendered JSON bytes of a GET, keyed by the path, the host
+(pagination links are absolute) and the current versions of the view's cache
+scopes (see ``core.caching``).  A write to any model in those scopes makes
+every entry built before it unreachable.  Hits skip the query and the
+serializer.  A per-process LRU sits in front of the Django cache, so a warm
+worker reads only the version counters from the shared cache.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework import status
+
+from . import caching
+
+
+class LocalResponseCache:
+    """Bounded LRU of ``key -> (expires, content type, body)``, shared by a worker's threads."""
+
+    def __init__(self) -> None:
+        self._entries: OrderedDict[str, tuple[float, str, bytes]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[str, bytes] | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def set(self, key: str, content_type: str, body: bytes, timeout: float) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + timeout, content_type, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > settings.RESPONSE_CACHE_LOCAL_SIZE:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+local_cache = LocalResponseCache()
+
+
+class ResponseCacheMixin:
+    """Serve ``list``/``retrieve`` from the response cache, keyed on ``response_cache_scopes``.
+
+    Only for viewsets whose representation does not depend on who is asking
+    once the permission checks have passed.  Misses always read the primary,
+    since a lagging replica could cache old rows under the new version.
+    """
+
+    response_cache_scopes: tuple[str, ...] = ()
+
+    def list(self, request, *args, **kwargs):
+        response = self.cached_response(request)
+        if response is None:
+            response = self.remember_response(request, super().list(request, *args, **kwargs))
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        response = self.cached_response(request)
+        if response is None:
+            response = self.remember_response(request, super().retrieve(request, *args, **kwargs))
+        return response
+
+    def response_cache_key(self, request) -> str | None:
+        # The browsable API embeds the user and CSRF token in the page.
+        if request.accepted_renderer.format != "json":
+            return None
+        return caching.versioned_key("response", self.response_cache_scopes, request.get_host(), request.get_full_path())
+
+    def cached_response(self, request) -> HttpResponse | None:
+        self.response_key = key = self.response_cache_key(request)
+        if key is None:
+            return None
+        entry = local_cache.get(key)
+        if entry is None:
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            local_cache.set(key, *entry, timeout=settings.RESPONSE_CACHE_TTL)
+        content_type, body = entry
+        return HttpResponse(body, content_type=content_type)
+
+    def remember_response(self, request, response):
+        key = getattr(self, "response_key", None)
+        if key is None or response.status_code != status.HTTP_200_OK:
+            return response
+        # Rendered now rather than by Django so the bytes can be stored;
+        # finalize_response leaves a rendered response alone.
+        response.accepted_renderer = request.accepted_renderer
+        response.accepted_media_type = request.accepted_media_type
+        response.renderer_context = self.get_renderer_context()
+        response.render()
+        entry = (response["Content-Type"], response.content)
+        cache.set(key, entry, settings.RESPONSE_CACHE_TTL)
+        local_cache.set(key, *entry, timeout=settings.RESPONSE_CACHE_TTL)
+        return response
@@ -0,0 +1,154 @@
+"""Doctor availability: free-slot search and double-booking checks.
+
+Bookings are read through ``appt_doctor_schedule_idx`` (doctor, scheduled_at,
+with ends_at and status included).  A booking overlapping ``[start, end)``
+began less than ``MAX_APPOINTMENT_MINUTES`` before ``start``, so the overlap
+test is a bounded range scan on ``scheduled_at`` per doctor, answered from the
+index alone.
+
+Slot search walks each doctor's weekly ``DoctorSchedule`` blocks across the
+window and sweeps that doctor's bookings alongside, in start order.  Doctors
+are handled in batches, with one bookings query per batch.  Only one batch's
+booking intervals are in memory at a time, and at most ``limit`` slots are
+generated per doctor.
+
+A write takes a row lock on the doctor before checking for overlaps, so
+concurrent bookings of one doctor run one after the other and the second one
+sees the first.  SQLite has no row locks, but it serializes writers anyway.
+"""
+from __future__ import annotations
+
+import heapq
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta
+from itertools import chain, islice
+from typing import Iterable, Iterator, NamedTuple
+
+from django.db.models import QuerySet
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import MAX_APPOINTMENT_MINUTES, Appointment, Doctor, DoctorSchedule
+
+DOCTOR_BATCH = 200
+CANCELLED = "CANCELLED"
+
+# Per doctor and weekday: ``(starts_at, ends_at, slot step)`` in start order.
+WeeklyHours = dict[int, list[tuple[time, time, timedelta]]]
+
+
+class Slot(NamedTuple):
+    start: datetime
+    doctor_id: int
+    end: datetime
+
+
+def bookings(start: datetime, end: datetime) -> QuerySet:
+    """Appointments occupying part of ``[start, end)``."""
+
+    return Appointment.objects.filter(
+        scheduled_at__gt=start - timedelta(minutes=MAX_APPOINTMENT_MINUTES),
+        scheduled_at__lt=end,
+        ends_at__gt=start,
+    ).exclude(status=CANCELLED)
+
+
+def free_slots(schedules: QuerySet, start: datetime, end: datetime, duration: timedelta, limit: int) -> list[Slot]:
+    """The first ``limit`` free slots of ``duration`` in ``[start, end)`` of the doctors with ``schedules``."""
+
+    weekly: dict[int, WeeklyHours] = defaultdict(lambda: defaultdict(list))
+    rows = schedules.order_by("doctor_id", "weekday", "starts_at").values_list(
+        "doctor_id", "weekday", "starts_at", "ends_at", "slot_minutes"
+    )
+    for doctor_id, weekday, starts_at, ends_at, slot_minutes in rows:
+        weekly[doctor_id][weekday].append((starts_at, ends_at, timedelta(minutes=slot_minutes)))
+
+    doctor_ids = list(weekly)
+    found: list[Slot] = []
+    for offset in range(0, len(doctor_ids), DOCTOR_BATCH):
+        batch = doctor_ids[offset : offset + DOCTOR_BATCH]
+        booked = defaultdict(list)
+        rows = (
+            bookings(start, end)
+            .filter(doctor_id__in=batch)
+            .order_by("doctor_id", "scheduled_at")
+            .values_list("doctor_id", "scheduled_at", "ends_at")
+        )
+        for doctor_id, scheduled_at, ends_at in rows:
+            booked[doctor_id].append((scheduled_at, ends_at))
+        candidates = (
+            islice(doctor_slots(doctor_id, weekly[doctor_id], booked[doctor_id], start, end, duration), limit)
+            for doctor_id in batch
+        )
+        found = heapq.nsmallest(limit, chain(found, *candidates))
+    return found
+
+
+def doctor_slots(
+    doctor_id: int,
+    weekly: WeeklyHours,
+    booked: Iterable[tuple[datetime, datetime]],
+    start: datetime,
+    end: datetime,
+    duration: timedelta,
+) -> Iterator[Slot]:
+    """One doctor's free slots in start order; ``booked`` must be in start order too."""
+
+    tz = timezone.get_current_timezone()
+    pending = iter(booked)
+    upcoming = next(pending, None)
+    # Latest end of the bookings starting before the current slot ends.
+    busy_until = start
+    day: date = timezone.localtime(start, tz).date()
+    last_day = timezone.localtime(end, tz).date()
+    while day <= last_day:
+        for starts_at, ends_at, step in weekly.get(day.weekday(), ()):
+            slot = datetime.combine(day, starts_at, tzinfo=tz)
+            block_end = datetime.combine(day, ends_at, tzinfo=tz)
+            while slot + duration <= block_end:
+                slot_end = slot + duration
+                if slot_end > end:
+                    return
+                if slot >= start:
+                    while upcoming is not None and upcoming[0] < slot_end:
+                        busy_until = max(busy_until, upcoming[1])
+                        upcoming = next(pending, None)
+                    if busy_until <= slot:
+                        yield Slot(slot, doctor_id, slot_end)
+                slot += step
+        day += timedelta(days=1)
+
+
+def check_availability(instance: Appointment | None, attrs: dict) -> None:
+    """Reject a booking that overlaps another of its doctor's; call it inside the write's transaction."""
+
+    def current(name: str):
+        if name in attrs:
+            return attrs[name]
+        if instance is not None:
+            return getattr(instance, name)
+        return Appointment._meta.get_field(name).get_default()
+
+    if instance is not None and not {"doctor", "scheduled_at", "duration_minutes", "status"} & attrs.keys():
+        return
+    scheduled_at = current("scheduled_at")
+    if scheduled_at is None or current("status") == CANCELLED:
+        return
+    doctor = current("doctor")
+    ends_at = scheduled_at + timedelta(minutes=current("duration_minutes"))
+
+    list(Doctor.objects.select_for_update().filter(pk=doctor.pk).values_list("pk", flat=True))
+    clashes = bookings(scheduled_at, ends_at).filter(doctor=doctor)
+    if instance is not None:
+        clashes = clashes.exclude(pk=instance.pk)
+    clash = clashes.order_by("scheduled_at").values_list("appointment_number", "scheduled_at", "ends_at").first()
+    if clash is not None:
+        number, clash_start, clash_end = clash
+        raise serializers.ValidationError(
+            {
+                "scheduled_at": [
+                    f"The doctor is already booked for {number} from "
+                    f"{timezone.localtime(clash_start):%Y-%m-%d %H:%M} to {timezone.localtime(clash_end):%H:%M}."
+                ]
+            }
+        )
@@ -0,0 +1,55 @@
+"""Migration helpers that build indexes without blocking writes on PostgreSQL.
+
+A plain ``CREATE INDEX`` holds a lock that stops writes to the table until
+the index is built.  On PostgreSQL these build it ``CONCURRENTLY`` instead;
+other backends (SQLite in tests and development) get the ordinary statement.
+Migrations using them must set ``atomic = False``: a concurrent build cannot
+run inside a transaction.
+"""
+from __future__ import annotations
+
+from django.contrib.postgres import operations as postgres_operations
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrently(postgres_operations.AddIndexConcurrently):
+    """``AddIndex`` built ``CONCURRENTLY`` on PostgreSQL, and as usual elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+def create_index(schema_editor, name: str, table: str, columns: str, include: str = "") -> None:
+    """``CREATE INDEX IF NOT EXISTS``, concurrently on PostgreSQL; ``include`` is PostgreSQL only."""
+
+    if schema_editor.connection.vendor != "postgresql":
+        schema_editor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {schema_editor.quote_name(table)} ({columns})")
+        return
+    # An interrupted concurrent build leaves an invalid index that IF NOT EXISTS would keep.
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_class JOIN pg_index ON pg_index.indexrelid = pg_class.oid "
+            "WHERE pg_class.relname = %s AND NOT pg_index.indisvalid",
+            [name],
+        )
+        invalid = cursor.fetchone() is not None
+    if invalid:
+        schema_editor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    covering = f" INCLUDE ({include})" if include else ""
+    schema_editor.execute(
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {schema_editor.quote_name(table)} ({columns}){covering}"
+    )
+
+
+def drop_index(schema_editor, name: str) -> None:
+    concurrently = " CONCURRENTLY" if schema_editor.connection.vendor == "postgresql" else ""
+    schema_editor.execute(f"DROP INDEX{concurrently} IF EXISTS {name}")
@@ -1,60 +1,418 @@
 """DRF serializers for authentication and domain models."""
 from __future__ import annotations
 
-from django.db import transaction
+from datetime import timedelta
+from operator import itemgetter
+from pathlib import PurePath
+from typing import Any, Callable, Iterable
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation, ValidationError as DjangoValidationError
+from django.db import connection, transaction
+from django.db.models import CharField, Count, Exists, F, Func, OuterRef, QuerySet, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, NullIf
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
 from rest_framework import serializers
+from rest_framework.exceptions import ErrorDetail
 
+from .access import doctor_case_ids
 from .models import (
+    MAX_APPOINTMENT_MINUTES,
     Appointment,
     Case,
+    CaseAccess,
     CaseAttachment,
     Doctor,
+    DoctorSchedule,
+    Job,
     Patient,
     Prescription,
     PrescriptionAttachment,
     Receptionist,
+    UploadSession,
     User,
 )
 
 
-class UserSerializer(serializers.ModelSerializer):
+def value_renderer(field: serializers.Field) -> Callable[[dict], Any]:
+    """Render ``row[field.source]`` the way ``ModelSerializer.to_representation`` renders the attribute."""
+
+    source = field.source
+    to_representation = field.to_representation
+
+    def render(row: dict):
+        value = row[source]
+        return None if value is None else to_representation(value)
+
+    return render
+
+
+def child_count(model: type, fk: str) -> Subquery:
+    """Correlated ``COUNT(*)`` of ``model`` rows pointing at the outer row via ``fk``."""
+
+    counts = (
+        model.objects.filter(**{fk: OuterRef("pk")})
+        .order_by()
+        .values(fk)
+        .annotate(total=Count("pk"))
+        .values("total")
+    )
+    return Coalesce(Subquery(counts), 0)
+
+
+def full_name(first_name: str, last_name: str) -> str:
+    return f"{first_name} {last_name}".strip()
+
+
+# The characters ``str.strip()`` removes, those for which ``str.isspace()`` is true.
+WHITESPACE = (
+    "\t\n\x0b\x0c\r\x1c\x1d\x1e\x1f \x85\xa0\u1680\u2000\u2001\u2002\u2003\u2004\u2005\u2006\u2007"
+    "\u2008\u2009\u200a\u2028\u2029\u202f\u205f\u3000"
+)
+
+
+class StripWhitespace(Func):
+    """``str.strip()`` in SQL; a plain ``TRIM`` only removes spaces."""
+
+    function = "TRIM"
+    output_field = CharField()
+
+    def __init__(self, expression, **extra):
+        super().__init__(expression, Value(WHITESPACE), **extra)
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return self.as_sql(compiler, connection, function="BTRIM", **extra_context)
+
+
+def full_name_sql(prefix: str = "") -> StripWhitespace:
+    """SQL for ``full_name`` of the row at ``prefix``."""
+
+    return StripWhitespace(Concat(F(f"{prefix}first_name"), Value(" "), F(f"{prefix}last_name"), output_field=CharField()))
+
+
+def doctor_label_sql(prefix: str = "") -> Concat:
+    """SQL for ``doctor_label``."""
+
+    name = NullIf(full_name_sql(f"{prefix}user__"), Value(""))
+    return Concat(Value("Dr. "), Coalesce(name, F(f"{prefix}user__username")), output_field=CharField())
+
+
+def doctor_label(doctor: Doctor) -> str:
+    """``"Dr. "`` and the doctor's full name, or their username."""
+
+    return f"Dr. {full_name(doctor.user.first_name, doctor.user.last_name) or doctor.user.username}"
+
+
+def case_label_sql(prefix: str = "") -> Coalesce:
+    """SQL for an appointment's case label: its name, its number when unnamed, or ``"New Case"``."""
+
+    return Coalesce(
+        NullIf(F(f"{prefix}name"), Value("")), F(f"{prefix}case_number"), Value("New Case"), output_field=CharField()
+    )
+
+
+def doctor_labels_sql() -> Coalesce | None:
+    """``ARRAY_AGG`` of a case's ``doctor_label``s in assignment order; ``None`` off PostgreSQL."""
+
+    if connection.vendor != "postgresql":
+        return None
+    from django.contrib.postgres.aggregates import ArrayAgg
+    from django.contrib.postgres.fields import ArrayField
+
+    names = (
+        Case.assigned_doctors.through.objects.filter(case=OuterRef("pk"))
+        .order_by()
+        .values("case")
+        .annotate(names=ArrayAgg(doctor_label_sql("doctor__"), ordering="id"))
+        .values("names")
+    )
+    names_field = ArrayField(CharField())
+    return Coalesce(Subquery(names), Value([], output_field=names_field), output_field=names_field)
+
+
+class AnnotatedField(serializers.ReadOnlyField):
+    """Read-only value of the queryset annotation named like the field.
+
+    Instances that were not loaded through ``optimize_queryset`` (just created
+    or updated ones), or whose annotation is unavailable on this database, fall
+    back to ``compute(instance)``.
+    """
+
+    def __init__(self, compute: Callable[[Any], Any], **kwargs):
+        self.compute = compute
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        try:
+            return instance.__dict__[self.source]
+        except KeyError:
+            return self.compute(instance)
+
+
+class SparseFieldsetMixin:
+    """Honor ``fields``/``expand`` selections on a model serializer.
+
+    ``fields`` restricts the output to the named fields, ``expand`` opts in to the
+    heavy ones listed in ``expandable_fields``.  The ``*_related_fields`` and
+    ``annotated_fields`` maps describe what each output field needs from the
+    queryset so views only join, prefetch or annotate what is actually rendered.
+    An annotation factory may return ``None`` when the database cannot compute
+    it; the field's related fields are then loaded for the Python fallback.
+    """
+
+    expandable_fields: tuple[str, ...] = ()
+    # Opt-in for list responses built from ``.values()`` rows (see ``values_plan``).
+    values_fast_path = False
+    values_fields: dict[str, tuple[tuple[str, ...], str]] = {}
+    select_related_fields: dict[str, tuple[str, ...]] = {}
+    prefetch_related_fields: dict[str, tuple[str, ...]] = {}
+    annotated_fields: dict[str, Callable[[], Any]] = {}
+
+    def __init__(self, *args, fields: Iterable[str] | None = None, expand: Iterable[str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None and not self.expandable_fields:
+            return
+        selected = set(self.selected_field_names(fields, expand))
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    def to_representation(self, instance):
+        from .metrics import track_serializer
+
+        with track_serializer():
+            return super().to_representation(instance)
+
+    @classmethod
+    def selected_field_names(cls, fields: Iterable[str] | None = None, expand: Iterable[str] | None = None) -> list[str]:
+        requested = set(fields or ())
+        expanded = set(expand or ())
+        names = []
+        for name in cls.Meta.fields:
+            if name in expanded:
+                names.append(name)
+            elif requested:
+                if name in requested:
+                    names.append(name)
+            elif name not in cls.expandable_fields:
+                names.append(name)
+        return names
+
+    def values_plan(self) -> list[tuple[str, tuple[str, ...], Callable[[dict], Any]]] | None:
+        """``(output name, row keys, render)`` for each readable field, or ``None`` without a fast path.
+
+        Plain fields render the row value through their own ``to_representation``
+        and related fields pass the primary key through, as ``to_representation``
+        does for instances, and annotated fields read their annotation.  Method
+        and nested fields need an entry in ``values_fields`` naming the row keys
+        and the method that renders them.
+        """
+
+        if not self.values_fast_path:
+            return None
+        plan = []
+        for name, field in self.fields.items():
+            if field.write_only:
+                continue
+            if name in self.values_fields:
+                keys, method = self.values_fields[name]
+                plan.append((name, keys, getattr(self, method)))
+            elif isinstance(field, AnnotatedField):
+                if self.annotated_fields[name]() is None:
+                    return None
+                plan.append((name, (name,), itemgetter(name)))
+            elif isinstance(
+                field, (serializers.BaseSerializer, serializers.ManyRelatedField, serializers.SerializerMethodField)
+            ):
+                return None
+            elif field.source == "*" or "." in field.source:
+                return None
+            elif isinstance(field, serializers.RelatedField):
+                plan.append((name, (field.source,), itemgetter(field.source)))
+            else:
+                plan.append((name, (field.source,), value_renderer(field)))
+        return plan
+
+    def values_keys(self, plan) -> list[str]:
+        return list(dict.fromkeys(key for _name, keys, _render in plan for key in keys))
+
+    def load_related_values(self, rows: list[dict]) -> None:
+        """Add the keys of ``values_fields`` entries that need queries of their own."""
+
+    def represent_values(self, rows: list[dict], plan) -> list[dict]:
+        """The representations ``to_representation`` gives the same rows as instances."""
+
+        from .metrics import track_serializer
+
+        with track_serializer():
+            self.load_related_values(rows)
+            return [{name: render(row) for name, _keys, render in plan} for row in rows]
+
+    @classmethod
+    def optimize_queryset(
+        cls,
+        queryset: QuerySet,
+        fields: Iterable[str] | None = None,
+        expand: Iterable[str] | None = None,
+    ) -> QuerySet:
+        select: list[str] = []
+        prefetch: list[str] = []
+        annotations: dict[str, Any] = {}
+        for name in cls.selected_field_names(fields, expand):
+            annotation = cls.annotated_fields[name]() if name in cls.annotated_fields else None
+            if annotation is not None:
+                annotations[name] = annotation
+                continue
+            select.extend(cls.select_related_fields.get(name, ()))
+            prefetch.extend(cls.prefetch_related_fields.get(name, ()))
+        if select:
+            queryset = queryset.select_related(*dict.fromkeys(select))
+        if prefetch:
+            queryset = queryset.prefetch_related(*dict.fromkeys(prefetch))
+        if annotations:
+            queryset = queryset.annotate(**annotations)
+        return queryset
+
+
+class RelatedLookupField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that only checks the pk; ``RelatedLookupMixin`` loads the rows."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+
+
+class RelatedLookupMixin:
+    """Resolve the pks of ``RelatedLookupField``s once field validation has passed.
+
+    ``PrimaryKeyRelatedField`` runs a ``get`` per field and, with ``many=True``,
+    per pk.  Here each field costs one ``in_bulk`` whatever its pk count, and a
+    field listed in ``related_via`` as ``{field: (other field, attribute)}``
+    costs nothing when its pk is the one the other field's row points to,
+    since the other field's query joins that row in.
+    """
+
+    related_via: dict[str, tuple[str, str]] = {}
+    # ``{field: {pk: row}}`` from ``preload_related``, used instead of querying.
+    related_rows: dict[str, dict] = {}
+
+    def lookup_fields(self) -> list[str]:
+        return [
+            name
+            for name, field in self.fields.items()
+            if isinstance(getattr(field, "child_relation", field), RelatedLookupField)
+        ]
+
+    def preload_related(self, payloads: list[dict]) -> None:
+        """Load the related rows of many payloads at once, one query per field.
+
+        For validating a batch through ``run_validation`` on this serializer;
+        pks that fail their type check are left to the per-payload errors.
+        """
+
+        self.related_rows = {}
+        for name in self.lookup_fields():
+            field = self.fields[name]
+            relation = getattr(field, "child_relation", field)
+            pks = set()
+            for payload in payloads:
+                value = payload.get(field.field_name)
+                for item in value if isinstance(value, list) else [value]:
+                    try:
+                        pks.add(relation.to_internal_value(item))
+                    except serializers.ValidationError:
+                        pass
+            self.related_rows[name] = self.lookup_queryset(name).in_bulk(pks) if pks else {}
+
+    def lookup_queryset(self, name: str) -> QuerySet:
+        field = self.fields[name]
+        queryset = getattr(field, "child_relation", field).get_queryset()
+        joined = [attribute for other, attribute in self.related_via.values() if other == name]
+        return queryset.select_related(*joined) if joined else queryset
+
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        names = [name for name in self.lookup_fields() if attrs.get(name) is not None]
+        # Fields reachable through another one go last, once that row is loaded.
+        names.sort(key=lambda name: name in self.related_via)
+        errors = {}
+        for name in names:
+            value = attrs[name]
+            pks = value if isinstance(value, list) else [value]
+            found = self.joined_row(name, attrs, value) if name in self.related_via else None
+            if found is None:
+                found = self.related_rows.get(name)
+            if found is None:
+                found = self.lookup_queryset(name).in_bulk(set(pks)) if pks else {}
+            missing = next((pk for pk in pks if pk not in found), None)
+            if missing is not None:
+                field = self.fields[name]
+                message = getattr(field, "child_relation", field).error_messages["does_not_exist"]
+                errors[name] = [ErrorDetail(message.format(pk_value=missing), code="does_not_exist")]
+                continue
+            attrs[name] = [found[pk] for pk in pks] if isinstance(value, list) else found[value]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return attrs
+
+    def joined_row(self, name: str, attrs: dict, pk) -> dict | None:
+        other, attribute = self.related_via[name]
+        row = attrs.get(other)
+        if isinstance(row, list) or row is None or getattr(row, f"{attribute}_id", None) != pk:
+            return None
+        return {pk: getattr(row, attribute)}
+
+
+class UserSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ["id", "username", "email", "first_name", "last_name", "role"]
 
 
-class DoctorSerializer(serializers.ModelSerializer):
+class DoctorSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
+    select_related_fields = {"user": ("user",)}
+
     class Meta:
         model = Doctor
         fields = ["id", "user", "specialty", "license_number"]
 
 
-class ReceptionistSerializer(serializers.ModelSerializer):
+class ReceptionistSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
 
+    select_related_fields = {"user": ("user",)}
+
     class Meta:
         model = Receptionist
         fields = ["id", "user", "desk_number"]
 
 
-class DoctorProfileSerializer(serializers.ModelSerializer):
+class DoctorProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Doctor
         fields = ["id", "specialty", "license_number"]
 
 
-class ReceptionistProfileSerializer(serializers.ModelSerializer):
+class ReceptionistProfileSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Receptionist
         fields = ["id", "desk_number"]
 
 
-class PatientSerializer(serializers.ModelSerializer):
-    attending_doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all())
+class PatientSerializer(RelatedLookupMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    attending_doctor = RelatedLookupField(queryset=Doctor.objects.all())
     created_by = serializers.PrimaryKeyRelatedField(read_only=True)
 
+    values_fast_path = True
+
     class Meta:
         model = Patient
         fields = [
@@ -70,26 +428,87 @@ class PatientSerializer(serializers.ModelSerializer):
         read_only_fields = ["created_at", "updated_at", "created_by"]
 
 
-class CaseAttachmentSerializer(serializers.ModelSerializer):
+class AttachmentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """``file`` is the access-checked download endpoint, never the raw media URL."""
+
+    file = serializers.SerializerMethodField()
+
+    download_route: str
+    owner_field: str
+
+    values_fast_path = True
+
+    def get_file(self, obj) -> str:
+        return self.download_url(getattr(obj, f"{self.owner_field}_id"), obj.pk)
+
+    def file_from_values(self, row: dict) -> str:
+        return self.download_url(row[self.owner_field], row["id"])
+
+    def download_url(self, owner_id: int, attachment_id: int) -> str:
+        url = reverse(self.download_route, kwargs={"pk": owner_id, "attachment_id": attachment_id})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
+
+
+class CaseAttachmentSerializer(AttachmentSerializer):
+    download_route = "cases-attachment-download"
+    owner_field = "case"
+    values_fields = {"file": (("id", "case"), "file_from_values")}
+
     class Meta:
         model = CaseAttachment
-        fields = ["id", "label", "file", "uploaded_at"]
-        read_only_fields = ["uploaded_at"]
+        fields = ["id", "label", "filename", "file", "size", "content_type", "uploaded_at"]
+        read_only_fields = ["filename", "size", "content_type", "uploaded_at"]
+
 
+class PrescriptionAttachmentSerializer(AttachmentSerializer):
+    download_route = "prescriptions-attachment-download"
+    owner_field = "prescription"
+    values_fields = {"file": (("id", "prescription"), "file_from_values")}
 
-class PrescriptionAttachmentSerializer(serializers.ModelSerializer):
     class Meta:
         model = PrescriptionAttachment
-        fields = ["id", "label", "file", "uploaded_at"]
-        read_only_fields = ["uploaded_at"]
+        fields = ["id", "label", "filename", "file", "size", "content_type", "uploaded_at"]
+        read_only_fields = ["filename", "size", "content_type", "uploaded_at"]
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source="received", read_only=True)
+    upload_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "filename", "label", "content_type", "size", "offset", "upload_url", "created_at"]
+        read_only_fields = ["id", "created_at"]
+
+    def get_upload_url(self, obj: UploadSession) -> str:
+        url = reverse("upload-session", kwargs={"pk": obj.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request is not None else url
 
+    def validate_filename(self, value: str) -> str:
+        try:
+            return get_valid_filename(PurePath(value.replace("\\", "/")).name)
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Invalid file name.")
 
-class PrescriptionSerializer(serializers.ModelSerializer):
-    doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all(), required=False)
-    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
-    case = serializers.PrimaryKeyRelatedField(queryset=Case.objects.all())
+    def validate_size(self, value: int) -> int:
+        if not 0 < value <= settings.ATTACHMENT_MAX_BYTES:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.ATTACHMENT_MAX_BYTES} bytes.")
+        return value
+
+
+class PrescriptionSerializer(RelatedLookupMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    doctor = RelatedLookupField(queryset=Doctor.objects.all(), required=False)
+    patient = RelatedLookupField(queryset=Patient.objects.all())
+    case = RelatedLookupField(queryset=Case.objects.all())
     attachments = PrescriptionAttachmentSerializer(many=True, read_only=True)
 
+    related_via = {"patient": ("case", "patient")}
+    prefetch_related_fields = {"attachments": ("attachments",)}
+    values_fast_path = True
+    values_fields = {"attachments": (("id",), "attachments_from_values")}
+
     class Meta:
         model = Prescription
         fields = [
@@ -105,38 +524,73 @@ class PrescriptionSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["prescription_number", "created_at", "updated_at"]
 
+    def load_related_values(self, rows: list[dict]) -> None:
+        if "attachments" not in self.fields:
+            return
+        for row in rows:
+            row["attachments"] = []
+        by_prescription = {row["id"]: row["attachments"] for row in rows}
+        child = self.fields["attachments"].child
+        plan = child.values_plan()
+        attachments = list(
+            PrescriptionAttachment.objects.filter(prescription_id__in=by_prescription).values(*child.values_keys(plan))
+        )
+        for attachment, representation in zip(attachments, child.represent_values(attachments, plan)):
+            by_prescription[attachment["prescription"]].append(representation)
+
+    def attachments_from_values(self, row: dict) -> list[dict]:
+        return row["attachments"]
+
+    def requesting_doctor(self) -> Doctor | None:
+        request = self.context.get("request")
+        if request and getattr(request.user, "role", None) == User.Role.DOCTOR:
+            return getattr(request.user, "doctor_profile", None)
+        return None
+
+    def lookup_queryset(self, name: str) -> QuerySet:
+        queryset = super().lookup_queryset(name)
+        doctor = self.requesting_doctor()
+        if name == "case" and doctor is not None:
+            # The visibility rule of the case endpoints, read with the case row.
+            queryset = queryset.annotate(accessible=Exists(doctor_case_ids(doctor).filter(case_id=OuterRef("pk"))))
+        return queryset
+
     def validate(self, attrs: dict) -> dict:
-        case = attrs.get("case") or getattr(self.instance, "case", None)
-        patient = attrs.get("patient") or getattr(self.instance, "patient", None)
+        doctor = self.requesting_doctor()
+        case = attrs.get("case")
+        if case is None and self.instance is not None and ("patient" in attrs or doctor is not None):
+            case = self.lookup_queryset("case").get(pk=self.instance.case_id)
+        patient_id = attrs["patient"].pk if "patient" in attrs else getattr(self.instance, "patient_id", None)
 
-        if case and patient and case.patient_id != patient.id:
+        if case and patient_id and case.patient_id != patient_id:
             raise serializers.ValidationError({"patient": "Patient must match the case patient."})
 
-        # Allow doctors to create prescriptions if they have access to the case
-        # The viewset's get_queryset already filters cases appropriately
-        request = self.context.get("request")
-        if request and getattr(request.user, "role", None) == User.Role.DOCTOR:
-            doctor = getattr(request.user, "doctor_profile", None)
-            if doctor and case:
-                # Check if doctor has access to this case
-                is_attending = case.patient.attending_doctor_id == doctor.id
-                is_assigned = case.assigned_doctors.filter(id=doctor.id).exists()
-                if not (is_attending or is_assigned):
-                    raise serializers.ValidationError(
-                        {"case": "You do not have access to this case."}
-                    )
+        # Doctors may only write prescriptions on cases they can see.
+        if doctor and case and not case.accessible:
+            raise serializers.ValidationError({"case": "You do not have access to this case."})
 
         return attrs
 
 
-class CaseSerializer(serializers.ModelSerializer):
-    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
+class CaseSerializer(RelatedLookupMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    patient = RelatedLookupField(queryset=Patient.objects.all())
     created_by = serializers.PrimaryKeyRelatedField(read_only=True)
-    assigned_doctors = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all(), many=True, required=False)
+    assigned_doctors = RelatedLookupField(queryset=Doctor.objects.all(), many=True, required=False)
     attachments = CaseAttachmentSerializer(many=True, read_only=True)
     prescriptions = PrescriptionSerializer(many=True, read_only=True)
-    patient_name = serializers.SerializerMethodField()
-    assigned_doctor_names = serializers.SerializerMethodField()
+    patient_name = AnnotatedField(lambda case: full_name(case.patient.first_name, case.patient.last_name))
+    assigned_doctor_names = AnnotatedField(lambda case: [doctor_label(doctor) for doctor in case.assigned_doctors.all()])
+
+    prefetch_related_fields = {
+        "assigned_doctors": ("assigned_doctors__user",),
+        "assigned_doctor_names": ("assigned_doctors__user",),
+        "attachments": ("attachments",),
+        "prescriptions": ("prescriptions__attachments",),
+    }
+    annotated_fields = {
+        "patient_name": lambda: full_name_sql("patient__"),
+        "assigned_doctor_names": doctor_labels_sql,
+    }
 
     class Meta:
         model = Case
@@ -159,23 +613,56 @@ class CaseSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ["case_number", "created_at", "updated_at", "created_by", "patient_name", "assigned_doctor_names"]
 
-    def get_patient_name(self, obj: Case) -> str:
-        return f"{obj.patient.first_name} {obj.patient.last_name}".strip()
-
-    def get_assigned_doctor_names(self, obj: Case) -> list[str]:
-        return [str(doctor) for doctor in obj.assigned_doctors.all()]
-
     def create(self, validated_data: dict) -> Case:
         assigned_doctors = validated_data.pop("assigned_doctors", [])
         case = Case.objects.create(**validated_data)
         if not assigned_doctors and case.patient.attending_doctor_id:
-            assigned_doctors = [case.patient.attending_doctor]
+            assigned_doctors = [case.patient.attending_doctor_id]
         if assigned_doctors:
             case.assigned_doctors.set(assigned_doctors)
         return case
 
 
-class SignupSerializer(serializers.ModelSerializer):
+class CaseSummarySerializer(CaseSerializer):
+    """Lean case representation for list responses.
+
+    The clinical text and the nested prescription/attachment trees are only
+    rendered when requested through ``?expand=``; counts come from SQL.
+    """
+
+    prescription_count = serializers.IntegerField(read_only=True)
+    attachment_count = serializers.IntegerField(read_only=True)
+
+    expandable_fields = ("description", "symptoms", "details", "attachments", "prescriptions")
+    annotated_fields = {
+        **CaseSerializer.annotated_fields,
+        "prescription_count": lambda: child_count(Prescription, "case"),
+        "attachment_count": lambda: child_count(CaseAttachment, "case"),
+    }
+
+    class Meta(CaseSerializer.Meta):
+        fields = [
+            "id",
+            "case_number",
+            "name",
+            "description",
+            "symptoms",
+            "details",
+            "patient",
+            "patient_name",
+            "created_by",
+            "assigned_doctors",
+            "assigned_doctor_names",
+            "prescription_count",
+            "attachment_count",
+            "attachments",
+            "prescriptions",
+            "created_at",
+            "updated_at",
+        ]
+
+
+class SignupSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True)
     specialty = serializers.CharField(write_only=True, required=False, allow_blank=True)
     license_number = serializers.CharField(write_only=True, required=False, allow_blank=True)
@@ -222,9 +709,14 @@ class SignupSerializer(serializers.ModelSerializer):
         return user
 
 
-class AdminUserDetailSerializer(serializers.ModelSerializer):
-    doctor_profile = DoctorProfileSerializer(read_only=True, source="doctor_profile")
-    receptionist_profile = ReceptionistProfileSerializer(read_only=True, source="receptionist_profile")
+class AdminUserDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    doctor_profile = DoctorProfileSerializer(read_only=True)
+    receptionist_profile = ReceptionistProfileSerializer(read_only=True)
+
+    select_related_fields = {
+        "doctor_profile": ("doctor_profile",),
+        "receptionist_profile": ("receptionist_profile",),
+    }
 
     class Meta:
         model = User
@@ -241,7 +733,7 @@ class AdminUserDetailSerializer(serializers.ModelSerializer):
         ]
 
 
-class AdminUserUpdateSerializer(serializers.ModelSerializer):
+class AdminUserUpdateSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False, allow_blank=True)
     specialty = serializers.CharField(write_only=True, required=False, allow_blank=True)
     license_number = serializers.CharField(write_only=True, required=False, allow_blank=True)
@@ -307,14 +799,26 @@ class AdminUserUpdateSerializer(serializers.ModelSerializer):
         return instance
 
 
-class AppointmentSerializer(serializers.ModelSerializer):
-    patient = serializers.PrimaryKeyRelatedField(queryset=Patient.objects.all())
-    case = serializers.PrimaryKeyRelatedField(queryset=Case.objects.all(), required=False, allow_null=True)
-    doctor = serializers.PrimaryKeyRelatedField(queryset=Doctor.objects.all())
+class AppointmentSerializer(RelatedLookupMixin, SparseFieldsetMixin, serializers.ModelSerializer):
+    patient = RelatedLookupField(queryset=Patient.objects.all())
+    case = RelatedLookupField(queryset=Case.objects.all(), required=False, allow_null=True)
+    doctor = RelatedLookupField(queryset=Doctor.objects.all())
     created_by = serializers.PrimaryKeyRelatedField(read_only=True)
-    patient_name = serializers.SerializerMethodField()
-    case_name = serializers.SerializerMethodField()
-    doctor_name = serializers.SerializerMethodField()
+    patient_name = AnnotatedField(
+        lambda appointment: full_name(appointment.patient.first_name, appointment.patient.last_name)
+    )
+    case_name = AnnotatedField(
+        lambda appointment: appointment.case.name or appointment.case.case_number if appointment.case else "New Case"
+    )
+    doctor_name = AnnotatedField(lambda appointment: doctor_label(appointment.doctor))
+
+    annotated_fields = {
+        "patient_name": lambda: full_name_sql("patient__"),
+        "case_name": lambda: case_label_sql("case__"),
+        "doctor_name": lambda: doctor_label_sql("doctor__"),
+    }
+    related_via = {"patient": ("case", "patient")}
+    values_fast_path = True
 
     class Meta:
         model = Appointment
@@ -331,19 +835,131 @@ class AppointmentSerializer(serializers.ModelSerializer):
             "notes",
             "status",
             "scheduled_at",
+            "duration_minutes",
+            "ends_at",
             "created_at",
             "updated_at",
         ]
         read_only_fields = ["appointment_number", "created_at", "updated_at", "created_by"]
 
-    def get_patient_name(self, obj: Appointment) -> str:
-        return f"{obj.patient.first_name} {obj.patient.last_name}".strip()
+    @transaction.atomic
+    def create(self, validated_data: dict) -> Appointment:
+        from .scheduling import check_availability
+
+        check_availability(None, validated_data)
+        return super().create(validated_data)
+
+    @transaction.atomic
+    def update(self, instance: Appointment, validated_data: dict) -> Appointment:
+        from .scheduling import check_availability
+
+        check_availability(instance, validated_data)
+        return super().update(instance, validated_data)
+
+
+class DoctorScheduleSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    class Meta:
+        model = DoctorSchedule
+        fields = ["id", "doctor", "weekday", "starts_at", "ends_at", "slot_minutes"]
+
+    def validate(self, attrs: dict) -> dict:
+        def current(name: str):
+            return attrs[name] if name in attrs else getattr(self.instance, name)
+
+        starts_at, ends_at = current("starts_at"), current("ends_at")
+        if ends_at <= starts_at:
+            raise serializers.ValidationError({"ends_at": ["Must be after starts_at."]})
+        # Slot search sweeps a doctor's blocks in start order, so they must not overlap.
+        overlapping = DoctorSchedule.objects.filter(
+            doctor=current("doctor"), weekday=current("weekday"), starts_at__lt=ends_at, ends_at__gt=starts_at
+        )
+        if self.instance is not None:
+            overlapping = overlapping.exclude(pk=self.instance.pk)
+        if overlapping.exists():
+            raise serializers.ValidationError("Overlaps another block of the doctor's hours on that day.")
+        return attrs
+
+
+class SlotSearchSerializer(serializers.Serializer):
+    """Query parameters of the appointment slot search."""
+
+    start = serializers.DateTimeField(required=False)
+    end = serializers.DateTimeField(required=False)
+    specialty = serializers.CharField(required=False, allow_blank=True)
+    doctor = serializers.ListField(child=serializers.IntegerField(), required=False)
+    duration = serializers.IntegerField(min_value=5, max_value=MAX_APPOINTMENT_MINUTES, default=30)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+
+    def validate(self, attrs: dict) -> dict:
+        attrs.setdefault("start", timezone.now())
+        attrs.setdefault("end", attrs["start"] + timedelta(days=7))
+        if attrs["end"] <= attrs["start"]:
+            raise serializers.ValidationError({"end": ["Must be after start."]})
+        if attrs["end"] - attrs["start"] > timedelta(days=settings.APPOINTMENT_SLOT_SEARCH_MAX_DAYS):
+            raise serializers.ValidationError(
+                {"end": [f"Search at most {settings.APPOINTMENT_SLOT_SEARCH_MAX_DAYS} days at a time."]}
+            )
+        return attrs
+
+
+class PatientChartSerializer(PatientSerializer):
+    """A patient with their cases and appointments, as ``GET /api/patients/<id>/chart/`` renders them.
+
+    The view prefetches ``cases`` and ``appointments`` through the case and
+    appointment serializers' ``optimize_queryset``, narrowed to what the user
+    may see, so rendering runs no queries of its own.
+    """
+
+    cases = CaseSerializer(many=True, read_only=True)
+    appointments = AppointmentSerializer(many=True, read_only=True)
+
+    values_fast_path = False
+
+    class Meta(PatientSerializer.Meta):
+        fields = [*PatientSerializer.Meta.fields, "cases", "appointments"]
+
+
+class SlotSerializer(serializers.Serializer):
+    doctor = serializers.IntegerField(source="doctor_id")
+    doctor_name = serializers.CharField()
+    start = serializers.DateTimeField()
+    end = serializers.DateTimeField()
+
+
+class JobSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    """A background job; creating one queues a registered task by name."""
+
+    class Meta:
+        model = Job
+        fields = [
+            "id",
+            "name",
+            "payload",
+            "status",
+            "attempts",
+            "max_attempts",
+            "run_at",
+            "started_at",
+            "heartbeat_at",
+            "finished_at",
+            "last_error",
+            "created_at",
+        ]
+        read_only_fields = [field for field in fields if field not in {"name", "payload"}]
+
+    def validate_name(self, value: str) -> str:
+        from .jobs import TASKS
+
+        if value not in TASKS:
+            raise serializers.ValidationError(f"Unknown job. Registered: {', '.join(sorted(TASKS))}.")
+        return value
 
-    def get_case_name(self, obj: Appointment) -> str:
-        if obj.case:
-            return obj.case.name or obj.case.case_number
-        return "New Case"
+    def validate_payload(self, value) -> dict:
+        if not isinstance(value, dict):
+            raise serializers.ValidationError("Expected an object of keyword arguments.")
+        return value
 
-    def get_doctor_name(self, obj: Appointment) -> str:
-        return str(obj.doctor)
+    def create(self, validated_data: dict) -> Job:
+        from .jobs import enqueue
 
+        return enqueue(validated_data["name"], validated_data.get("payload"))
@@ -0,0 +1,235 @@
+"""Signal handlers keeping derived state in step with the core models."""
+from __future__ import annotations
+
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import access, blobs, caching, sync
+from .authentication import user_cache
+from .models import (
+    Appointment,
+    Case,
+    CaseAccess,
+    CaseAttachment,
+    Doctor,
+    Patient,
+    Prescription,
+    PrescriptionAttachment,
+    Receptionist,
+    User,
+)
+
+# Cache scopes invalidated by writes to each model (see ``core.caching``).
+MODEL_SCOPES = {
+    User: ("staff",),
+    Doctor: ("staff",),
+    Receptionist: ("staff",),
+    Patient: ("patients", "cases"),
+    Case: ("cases",),
+    CaseAttachment: ("cases",),
+    Prescription: ("prescriptions", "cases"),
+    PrescriptionAttachment: ("prescriptions",),
+    Appointment: ("appointments",),
+}
+
+
+def invalidate_cached_user(user_id) -> None:
+    # Drop the entry now and again after commit, so a request racing the write
+    # cannot re-cache the pre-commit row.
+    user_cache.invalidate(user_id)
+    transaction.on_commit(lambda: user_cache.invalidate(user_id))
+
+
+def bump_cache_versions(*scopes: str) -> None:
+    # Same double bump as above: entries cached between the write and the
+    # commit were built from the pre-commit rows.
+    caching.bump_versions(*scopes)
+    transaction.on_commit(lambda: caching.bump_versions(*scopes))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance: User, **kwargs) -> None:
+    invalidate_cached_user(instance.pk)
+
+
+@receiver(post_save, sender=Doctor)
+@receiver(post_delete, sender=Doctor)
+@receiver(post_save, sender=Receptionist)
+@receiver(post_delete, sender=Receptionist)
+def role_profile_changed(sender, instance, **kwargs) -> None:
+    invalidate_cached_user(instance.user_id)
+
+
+@receiver(m2m_changed, sender=Case.assigned_doctors.through)
+def assigned_doctors_changed(sender, instance, action: str, reverse: bool, pk_set, **kwargs) -> None:
+    """Keep CaseAccess, the cached case lists and the cases' ETags in step with an assignment change."""
+
+    # ``reverse`` is True when the change went through ``doctor.assigned_cases``.
+    if action == "pre_clear" and reverse:
+        # The cleared case ids are gone by post_clear.
+        instance._cleared_case_ids = list(instance.assigned_cases.values_list("pk", flat=True))
+        return
+    if action not in {"post_add", "post_remove", "post_clear"} or (action != "post_clear" and not pk_set):
+        return
+    if action == "post_add":
+        if reverse:
+            access.grant_assigned((case_id, instance.pk) for case_id in pk_set)
+        else:
+            access.grant_assigned((instance.pk, doctor_id) for doctor_id in pk_set)
+    elif action == "post_remove":
+        if reverse:
+            access.revoke_assigned(case_ids=pk_set, doctor_ids=[instance.pk])
+        else:
+            access.revoke_assigned(case_ids=[instance.pk], doctor_ids=pk_set)
+    elif reverse:
+        access.revoke_assigned(doctor_ids=[instance.pk])
+    else:
+        access.revoke_assigned(case_ids=[instance.pk])
+
+    bump_cache_versions("cases")
+    if not reverse:
+        touch(Case, [instance.pk])
+    elif action == "post_clear":
+        touch(Case, instance.__dict__.pop("_cleared_case_ids", []))
+    else:
+        touch(Case, pk_set)
+
+
+# Scope-defining foreign keys; their previous value is known in pre_save so a
+# change can move access and tombstone the record for whoever lost it.
+TRACKED_FIELDS = {
+    Case: "patient",
+    Patient: "attending_doctor",
+    Appointment: "doctor",
+}
+
+
+@receiver(post_init, sender=Case)
+@receiver(post_init, sender=Patient)
+@receiver(post_init, sender=Appointment)
+def load_scope_owner(sender, instance, **kwargs) -> None:
+    # Absent when the column was deferred; pre_save then reads it from the row.
+    attname = f"{TRACKED_FIELDS[sender]}_id"
+    if attname in instance.__dict__:
+        instance._loaded_owner_id = instance.__dict__[attname]
+
+
+@receiver(pre_save, sender=Case)
+@receiver(pre_save, sender=Patient)
+@receiver(pre_save, sender=Appointment)
+def remember_scope_owner(sender, instance, update_fields=None, **kwargs) -> None:
+    field = TRACKED_FIELDS[sender]
+    attname = f"{field}_id"
+    if update_fields is not None and not {field, attname} & set(update_fields):
+        # The owner column is not written, so it cannot change.
+        instance._previous_owner_id = None
+        return
+    if instance._state.adding or instance.pk is None:
+        previous = None
+    elif "_loaded_owner_id" in instance.__dict__:
+        previous = instance._loaded_owner_id
+    else:
+        previous = sender.objects.filter(pk=instance.pk).values_list(attname, flat=True).first()
+    instance._previous_owner_id = previous
+    instance._loaded_owner_id = getattr(instance, attname)
+
+
+def owner_changed(instance) -> bool:
+    previous = getattr(instance, "_previous_owner_id", None)
+    return previous is not None and previous != getattr(instance, f"{TRACKED_FIELDS[type(instance)]}_id")
+
+
+@receiver(post_save, sender=Case)
+def case_saved(sender, instance: Case, created: bool, **kwargs) -> None:
+    if created or owner_changed(instance):
+        access.sync_case_attending(instance)
+
+
+@receiver(post_save, sender=Patient)
+def patient_saved(sender, instance: Patient, created: bool, **kwargs) -> None:
+    if owner_changed(instance):
+        access.sync_patient_attending(instance, instance._previous_owner_id)
+
+
+@receiver(post_save, sender=Appointment)
+def appointment_saved(sender, instance: Appointment, created: bool, **kwargs) -> None:
+    if owner_changed(instance):
+        sync.record_revocations("appointment", [(instance._previous_owner_id, instance.pk)])
+
+
+# Tombstones are written in pre_delete: by post_delete a cascade has already
+# removed the CaseAccess rows that say which doctors could see a case.
+@receiver(pre_delete, sender=Patient)
+def patient_deleted(sender, instance: Patient, **kwargs) -> None:
+    sync.record_deletion(instance, [instance.attending_doctor_id], instance.created_by_id)
+
+
+@receiver(pre_delete, sender=Case)
+def case_deleted(sender, instance: Case, **kwargs) -> None:
+    doctor_ids = CaseAccess.objects.filter(case=instance).values_list("doctor_id", flat=True)
+    sync.record_deletion(instance, doctor_ids, instance.created_by_id)
+
+
+@receiver(pre_delete, sender=Prescription)
+def prescription_deleted(sender, instance: Prescription, **kwargs) -> None:
+    doctor_ids = list(
+        CaseAccess.objects.filter(case_id=instance.case_id, reason=CaseAccess.Reason.ASSIGNED).values_list(
+            "doctor_id", flat=True
+        )
+    )
+    receptionist_id = Case.objects.filter(pk=instance.case_id).values_list("created_by_id", flat=True).first()
+    sync.record_deletion(instance, [instance.doctor_id, *doctor_ids], receptionist_id)
+
+
+@receiver(pre_delete, sender=Appointment)
+def appointment_deleted(sender, instance: Appointment, **kwargs) -> None:
+    sync.record_deletion(instance, [instance.doctor_id], instance.created_by_id)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def model_written(sender, **kwargs) -> None:
+    scopes = MODEL_SCOPES.get(sender)
+    if scopes:
+        bump_cache_versions(*scopes)
+
+
+def touch(model, pks) -> None:
+    """Bump ``updated_at`` on parents whose representation embeds the changed rows."""
+
+    model.objects.filter(pk__in=pks).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Prescription)
+@receiver(post_delete, sender=Prescription)
+@receiver(post_save, sender=CaseAttachment)
+@receiver(post_delete, sender=CaseAttachment)
+def case_child_written(sender, instance, **kwargs) -> None:
+    touch(Case, [instance.case_id])
+
+
+@receiver(post_save, sender=PrescriptionAttachment)
+@receiver(post_delete, sender=PrescriptionAttachment)
+def prescription_child_written(sender, instance: PrescriptionAttachment, **kwargs) -> None:
+    touch(Prescription, [instance.prescription_id])
+    # ``update()`` sends no signals, so the case embedding the prescription is touched here too.
+    touch(Case, Prescription.objects.filter(pk=instance.prescription_id).values("case_id"))
+
+
+@receiver(post_save, sender=CaseAttachment)
+@receiver(post_save, sender=PrescriptionAttachment)
+def attachment_blob_referenced(sender, instance, created: bool, **kwargs) -> None:
+    if created and instance.blob_id is not None:
+        blobs.adjust_refcount(instance.blob_id, 1)
+
+
+@receiver(post_delete, sender=CaseAttachment)
+@receiver(post_delete, sender=PrescriptionAttachment)
+def attachment_blob_released(sender, instance, **kwargs) -> None:
+    # Cascades from a deleted case or prescription land here too; the file
+    # itself goes once gc_blobs finds the blob unreferenced.
+    if instance.blob_id is not None:
+        blobs.adjust_refcount(instance.blob_id, -1)
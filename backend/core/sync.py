@@ -0,0 +1,209 @@
+"""Delta-sync feed: rows changed since a cursor plus tombstones for rows that left scope."""
+from __future__ import annotations
+
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+from typing import Iterable, NamedTuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from .models import Tombstone, User
+
+SYNC_PARAM = "updated_since"
+SYNC_HEADER = "X-Sync-Cursor"
+
+
+class CursorExpired(APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = "Sync cursor is older than the tombstone retention window; reload the full list."
+    default_code = "cursor_expired"
+
+
+class SyncCursor(NamedTuple):
+    """Keyset positions in the ``(updated_at, id)`` row feed and the ``(deleted_at, id)`` tombstone feed."""
+
+    updated_at: datetime
+    row_id: int
+    deleted_at: datetime
+    tombstone_id: int
+
+
+def horizon() -> datetime:
+    """Newest timestamp the feed may hand out.
+
+    ``updated_at`` is stamped before commit, so a slow transaction can commit a
+    row older than rows already served.  Stopping ``DELTA_SYNC_LAG`` seconds
+    short of now leaves room for those commits instead of skipping them.
+    """
+
+    return timezone.now() - timedelta(seconds=settings.DELTA_SYNC_LAG)
+
+
+def initial_cursor() -> str:
+    now = horizon()
+    return encode_cursor(SyncCursor(now, 0, now, 0))
+
+
+def encode_cursor(cursor: SyncCursor) -> str:
+    payload = {
+        "u": cursor.updated_at.isoformat(),
+        "i": cursor.row_id,
+        "d": cursor.deleted_at.isoformat(),
+        "t": cursor.tombstone_id,
+    }
+    return urlsafe_b64encode(json.dumps(payload, separators=(",", ":")).encode("ascii")).decode("ascii")
+
+
+def decode_cursor(raw: str) -> SyncCursor:
+    """Accept a cursor from an earlier response or, to start, an ISO-8601 timestamp."""
+
+    try:
+        stamp = parse_datetime(raw)
+    except ValueError:
+        stamp = None
+    if stamp is not None:
+        if timezone.is_naive(stamp):
+            stamp = timezone.make_aware(stamp)
+        return SyncCursor(stamp, 0, stamp, 0)
+    try:
+        payload = json.loads(urlsafe_b64decode(raw.encode("ascii")))
+        return SyncCursor(
+            datetime.fromisoformat(payload["u"]), int(payload["i"]), datetime.fromisoformat(payload["d"]), int(payload["t"])
+        )
+    except (TypeError, ValueError, KeyError, UnicodeEncodeError):
+        raise ValidationError({SYNC_PARAM: "Invalid sync cursor."})
+
+
+def record_deletion(instance, doctor_ids: Iterable[int | None], receptionist_id: int | None) -> None:
+    """Tombstone ``instance`` for admins, its receptionist and every doctor who could see it."""
+
+    model = instance._meta.model_name
+    now = timezone.now()
+    rows = [Tombstone(model=model, object_id=instance.pk, receptionist_id=receptionist_id, deleted_at=now)]
+    rows.extend(
+        Tombstone(model=model, object_id=instance.pk, doctor_id=doctor_id, deleted_at=now)
+        for doctor_id in set(doctor_ids)
+        if doctor_id is not None
+    )
+    Tombstone.objects.bulk_create(rows)
+
+
+def record_revocations(model: str, pairs: Iterable[tuple[int, int]]) -> None:
+    """Tombstone ``(doctor_id, object_id)`` pairs the doctor can no longer see."""
+
+    now = timezone.now()
+    Tombstone.objects.bulk_create(
+        [
+            Tombstone(model=model, object_id=object_id, doctor_id=doctor_id, reason=Tombstone.Reason.REVOKED, deleted_at=now)
+            for doctor_id, object_id in set(pairs)
+            if doctor_id is not None
+        ]
+    )
+
+
+def visible_tombstones(user: User, model: str) -> QuerySet:
+    tombstones = Tombstone.objects.filter(model=model)
+    if user.role == User.Role.ADMIN:
+        return tombstones.filter(doctor__isnull=True)
+    if user.role == User.Role.DOCTOR:
+        doctor_profile = getattr(user, "doctor_profile", None)
+        if doctor_profile:
+            return tombstones.filter(doctor=doctor_profile)
+    if user.role == User.Role.RECEPTIONIST:
+        receptionist_profile = getattr(user, "receptionist_profile", None)
+        if receptionist_profile:
+            return tombstones.filter(doctor__isnull=True, receptionist=receptionist_profile)
+    return tombstones.none()
+
+
+def after(stamp_field: str, stamp: datetime, row_id: int) -> Q:
+    return Q(**{f"{stamp_field}__gt": stamp}) | Q(**{stamp_field: stamp, "id__gt": row_id})
+
+
+class DeltaSyncMixin:
+    """``?updated_since=<cursor>`` on list: changed rows in scope plus evicted ids.
+
+    Plain list responses carry an ``X-Sync-Cursor`` header to start from.  Each
+    delta response returns up to a page of changed rows (serialized as in the
+    list) and of tombstones, the cursor to send next, and ``has_more`` while
+    either feed still has a backlog.
+    """
+
+    def list(self, request, *args, **kwargs):
+        raw = request.query_params.get(SYNC_PARAM)
+        if raw is None:
+            # Taken before the list query so nothing it misses falls behind the cursor.
+            cursor = initial_cursor()
+            response = super().list(request, *args, **kwargs)
+            response[SYNC_HEADER] = cursor
+            return response
+        return self.delta(request, decode_cursor(raw))
+
+    def delta(self, request, cursor: SyncCursor) -> Response:
+        rows, tombstones, limit, until = self.delta_queries(request, cursor)
+        return self.delta_response(request, cursor, list(rows), list(tombstones), limit, until)
+
+    async def adelta(self, request, cursor: SyncCursor) -> Response:
+        rows, tombstones, limit, until = self.delta_queries(request, cursor)
+        return self.delta_response(
+            request,
+            cursor,
+            [row async for row in rows.aiterator(chunk_size=limit + 1)],
+            # values_list() iterables run their query when iteration starts, which
+            # aiterator() does on the event loop.
+            await sync_to_async(list)(tombstones),
+            limit,
+            until,
+        )
+
+    def delta_queries(self, request, cursor: SyncCursor) -> tuple[QuerySet, QuerySet, int, datetime]:
+        if cursor.deleted_at < timezone.now() - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS):
+            raise CursorExpired()
+        limit = self.paginator.get_page_size(request) if self.paginator else api_settings.PAGE_SIZE
+        limit = limit or api_settings.PAGE_SIZE
+        until = horizon()
+
+        rows = (
+            self.filter_queryset(self.get_queryset())
+            .filter(after("updated_at", cursor.updated_at, cursor.row_id), updated_at__lte=until)
+            .order_by("updated_at", "id")[: limit + 1]
+        )
+        tombstones = (
+            visible_tombstones(request.user, self.queryset.model._meta.model_name)
+            .filter(after("deleted_at", cursor.deleted_at, cursor.tombstone_id), deleted_at__lte=until)
+            .order_by("deleted_at", "id")
+            .values_list("id", "object_id", "deleted_at")[: limit + 1]
+        )
+        return rows, tombstones, limit, until
+
+    def delta_response(
+        self, request, cursor: SyncCursor, rows: list, tombstones: list, limit: int, until: datetime
+    ) -> Response:
+        has_more = len(rows) > limit or len(tombstones) > limit
+        rows, tombstones = rows[:limit], tombstones[:limit]
+
+        # A drained feed jumps to the horizon; a full page resumes after its last entry.
+        row_position = (rows[-1].updated_at, rows[-1].id) if len(rows) == limit else (max(until, cursor.updated_at), 0)
+        tombstone_position = (
+            (tombstones[-1][2], tombstones[-1][0]) if len(tombstones) == limit else (max(until, cursor.deleted_at), 0)
+        )
+        next_cursor = encode_cursor(SyncCursor(*row_position, *tombstone_position))
+        return Response(
+            {
+                "results": self.get_serializer(rows, many=True).data,
+                "deleted": [{"id": object_id, "deleted_at": deleted_at} for _id, object_id, deleted_at in tombstones],
+                "cursor": next_cursor,
+                "has_more": has_more,
+                "next": replace_query_param(request.build_absolute_uri(), SYNC_PARAM, next_cursor) if has_more else None,
+            }
+        )
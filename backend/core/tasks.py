@@ -0,0 +1,62 @@
+"""Background jobs registered with ``core.jobs``: the periodic purges and queued patient exports.
+
+Enqueue them with ``jobs.enqueue(name, payload)`` from code, or ``POST /api/admin/jobs/``.
+"""
+from __future__ import annotations
+
+from datetime import timedelta
+from io import StringIO
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.utils import timezone
+
+from . import blobs, exports, tokens
+from .jobs import task
+from .models import Job
+
+
+@task()
+def purge_expired_tokens() -> None:
+    tokens.purge_expired_tokens()
+
+
+@task()
+def collect_blobs(grace_hours: float = 24) -> None:
+    blobs.collect(timedelta(hours=grace_hours))
+
+
+@task()
+def prune_tombstones() -> None:
+    call_command("prune_tombstones", stdout=StringIO())
+
+
+@task()
+def purge_upload_sessions() -> None:
+    call_command("purge_upload_sessions", stdout=StringIO())
+
+
+@task(max_attempts=3)
+def export_patients(path: str, **params) -> None:
+    """Write the admin patient export for ``params`` (those of ``GET /api/admin/patients/export/``) to ``path``."""
+
+    serializer = exports.ExportParamsSerializer(data=params)
+    serializer.is_valid(raise_exception=True)
+    options = dict(serializer.validated_data)
+    file_format = options.pop("type")
+    queryset = exports.patients_to_export(**options)
+    exports.save_export(path, queryset, file_format, chunk_size=settings.PATIENT_EXPORT_CHUNK_SIZE)
+
+
+@task()
+def purge_finished_jobs(batch_size: int = 5000) -> None:
+    """Delete DONE jobs older than JOB_RETENTION_DAYS, and their export files; failed ones are kept for inspection."""
+
+    cutoff = timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS)
+    finished = Job.objects.filter(status=Job.Status.DONE, finished_at__lt=cutoff)
+    while rows := list(finished.order_by("finished_at").values_list("id", "name", "payload")[:batch_size]):
+        for _id, name, payload in rows:
+            if name == "export_patients":
+                default_storage.delete(payload["path"])
+        Job.objects.filter(id__in=[row[0] for row in rows]).delete()
@@ -1,11 +1,80 @@
 """Minimal smoke tests for API endpoints."""
 from __future__ import annotations
 
+import csv
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
+from pathlib import Path
+from time import sleep
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.db.models import QuerySet
+from django.test import AsyncRequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory, APITestCase
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import attachments, identifiers, jobs, metrics, replicas
+from .attachments import UploadConflict
+from .async_views import AsyncReadView
+from .authentication import user_cache
+from .models import (
+    Appointment,
+    Blob,
+    Case,
+    CaseAccess,
+    CaseAttachment,
+    Doctor,
+    DoctorSchedule,
+    Job,
+    Patient,
+    Prescription,
+    PrescriptionAttachment,
+    Receptionist,
+    UploadSession,
+    User,
+)
+from .renderers import ORJSONRenderer
+from .response_cache import local_cache as local_response_cache
+from .serializers import AppointmentSerializer, CaseSummarySerializer, PatientSerializer, PrescriptionSerializer
+from .tokens import blacklist_cache, purge_expired_tokens
+from .views import (
+    AppointmentViewSet,
+    CaseViewSet,
+    DoctorScheduleViewSet,
+    DoctorViewSet,
+    PatientViewSet,
+    PrescriptionViewSet,
+)
+
 
-from .models import User
+def create_staff(username: str, role: str, **profile) -> User:
+    user = User.objects.create_user(username=username, password="securePass123", role=role)
+    if role == User.Role.DOCTOR:
+        Doctor.objects.create(user=user, license_number=profile.get("license_number", f"LIC-{username}"))
+    elif role == User.Role.RECEPTIONIST:
+        Receptionist.objects.create(user=user, desk_number=profile.get("desk_number", ""))
+    return user
 
 
 class AuthenticationTests(APITestCase):
@@ -34,3 +103,1481 @@ class AuthenticationTests(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertTrue(User.objects.filter(username="recept1").exists())
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        self.admin = create_staff("admin1", User.Role.ADMIN)
+        doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        self.doctor = doctor_user.doctor_profile
+        self.client.force_authenticate(self.admin)
+
+    def create_patient(self, first_name: str, last_name: str) -> Patient:
+        return Patient.objects.create(
+            first_name=first_name,
+            last_name=last_name,
+            date_of_birth=date(1980, 1, 1),
+            attending_doctor=self.doctor,
+        )
+
+    def walk(self, url: str) -> list[int]:
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(row["id"] for row in response.data["results"])
+            url = response.data["next"]
+        return seen
+
+    def test_patient_pages_follow_name_ordering_with_id_tie_breaker(self):
+        for first_name in ["Ann", "Ann", "Bob", "Ann", "Cy"]:
+            self.create_patient(first_name, "Smith")
+        self.create_patient("Zed", "Adams")
+        expected = list(Patient.objects.order_by("last_name", "first_name", "id").values_list("id", flat=True))
+
+        self.assertEqual(self.walk(reverse("patients-list") + "?page_size=2"), expected)
+
+    def test_concurrent_insert_does_not_shift_page_boundary(self):
+        for index in range(4):
+            self.create_patient(f"P{index}", "Jones")
+        first_page = self.client.get(reverse("patients-list") + "?page_size=2")
+        self.create_patient("A", "Aaron")
+
+        remaining = self.walk(first_page.data["next"])
+        seen = [row["id"] for row in first_page.data["results"]] + remaining
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), 4)
+
+    def test_previous_link_returns_prior_page(self):
+        for index in range(5):
+            self.create_patient(f"P{index}", "Lee")
+        first_page = self.client.get(reverse("patients-list") + "?page_size=2")
+        second_page = self.client.get(first_page.data["next"])
+        back = self.client.get(second_page.data["previous"])
+
+        self.assertEqual(back.data["results"], first_page.data["results"])
+        self.assertIsNone(first_page.data["previous"])
+
+
+class CaseRepresentationTests(APITestCase):
+    def setUp(self):
+        self.admin = create_staff("admin1", User.Role.ADMIN)
+        self.doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        patient = Patient.objects.create(
+            first_name="Ada",
+            last_name="Byron",
+            date_of_birth=date(1990, 5, 1),
+            attending_doctor=self.doctor,
+        )
+        self.case = Case.objects.create(name="Migraine", symptoms="Headache", patient=patient)
+        self.case.assigned_doctors.set([self.doctor])
+        for index in range(2):
+            Prescription.objects.create(case=self.case, doctor=self.doctor, patient=patient, details=f"Rx {index}")
+        self.client.force_authenticate(self.admin)
+
+    def test_list_returns_summary_with_sql_counts(self):
+        response = self.client.get(reverse("cases-list"))
+
+        row = response.data["results"][0]
+        self.assertEqual(row["prescription_count"], 2)
+        self.assertEqual(row["attachment_count"], 0)
+        self.assertEqual(row["patient_name"], "Ada Byron")
+        self.assertNotIn("prescriptions", row)
+        self.assertNotIn("symptoms", row)
+
+    def test_retrieve_returns_full_tree(self):
+        response = self.client.get(reverse("cases-detail", args=[self.case.id]))
+
+        self.assertEqual(len(response.data["prescriptions"]), 2)
+        self.assertEqual(response.data["symptoms"], "Headache")
+
+    def test_fields_and_expand_select_output(self):
+        response = self.client.get(reverse("cases-list"), {"fields": "id,case_number", "expand": "prescriptions"})
+
+        row = response.data["results"][0]
+        self.assertEqual(set(row), {"id", "case_number", "prescriptions"})
+        self.assertEqual(len(row["prescriptions"]), 2)
+
+    def test_sparse_fields_skip_unused_joins(self):
+        with CaptureQueriesContext(connection) as full:
+            self.client.get(reverse("cases-list"))
+        with CaptureQueriesContext(connection) as sparse:
+            self.client.get(reverse("cases-list"), {"fields": "id,case_number"})
+
+        self.assertLess(len(sparse), len(full))
+
+
+class CaseAccessTests(APITestCase):
+    def setUp(self):
+        self.attending = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        self.specialist_user = create_staff("doc2", User.Role.DOCTOR)
+        self.specialist = self.specialist_user.doctor_profile
+        self.patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=self.attending
+        )
+        self.case = Case.objects.create(name="Migraine", patient=self.patient)
+
+    def visible_case_ids(self, user: User) -> list[int]:
+        self.client.force_authenticate(user)
+        response = self.client.get(reverse("cases-list"))
+        return [row["id"] for row in response.data["results"]]
+
+    def test_assignment_changes_grant_and_revoke_access(self):
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [])
+
+        self.case.assigned_doctors.add(self.specialist)
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [self.case.id])
+
+        self.specialist.assigned_cases.clear()
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [])
+
+    def test_attending_change_moves_access(self):
+        self.case.assigned_doctors.add(self.attending)
+        self.patient.attending_doctor = self.specialist
+        self.patient.save()
+
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [self.case.id])
+        self.assertEqual(
+            set(CaseAccess.objects.filter(case=self.case).values_list("doctor_id", "reason")),
+            {(self.attending.id, CaseAccess.Reason.ASSIGNED), (self.specialist.id, CaseAccess.Reason.ATTENDING)},
+        )
+
+    def test_saves_read_the_previous_owner_only_when_they_must(self):
+        def owner_reads(save) -> int:
+            with CaptureQueriesContext(connection) as captured:
+                save()
+            return sum('SELECT "core_patient"."attending_doctor_id"' in query["sql"] for query in captured)
+
+        patient = Patient.objects.get(pk=self.patient.pk)
+        patient.first_name = "Augusta"
+        self.assertEqual(owner_reads(lambda: patient.save(update_fields=["first_name"])), 0)
+        self.assertEqual(owner_reads(patient.save), 0)
+
+        deferred = Patient.objects.only("first_name").get(pk=self.patient.pk)
+        deferred.attending_doctor = self.specialist
+        self.assertEqual(owner_reads(deferred.save), 1)
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [self.case.id])
+
+        reloaded = Patient.objects.get(pk=self.patient.pk)
+        reloaded.attending_doctor = self.attending
+        self.assertEqual(owner_reads(reloaded.save), 0)
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [])
+
+    def test_reverse_clear_revokes_access_and_touches_the_cases(self):
+        self.case.assigned_doctors.add(self.specialist)
+        before = Case.objects.get(pk=self.case.pk).updated_at
+
+        self.specialist.assigned_cases.clear()
+
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [])
+        self.assertGreater(Case.objects.get(pk=self.case.pk).updated_at, before)
+
+    def test_rebuild_repairs_drift(self):
+        Patient.objects.filter(pk=self.patient.pk).update(attending_doctor=self.specialist)
+
+        with self.assertRaises(CommandError):
+            call_command("rebuild_case_access", check=True, stdout=StringIO())
+        call_command("rebuild_case_access", stdout=StringIO())
+        call_command("rebuild_case_access", check=True, stdout=StringIO())
+        self.assertEqual(self.visible_case_ids(self.specialist_user), [self.case.id])
+
+    def test_doctors_see_their_prescriptions_and_those_on_assigned_cases(self):
+        other_case = Case.objects.create(name="Checkup", patient=self.patient)
+        own = Prescription.objects.create(case=other_case, doctor=self.specialist, patient=self.patient, details="A")
+        on_assigned = Prescription.objects.create(case=self.case, doctor=self.attending, patient=self.patient)
+        both = Prescription.objects.create(case=self.case, doctor=self.specialist, patient=self.patient, details="B")
+        Prescription.objects.create(case=other_case, doctor=self.attending, patient=self.patient, details="C")
+        self.case.assigned_doctors.add(self.specialist)
+
+        self.client.force_authenticate(self.specialist_user)
+        response = self.client.get(reverse("prescriptions-list"))
+
+        self.assertEqual(sorted(row["id"] for row in response.data["results"]), [own.id, on_assigned.id, both.id])
+
+
+class ExplainQueriesCommandTests(APITestCase):
+    def test_reports_every_role_endpoint(self):
+        create_staff("admin1", User.Role.ADMIN)
+        create_staff("doc1", User.Role.DOCTOR)
+        create_staff("recept1", User.Role.RECEPTIONIST)
+        output = StringIO()
+
+        call_command("explain_queries", stdout=output)
+
+        report = output.getvalue()
+        self.assertIn("patients         DOCTOR", report)
+        self.assertIn("admin/users      ADMIN", report)
+        self.assertNotIn("admin/users      DOCTOR", report)
+
+
+class SyntheticDataCommandTests(APITestCase):
+    def test_seed_and_benchmark_small_dataset(self):
+        call_command(
+            "seed_synthetic",
+            doctors=3,
+            receptionists=2,
+            patients=20,
+            cases=40,
+            appointments=10,
+            batch_size=7,
+            seed=1,
+            stdout=StringIO(),
+        )
+        self.assertEqual(Patient.objects.count(), 20)
+        self.assertEqual(Case.objects.count(), 40)
+        self.assertFalse(Case.objects.filter(assigned_doctors__isnull=True).exists())
+        call_command("rebuild_case_access", check=True, stdout=StringIO())
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "run.json"
+            call_command("benchmark_endpoints", iterations=2, warmup=0, output=str(output), stdout=StringIO())
+            report = json.loads(output.read_text())
+
+        routes = {(row["route"], row["role"]) for row in report["results"]}
+        self.assertIn(("cases/", "DOCTOR"), routes)
+        self.assertIn(("auth/me/", "RECEPTIONIST"), routes)
+        self.assertTrue(all(row["status"] == 200 for row in report["results"]))
+
+
+class RequestMetricsTests(APITestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        overrides = self.settings(METRICS_DIR=Path(self.metrics_dir.name), METRICS_FLUSH_INTERVAL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.admin = create_staff("admin1", User.Role.ADMIN)
+
+    def test_metrics_endpoint_reports_view_histograms_and_queries(self):
+        self.client.force_authenticate(self.admin)
+        self.client.get(reverse("cases-list"))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response["Content-Type"].startswith("text/plain"))
+        body = response.content.decode()
+        self.assertIn('http_request_duration_seconds_count{view="CaseViewSet.list"}', body)
+        self.assertRegex(body, r'http_db_queries_total\{view="CaseViewSet.list"\} [1-9]')
+        self.assertIn('http_responses_total{view="CaseViewSet.list",status="200"}', body)
+
+    def test_concurrent_flushes_and_write_failures_never_raise(self):
+        errors = []
+
+        def flush_repeatedly():
+            try:
+                for _ in range(20):
+                    metrics.registry.flush()
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=flush_repeatedly) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        names = [path.name for path in Path(self.metrics_dir.name).iterdir()]
+        self.assertEqual(len(names), 1)
+        json.loads((Path(self.metrics_dir.name) / names[0]).read_text())
+
+        blocked = Path(self.metrics_dir.name) / "not-a-directory"
+        blocked.write_text("")
+        self.client.force_authenticate(self.admin)
+        with self.settings(METRICS_DIR=blocked / "metrics"), self.assertLogs("core.metrics", "WARNING"):
+            response = self.client.get(reverse("cases-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_files_of_exited_processes_are_folded_in_once(self):
+        identity = metrics.registry.identity
+        directory = Path(self.metrics_dir.name)
+        # An earlier process that had this pid, and a live one (the test runner's parent).
+        retired = {**identity, "start": "0", "views": {"Retired.list": {**metrics.empty_view_totals(), "count": 3}}}
+        (directory / f"metrics-{identity['pid']}-0.json").write_text(json.dumps(retired))
+        parent = os.getppid()
+        live = {**identity, "pid": parent, "start": metrics.process_start(parent), "views": {}}
+        (directory / f"metrics-{parent}-{live['start']}.json").write_text(json.dumps(live))
+        self.client.force_authenticate(self.admin)
+
+        for _ in range(2):
+            body = self.client.get(reverse("metrics")).content.decode()
+            self.assertIn('http_request_duration_seconds_count{view="Retired.list"} 3', body)
+
+        self.assertEqual(
+            sorted(path.name for path in directory.iterdir()),
+            sorted([f"metrics-{identity['pid']}-{identity['start']}.json", f"metrics-{parent}-{live['start']}.json"]),
+        )
+
+    def test_metrics_endpoint_is_admin_only(self):
+        self.client.force_authenticate(create_staff("doc1", User.Role.DOCTOR))
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CachedAuthenticationTests(APITestCase):
+    def setUp(self):
+        user_cache.clear()
+        self.addCleanup(user_cache.clear)
+        self.admin = create_staff("admin1", User.Role.ADMIN)
+        self.user = create_staff("recept1", User.Role.RECEPTIONIST)
+
+    def authenticate(self, user: User) -> None:
+        token = RefreshToken.for_user(user).access_token
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_warm_user_costs_no_auth_queries(self):
+        self.authenticate(self.user)
+        self.client.get(reverse("profile"))
+
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("profile"))
+
+        self.assertEqual(response.data["username"], "recept1")
+
+    def test_role_switch_invalidates_cached_profile(self):
+        Patient.objects.create(
+            first_name="Ada",
+            last_name="Byron",
+            date_of_birth=date(1990, 5, 1),
+            attending_doctor=create_staff("doc1", User.Role.DOCTOR).doctor_profile,
+            created_by=self.user.receptionist_profile,
+        )
+        self.authenticate(self.user)
+        self.assertEqual(len(self.client.get(reverse("patients-list")).data["results"]), 1)
+
+        self.authenticate(self.admin)
+        self.client.patch(
+            reverse("admin-users-detail", args=[self.user.id]),
+            {"role": "DOCTOR", "license_number": "LIC-9"},
+            format="json",
+        )
+        self.authenticate(self.user)
+
+        self.assertEqual(self.client.get(reverse("profile")).data["role"], "DOCTOR")
+        self.assertEqual(self.client.get(reverse("patients-list")).data["results"], [])
+
+    def test_deactivated_user_is_rejected(self):
+        self.authenticate(self.user)
+        self.client.get(reverse("profile"))
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(reverse("profile")).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class TokenBlacklistTests(APITestCase):
+    def setUp(self):
+        blacklist_cache.clear()
+        self.addCleanup(blacklist_cache.clear)
+        self.user = create_staff("recept1", User.Role.RECEPTIONIST)
+        self.refresh = RefreshToken.for_user(self.user)
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {self.refresh.access_token}")
+
+    def test_logged_out_refresh_token_is_rejected(self):
+        self.client.post(reverse("logout"), {"refresh": str(self.refresh)}, format="json")
+
+        response = self.client.post(reverse("token_refresh"), {"refresh": str(self.refresh)}, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_blacklist_written_elsewhere_is_picked_up_incrementally(self):
+        self.assertFalse(blacklist_cache.contains(self.refresh["jti"]))
+        RefreshToken(str(self.refresh)).blacklist()
+
+        with self.settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0):
+            self.assertTrue(blacklist_cache.contains(self.refresh["jti"]))
+
+    def test_blacklist_rows_committed_out_of_id_order_are_picked_up(self):
+        later = RefreshToken.for_user(self.user)
+        with self.settings(TOKEN_BLACKLIST_SYNC_INTERVAL=0):
+            self.assertFalse(blacklist_cache.contains(self.refresh["jti"]))
+            BlacklistedToken.objects.create(id=100, token=OutstandingToken.objects.get(jti=later["jti"]))
+            self.assertTrue(blacklist_cache.contains(later["jti"]))
+            # A logout that took a lower id and its timestamp first, but committed after id 100 was seen.
+            BlacklistedToken.objects.create(
+                id=50,
+                token=OutstandingToken.objects.get(jti=self.refresh["jti"]),
+                blacklisted_at=timezone.now() - timedelta(seconds=2),
+            )
+
+            self.assertTrue(blacklist_cache.contains(self.refresh["jti"]))
+
+    def test_purge_removes_only_expired_tokens_in_batches(self):
+        now = timezone.now()
+        for index in range(5):
+            token = OutstandingToken.objects.create(
+                user=self.user, jti=f"expired-{index}", token="t", expires_at=now - timedelta(hours=1)
+            )
+            BlacklistedToken.objects.create(token=token)
+        OutstandingToken.objects.create(user=self.user, jti="live", token="t", expires_at=now + timedelta(hours=1))
+
+        removed = purge_expired_tokens(batch_size=2, pause=0)
+
+        self.assertEqual(removed, 5)
+        self.assertFalse(OutstandingToken.objects.filter(jti__startswith="expired-").exists())
+        self.assertTrue(OutstandingToken.objects.filter(jti="live").exists())
+        self.assertFalse(BlacklistedToken.objects.exists())
+
+
+class DashboardTests(APITestCase):
+    def setUp(self):
+        self.doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        doctor = self.doctor_user.doctor_profile
+        for index in range(3):
+            patient = Patient.objects.create(
+                first_name=f"P{index}", last_name="Lee", date_of_birth=date(1980, 1, 1), attending_doctor=doctor
+            )
+            case = Case.objects.create(name=f"Case {index}", patient=patient)
+            Appointment.objects.create(patient=patient, case=case, doctor=doctor, status="PENDING" if index else "COMPLETED")
+        self.client.force_authenticate(self.doctor_user)
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def test_doctor_dashboard_counts_and_first_pages_in_fixed_queries(self):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.client.get(reverse("dashboard"), {"page_size": 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            response.data["counts"], {"appointments": 3, "appointments_pending": 2, "cases": 3, "patients": 3}
+        )
+        self.assertEqual(len(response.data["cases"]["results"]), 2)
+        self.assertIn("symptoms", response.data["cases"]["results"][0])
+        self.assertIn("/api/cases/?", response.data["cases"]["next"])
+        queries = len(captured)
+
+        Patient.objects.create(
+            first_name="P9", last_name="Lee", date_of_birth=date(1980, 1, 1), attending_doctor=self.doctor_user.doctor_profile
+        )
+        cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse("dashboard"), {"page_size": 2})
+        self.assertEqual(len(captured), queries)
+
+    def test_cached_until_a_relevant_write(self):
+        self.client.get(reverse("dashboard"))
+        with CaptureQueriesContext(connection) as captured:
+            cached = self.client.get(reverse("dashboard"))
+        self.assertEqual(len(captured), 0)
+        self.assertEqual(cached.data["counts"]["appointments_pending"], 2)
+
+        Appointment.objects.update(status="PENDING")
+        Appointment.objects.first().save()
+
+        fresh = self.client.get(reverse("dashboard"))
+        self.assertEqual(fresh.data["counts"]["appointments_pending"], 3)
+
+
+class ConditionalRequestTests(APITestCase):
+    def setUp(self):
+        self.admin = create_staff("admin1", User.Role.ADMIN)
+        self.doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        self.patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=self.doctor
+        )
+        self.case = Case.objects.create(name="Migraine", patient=self.patient)
+        self.client.force_authenticate(self.admin)
+
+    def test_unchanged_list_returns_304_from_one_aggregate_query(self):
+        first = self.client.get(reverse("cases-list"))
+        self.assertIn("ETag", first)
+        self.assertIn("Last-Modified", first)
+
+        with CaptureQueriesContext(connection) as captured:
+            repeat = self.client.get(reverse("cases-list"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(repeat.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(captured), 1)
+
+        Case.objects.create(name="Rash", patient=self.patient)
+        changed = self.client.get(reverse("cases-list"), HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+
+    def test_detail_etag_follows_nested_children(self):
+        url = reverse("cases-detail", args=[self.case.id])
+        etag = self.client.get(url)["ETag"]
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+        prescription = Prescription.objects.create(
+            case=self.case, doctor=self.doctor, patient=self.patient, details="Rx"
+        )
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response["ETag"], etag)
+
+        # Two levels down: the case embeds prescriptions[].attachments.
+        etag = response["ETag"]
+        PrescriptionAttachment.objects.create(prescription=prescription, file="rx/scan.pdf")
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data["prescriptions"][0]["attachments"]), 1)
+
+    def test_if_match_guards_writes(self):
+        url = reverse("cases-detail", args=[self.case.id])
+        etag = self.client.get(url)["ETag"]
+
+        accepted = self.client.patch(url, {"name": "Cluster headache"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(accepted.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(accepted["ETag"], etag)
+
+        stale = self.client.patch(url, {"name": "Tension headache"}, format="json", HTTP_IF_MATCH=etag)
+        self.assertEqual(stale.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.name, "Cluster headache")
+
+    def test_if_match_check_reads_the_locked_row(self):
+        url = reverse("cases-detail", args=[self.case.id])
+        etag = self.client.get(url)["ETag"]
+        lock = QuerySet.select_for_update
+
+        def commit_other_write_then_lock(queryset, *args, **kwargs):
+            # Another client holding the same ETag saves while this request waits for the row lock.
+            Case.objects.filter(pk=self.case.pk).update(name="Cluster headache", updated_at=timezone.now())
+            return lock(queryset, *args, **kwargs)
+
+        with mock.patch.object(QuerySet, "select_for_update", commit_other_write_then_lock):
+            stale = self.client.patch(url, {"name": "Tension headache"}, format="json", HTTP_IF_MATCH=etag)
+
+        self.assertEqual(stale.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.case.refresh_from_db()
+        self.assertEqual(self.case.name, "Cluster headache")
+
+
+@override_settings(DELTA_SYNC_LAG=0)
+class DeltaSyncTests(APITestCase):
+    def setUp(self):
+        self.doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        self.doctor = self.doctor_user.doctor_profile
+        self.other = create_staff("doc2", User.Role.DOCTOR).doctor_profile
+        self.patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=self.other
+        )
+        self.kept = Appointment.objects.create(patient=self.patient, doctor=self.doctor)
+        self.dropped = Appointment.objects.create(patient=self.patient, doctor=self.doctor)
+        self.client.force_authenticate(self.doctor_user)
+
+    def sync(self, url_name: str, cursor: str):
+        response = self.client.get(reverse(url_name), {"updated_since": cursor})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def test_delta_returns_changed_rows_and_deletions_in_scope(self):
+        cursor = self.client.get(reverse("appointments-list"))["X-Sync-Cursor"]
+        self.kept.notes = "Bring scans"
+        self.kept.save()
+        Appointment.objects.create(patient=self.patient, doctor=self.other)
+        dropped_id = self.dropped.id
+        self.dropped.delete()
+
+        delta = self.sync("appointments-list", cursor)
+
+        self.assertEqual([row["id"] for row in delta["results"]], [self.kept.id])
+        self.assertEqual([row["id"] for row in delta["deleted"]], [dropped_id])
+        self.assertFalse(delta["has_more"])
+        again = self.sync("appointments-list", delta["cursor"])
+        self.assertEqual((again["results"], again["deleted"]), ([], []))
+
+    def test_lost_access_is_sent_as_a_tombstone(self):
+        case = Case.objects.create(name="Migraine", patient=self.patient)
+        case.assigned_doctors.add(self.doctor)
+        cursor = self.sync("cases-list", (timezone.now() - timedelta(hours=1)).isoformat())["cursor"]
+
+        case.assigned_doctors.remove(self.doctor)
+
+        delta = self.sync("cases-list", cursor)
+        self.assertEqual([row["id"] for row in delta["deleted"]], [case.id])
+
+    def test_patient_cascade_tombstones_children(self):
+        case = Case.objects.create(name="Migraine", patient=self.patient)
+        case.assigned_doctors.add(self.doctor)
+        cursor = self.client.get(reverse("cases-list"))["X-Sync-Cursor"]
+        appointment_ids = [self.kept.id, self.dropped.id]
+
+        self.patient.delete()
+
+        self.assertEqual([row["id"] for row in self.sync("cases-list", cursor)["deleted"]], [case.id])
+        deleted_appointments = {row["id"] for row in self.sync("appointments-list", cursor)["deleted"]}
+        self.assertEqual(deleted_appointments, set(appointment_ids))
+
+    def test_cursor_past_retention_is_gone(self):
+        response = self.client.get(reverse("appointments-list"), {"updated_since": "2000-01-01T00:00:00Z"})
+        self.assertEqual(response.status_code, status.HTTP_410_GONE)
+
+
+class AttachmentTransferTests(APITestCase):
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name, ATTACHMENT_PARTIAL_DIR=Path(media.name) / "partial")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=self.doctor_user.doctor_profile
+        )
+        self.case = Case.objects.create(name="Migraine", patient=patient)
+        self.client.force_authenticate(self.doctor_user)
+        self.payload = bytes(range(256)) * 40
+
+    def put_chunk(self, session: dict, start: int, end: int):
+        return self.client.put(
+            session["upload_url"],
+            self.payload[start:end],
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end - 1}/{len(self.payload)}",
+        )
+
+    def upload(self, case: Case | None = None) -> dict:
+        session = self.client.post(
+            reverse("cases-uploads", args=[(case or self.case).id]),
+            {"filename": "../scan.pdf", "size": len(self.payload), "label": "MRI"},
+            format="json",
+        ).data
+        self.put_chunk(session, 0, 4000)
+        return self.put_chunk(session, 4000, len(self.payload)).data
+
+    def test_chunked_upload_resumes_from_the_recorded_offset(self):
+        session = self.client.post(
+            reverse("cases-uploads", args=[self.case.id]),
+            {"filename": "scan.pdf", "size": len(self.payload)},
+            format="json",
+        ).data
+        self.assertEqual(self.put_chunk(session, 0, 4000).data["offset"], 4000)
+        # A retried or out-of-order chunk is refused with the offset to resume from.
+        self.assertEqual(self.put_chunk(session, 6000, 8000).status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(self.client.get(session["upload_url"]).data["offset"], 4000)
+
+        response = self.put_chunk(session, 4000, len(self.payload))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data["size"], len(self.payload))
+        self.assertEqual(response.data["content_type"], "application/pdf")
+        attachment = self.case.attachments.get()
+        with attachment.file.open("rb") as handle:
+            self.assertEqual(handle.read(), self.payload)
+        self.assertEqual(self.client.get(session["upload_url"]).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_a_put_that_lost_the_offset_leaves_the_file_alone(self):
+        data = self.client.post(
+            reverse("cases-uploads", args=[self.case.id]),
+            {"filename": "scan.pdf", "size": len(self.payload)},
+            format="json",
+        ).data
+        session = UploadSession.objects.get()
+        self.put_chunk(data, 0, 4000)
+
+        # A second PUT for offset 0 that read the session before the first one
+        # was recorded, and received fewer bytes.
+        with self.assertRaises(UploadConflict):
+            attachments.write_chunk(session, BytesIO(self.payload[:1000]), 0, 4000)
+
+        self.assertEqual(session.partial_path.read_bytes(), self.payload[:4000])
+        self.assertEqual(UploadSession.objects.get().received, 4000)
+
+    def test_download_honours_ranges(self):
+        url = self.upload()["file"]
+
+        full = self.client.get(url)
+        partial = self.client.get(url, HTTP_RANGE="bytes=100-199")
+        suffix = self.client.get(url, HTTP_RANGE="bytes=-10")
+        stale = self.client.get(url, HTTP_RANGE="bytes=100-199", HTTP_IF_RANGE='"outdated"')
+        beyond = self.client.get(url, HTTP_RANGE=f"bytes={len(self.payload)}-")
+
+        self.assertEqual(b"".join(full.streaming_content), self.payload)
+        self.assertIn('filename="scan.pdf"', full["Content-Disposition"])
+        self.assertEqual(partial.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(partial["Content-Range"], f"bytes 100-199/{len(self.payload)}")
+        self.assertEqual(b"".join(partial.streaming_content), self.payload[100:200])
+        self.assertEqual(b"".join(suffix.streaming_content), self.payload[-10:])
+        self.assertEqual(stale.status_code, status.HTTP_200_OK)
+        self.assertEqual(beyond.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=full["ETag"]).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_download_follows_case_access_and_can_defer_to_the_proxy(self):
+        url = self.upload()["file"]
+
+        with override_settings(ATTACHMENT_SENDFILE="x-accel-redirect"):
+            handed_off = self.client.get(url)
+        self.assertEqual(handed_off.content, b"")
+        self.assertTrue(handed_off["X-Accel-Redirect"].startswith("/protected-media/blobs/"))
+
+        self.client.force_authenticate(create_staff("doc2", User.Role.DOCTOR))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_identical_uploads_share_one_refcounted_blob(self):
+        other_case = Case.objects.create(name="Follow-up", patient=self.case.patient)
+        self.upload()
+        self.upload(other_case)
+
+        blob = Blob.objects.get()
+        self.assertEqual((blob.refcount, blob.sha256), (2, hashlib.sha256(self.payload).hexdigest()))
+        self.assertEqual(set(CaseAttachment.objects.values_list("file", flat=True)), {blob.name})
+
+        self.case.delete()
+        blob.refresh_from_db()
+        self.assertEqual(blob.refcount, 1)
+        other_case.delete()
+        call_command("gc_blobs", "--grace-hours", "0", stdout=StringIO())
+        self.assertFalse(Blob.objects.exists())
+        self.assertFalse(default_storage.exists(blob.name))
+
+    def test_dedupe_command_folds_existing_files_into_blobs(self):
+        legacy = [
+            CaseAttachment.objects.create(case=self.case, file=ContentFile(self.payload, name="letter.pdf"))
+            for _ in range(2)
+        ]
+        old_names = [attachment.file.name for attachment in legacy]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("dedupe_attachments", stdout=StringIO())
+
+        blob = Blob.objects.get()
+        self.assertEqual(blob.refcount, 2)
+        for attachment in legacy:
+            attachment.refresh_from_db()
+            self.assertEqual((attachment.blob_id, attachment.filename), (blob.id, "letter.pdf"))
+        self.assertFalse(any(default_storage.exists(name) for name in old_names))
+        with default_storage.open(blob.name, "rb") as handle:
+            self.assertEqual(handle.read(), self.payload)
+
+
+class AsyncReadViewTests(APITestCase):
+    def setUp(self):
+        self.doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        other = create_staff("doc2", User.Role.DOCTOR).doctor_profile
+        patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=other
+        )
+        self.visible = Case.objects.create(name="Migraine", patient=patient)
+        self.visible.assigned_doctors.add(self.doctor_user.doctor_profile)
+        self.hidden = Case.objects.create(name="Fracture", patient=patient)
+        self.prescription = Prescription.objects.create(case=self.visible, doctor=other, patient=patient, details="Rest")
+        self.appointment = Appointment.objects.create(patient=patient, case=self.visible, doctor=self.doctor_user.doctor_profile)
+        self.schedule = DoctorSchedule.objects.create(doctor=other, weekday=0, starts_at=time(9), ends_at=time(12))
+        DoctorSchedule.objects.create(doctor=other, weekday=1, starts_at=time(9), ends_at=time(12))
+        self.auth = f"Bearer {RefreshToken.for_user(self.doctor_user).access_token}"
+        self.client.credentials(HTTP_AUTHORIZATION=self.auth)
+
+    def get_async(self, viewset: type, path: str, detail: bool = False, auth: str | None = None, **headers):
+        headers["Authorization"] = self.auth if auth is None else auth
+        request = AsyncRequestFactory().get(path, headers=headers)
+        kwargs = {"pk": path.rstrip("/").rsplit("/", 1)[-1]} if detail else {}
+        return async_to_sync(AsyncReadView.as_view(viewset, detail))(request, **kwargs)
+
+    def test_async_reads_match_the_sync_views(self):
+        for viewset, path, detail in [
+            (CaseViewSet, "/api/cases/", False),
+            (CaseViewSet, f"/api/cases/{self.visible.id}/", True),
+            (PatientViewSet, "/api/patients/?fields=id,last_name", False),
+            (DoctorViewSet, "/api/doctors/", False),
+            (PrescriptionViewSet, "/api/prescriptions/", False),
+            (PrescriptionViewSet, f"/api/prescriptions/{self.prescription.id}/", True),
+            (AppointmentViewSet, "/api/appointments/", False),
+            (AppointmentViewSet, f"/api/appointments/{self.appointment.id}/", True),
+            (DoctorScheduleViewSet, "/api/schedules/?page_size=1", False),
+            (DoctorScheduleViewSet, f"/api/schedules/{self.schedule.id}/", True),
+            (CaseViewSet, f"/api/cases/{self.hidden.id}/", True),
+            (AppointmentViewSet, "/api/appointments/0/", True),
+        ]:
+            with self.subTest(path=path):
+                expected = self.client.get(path)
+                response = self.get_async(viewset, path, detail)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(json.loads(response.content), json.loads(expected.content))
+                self.assertEqual(response.get("ETag"), expected.get("ETag"))
+
+        self.assertEqual(self.get_async(CaseViewSet, "/api/cases/", auth="").status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(DELTA_SYNC_LAG=0)
+    def test_async_list_answers_validators_and_delta_sync(self):
+        first = self.get_async(CaseViewSet, "/api/cases/")
+        self.assertEqual(
+            self.get_async(CaseViewSet, "/api/cases/", **{"If-None-Match": first["ETag"]}).status_code,
+            status.HTTP_304_NOT_MODIFIED,
+        )
+
+        self.visible.symptoms = "Aura"
+        self.visible.save()
+        delta = json.loads(self.get_async(CaseViewSet, f"/api/cases/?updated_since={first['X-Sync-Cursor']}").content)
+        self.assertEqual([row["id"] for row in delta["results"]], [self.visible.id])
+
+
+@override_settings(DATABASE_REPLICAS=["replica1"], REPLICA_STICKY_SECONDS=30)
+class ReplicaRoutingTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.receptionist = create_staff("recept1", User.Role.RECEPTIONIST)
+        self.doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        self.client.force_authenticate(self.receptionist)
+
+    def read_request(self):
+        request = APIRequestFactory().get("/api/patients/")
+        request.user = self.receptionist
+        return request
+
+    def test_reads_leave_the_primary_until_the_user_writes(self):
+        self.assertEqual(replicas.choose(self.read_request()), "replica1")
+
+        response = self.client.post(
+            "/api/patients/",
+            {"first_name": "Ada", "last_name": "Byron", "date_of_birth": "1990-05-01", "attending_doctor": self.doctor.id},
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(replicas.choose(self.read_request()))
+
+        cache.delete(replicas.sticky_key(self.receptionist.pk))
+        self.assertEqual(replicas.choose(self.read_request()), "replica1")
+
+    def test_router_reads_from_the_chosen_replica_outside_transactions(self):
+        router = replicas.ReplicaRouter()
+        token = replicas.read_alias.set("replica1")
+        try:
+            # Test cases run inside a transaction on the primary.
+            self.assertIsNone(router.db_for_read(Patient))
+            with mock.patch.object(connection, "in_atomic_block", False):
+                self.assertEqual(router.db_for_read(Patient), "replica1")
+            self.assertEqual(router.db_for_write(Patient), "default")
+        finally:
+            replicas.read_alias.reset(token)
+        self.assertIsNone(router.db_for_read(Patient))
+        self.assertIs(router.allow_migrate("replica1", "core"), False)
+        self.assertIsNone(router.allow_migrate("default", "core"))
+
+
+class ResponseCacheTests(APITestCase):
+    def setUp(self):
+        cache.clear()
+        local_response_cache.clear()
+        self.doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        self.client.force_authenticate(create_staff("recept1", User.Role.RECEPTIONIST))
+
+    def test_roster_hits_skip_the_database_until_staff_changes(self):
+        first = self.client.get("/api/doctors/")
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            second = self.client.get("/api/doctors/")
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["Content-Type"], first["Content-Type"])
+
+        self.doctor.specialty = "Neurology"
+        self.doctor.save()
+        third = self.client.get("/api/doctors/")
+        self.assertEqual(json.loads(third.content)["results"][0]["specialty"], "Neurology")
+
+        # Other query strings are cached separately.
+        sparse = self.client.get("/api/doctors/?fields=id")
+        self.assertEqual(json.loads(sparse.content)["results"], [{"id": self.doctor.id}])
+
+
+class FastSerializationTests(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin1", password="securePass123", role=User.Role.ADMIN)
+        doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        doctor_user.first_name = "Zoë"
+        doctor_user.save()
+        doctor = doctor_user.doctor_profile
+        nameless = create_staff("doc2", User.Role.DOCTOR).doctor_profile
+        receptionist = create_staff("recept1", User.Role.RECEPTIONIST).receptionist_profile
+        patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron ", date_of_birth=date(1990, 5, 1), attending_doctor=doctor
+        )
+        Patient.objects.create(first_name="", last_name="Lovelace", date_of_birth=date(1815, 12, 10), attending_doctor=nameless)
+        case = Case.objects.create(name="Migraine", patient=patient, created_by=receptionist)
+        unnamed = Case.objects.create(name="", patient=patient)
+        Appointment.objects.create(patient=patient, case=case, doctor=doctor, created_by=receptionist, scheduled_at=timezone.now())
+        Appointment.objects.create(patient=patient, case=unnamed, doctor=nameless, notes="Follow-up", status="COMPLETED")
+        Appointment.objects.create(patient=patient, doctor=doctor)
+        prescription = Prescription.objects.create(case=case, doctor=doctor, patient=patient, details="Rx")
+        Prescription.objects.create(case=unnamed, doctor=nameless, patient=patient, details="None attached")
+        for label in ("scan", "note"):
+            PrescriptionAttachment.objects.create(
+                prescription=prescription, file=f"prescriptions/{label}.pdf", label=label, filename=f"{label}.pdf", size=3
+            )
+        self.client.force_authenticate(self.admin)
+
+    def test_values_path_renders_the_same_bytes_as_the_serializers(self):
+        for serializer_class, path in [
+            (PatientSerializer, "/api/patients/"),
+            (PatientSerializer, "/api/patients/?fields=id,attending_doctor&page_size=1"),
+            (AppointmentSerializer, "/api/appointments/"),
+            (AppointmentSerializer, "/api/appointments/?fields=doctor_name,case_name,status"),
+            (PrescriptionSerializer, "/api/prescriptions/"),
+            (PrescriptionSerializer, "/api/prescriptions/?fields=id,details"),
+        ]:
+            with self.subTest(path=path):
+                with mock.patch.object(serializer_class, "to_representation", side_effect=AssertionError):
+                    fast = self.client.get(path)
+                with mock.patch.object(serializer_class, "values_fast_path", False):
+                    slow = self.client.get(path)
+                self.assertEqual(fast.status_code, status.HTTP_200_OK)
+                self.assertEqual(fast.content, slow.content)
+
+    def test_display_names_from_sql_match_the_python_fallback(self):
+        Case.objects.get(name="Migraine").assigned_doctors.set(Doctor.objects.all())
+        for serializer_class, model, path, names in [
+            (AppointmentSerializer, Appointment, "/api/appointments/", ("patient_name", "case_name", "doctor_name")),
+            (CaseSummarySerializer, Case, "/api/cases/", ("patient_name", "assigned_doctor_names")),
+        ]:
+            fields = serializer_class().fields
+            rows = self.client.get(path).json()["results"]
+            self.assertTrue(rows)
+            for row in rows:
+                instance = model.objects.get(pk=row["id"])
+                for name in names:
+                    with self.subTest(path=path, id=row["id"], field=name):
+                        self.assertEqual(row[name], fields[name].compute(instance))
+
+    def test_orjson_renderer_matches_json_renderer(self):
+        data = {
+            "when": timezone.now(),
+            "day": date(2024, 2, 29),
+            "amount": Decimal("1.50"),
+            "label": gettext_lazy("Not found."),
+            "text": "Zoë \u2028 \u2029",
+            1: [None, True, 1.5, ("a", "b")],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+    def test_invalid_json_is_a_parse_error(self):
+        response = self.client.post("/api/patients/", b'{"first_name": NaN}', content_type="application/json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(response.json()["detail"].startswith("JSON parse error"))
+
+
+class WriteValidationQueryTests(APITestCase):
+    def setUp(self):
+        self.admin = create_staff("admin1", User.Role.ADMIN)
+        self.doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        self.doctor = self.doctor_user.doctor_profile
+        self.others = [create_staff(f"doc{index}", User.Role.DOCTOR).doctor_profile for index in (2, 3)]
+        self.receptionist_user = create_staff("recept1", User.Role.RECEPTIONIST)
+        receptionist = self.receptionist_user.receptionist_profile
+        self.patient = Patient.objects.create(
+            first_name="Ada",
+            last_name="Byron",
+            date_of_birth=date(1990, 5, 1),
+            attending_doctor=self.doctor,
+            created_by=receptionist,
+        )
+        self.case = Case.objects.create(name="Migraine", patient=self.patient, created_by=receptionist)
+        self.case.assigned_doctors.set([self.doctor])
+
+    def queries_before_write(self, user: User, method: str, url: str, data: dict, table: str) -> list[str]:
+        """Statements the request ran before writing ``table``, savepoints and number allocation aside.
+
+        Off PostgreSQL every record number costs an upsert; there it is one ``nextval`` per block.
+        """
+
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data, format="json")
+        self.assertLess(response.status_code, 300, response.content)
+        statements = [
+            query["sql"]
+            for query in queries.captured_queries
+            if "SAVEPOINT" not in query["sql"] and '"core_identifiersequence"' not in query["sql"]
+        ]
+        write = next(
+            index for index, sql in enumerate(statements) if sql.startswith(("INSERT", "UPDATE")) and f'"{table}"' in sql
+        )
+        return statements[:write]
+
+    def test_prescription_writes_resolve_case_patient_and_access_together(self):
+        payload = {"case": self.case.id, "patient": self.patient.id, "details": "Rx"}
+        created = self.queries_before_write(self.doctor_user, "post", "/api/prescriptions/", payload, "core_prescription")
+        self.assertEqual(len(created), 1)
+        prescription = Prescription.objects.get()
+        url = f"/api/prescriptions/{prescription.id}/"
+        # The prescription itself, then its case with the access check.
+        for method, data in [("patch", {"details": "Rx 2"}), ("put", payload)]:
+            updated = self.queries_before_write(self.doctor_user, method, url, data, "core_prescription")
+            self.assertEqual(len(updated), 2)
+        # Admins name the doctor, which is a row of its own.
+        admin_payload = {**payload, "doctor": self.doctor.id}
+        created = self.queries_before_write(self.admin, "post", "/api/prescriptions/", admin_payload, "core_prescription")
+        self.assertEqual(len(created), 2)
+
+    def test_case_and_appointment_writes_load_related_rows_in_one_query_per_model(self):
+        doctors = [self.doctor.id, *(doctor.id for doctor in self.others)]
+        created = self.queries_before_write(
+            self.receptionist_user, "post", "/api/cases/", {"patient": self.patient.id, "assigned_doctors": doctors}, "core_case"
+        )
+        self.assertEqual(len(created), 2)
+        case = Case.objects.latest("id")
+        self.assertEqual(set(case.assigned_doctors.values_list("id", flat=True)), set(doctors))
+        # The case and the doctors; the previous patient_id comes from the loaded case.
+        updated = self.queries_before_write(
+            self.admin, "patch", f"/api/cases/{case.id}/", {"assigned_doctors": doctors[:2]}, "core_case"
+        )
+        self.assertEqual(len(updated), 2)
+
+        payload = {"patient": self.patient.id, "case": self.case.id, "doctor": self.doctor.id}
+        created = self.queries_before_write(self.receptionist_user, "post", "/api/appointments/", payload, "core_appointment")
+        self.assertEqual(len(created), 2)
+
+    def test_unknown_pks_report_the_related_field_errors(self):
+        self.client.force_authenticate(self.receptionist_user)
+        response = self.client.post(
+            "/api/cases/", {"patient": self.patient.id, "assigned_doctors": [self.doctor.id, 999]}, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.json(), {"assigned_doctors": ['Invalid pk "999" - object does not exist.']})
+
+        response = self.client.post(
+            "/api/appointments/", {"patient": 999, "case": self.case.id, "doctor": self.doctor.id}, format="json"
+        )
+        self.assertEqual(response.json(), {"patient": ['Invalid pk "999" - object does not exist.']})
+
+        response = self.client.post("/api/appointments/", {"patient": self.patient.id, "doctor": "x"}, format="json")
+        self.assertEqual(response.json(), {"doctor": ["Incorrect type. Expected pk value, received str."]})
+
+    def test_doctors_cannot_prescribe_on_cases_they_cannot_see(self):
+        other_case = Case.objects.create(name="Fracture", patient=self.patient)
+        CaseAccess.objects.filter(case=other_case).delete()
+        self.client.force_authenticate(self.doctor_user)
+        response = self.client.post(
+            "/api/prescriptions/", {"case": other_case.id, "patient": self.patient.id, "details": "Rx"}, format="json"
+        )
+        self.assertEqual(response.json(), {"case": ["You do not have access to this case."]})
+
+    def test_update_responses_render_the_new_related_names(self):
+        other = Patient.objects.create(
+            first_name="Grace", last_name="Hopper", date_of_birth=date(1906, 12, 9), attending_doctor=self.doctor
+        )
+        appointment = Appointment.objects.create(patient=self.patient, doctor=self.doctor)
+        self.client.force_authenticate(self.admin)
+        response = self.client.patch(f"/api/appointments/{appointment.id}/", {"patient": other.id}, format="json")
+        self.assertEqual(response.json()["patient_name"], "Grace Hopper")
+
+
+class PatientImportTests(APITestCase):
+    def setUp(self):
+        self.doctors = [create_staff(f"doc{index}", User.Role.DOCTOR).doctor_profile for index in (1, 2)]
+        self.receptionist_user = create_staff("recept1", User.Role.RECEPTIONIST)
+
+    def upload(self, name: str, body: bytes, **params):
+        self.client.force_authenticate(self.receptionist_user)
+        return self.client.post(reverse("patients-import"), {"file": SimpleUploadedFile(name, body), **params})
+
+    @override_settings(PATIENT_IMPORT_BATCH_SIZE=2)
+    def test_csv_upload_imports_valid_rows_and_reports_the_rest(self):
+        first, second = self.doctors
+        body = (
+            "first_name,last_name,date_of_birth,attending_doctor\n"
+            f"Ada,Byron,1990-05-01,{first.id}\n"
+            f"Alan,Turing,1912-06-23,{second.id}\n"
+            f"Grace,Hopper,not-a-date,{first.id}\n"
+            "Edsger,Dijkstra,1930-05-11,999\n"
+            f'"Barbara","Liskov",1939-11-07,{second.id}\n'
+        ).encode()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload("clinic.csv", body)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        report = response.json()
+        self.assertEqual((report["created"], report["failed"]), (3, 2))
+        self.assertEqual([error["line"] for error in report["errors"]], [4, 5])
+        self.assertIn("date_of_birth", report["errors"][0]["errors"])
+        self.assertEqual(report["errors"][1]["errors"], {"attending_doctor": ['Invalid pk "999" - object does not exist.']})
+        self.assertEqual(
+            set(Patient.objects.values_list("last_name", "created_by")),
+            {(name, self.receptionist_user.receptionist_profile.id) for name in ("Byron", "Turing", "Liskov")},
+        )
+        # One doctor lookup per batch of two rows, not one per row.
+        doctor_lookups = [query for query in queries.captured_queries if 'FROM "core_doctor"' in query["sql"]]
+        self.assertEqual(len(doctor_lookups), 3)
+
+    def test_upload_needs_a_known_format(self):
+        response = self.upload("clinic.xlsx", b"\x00")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn("file", response.json())
+
+    def test_command_streams_ndjson_and_writes_rejected_lines(self):
+        doctor = self.doctors[0]
+        lines = [
+            json.dumps({"first_name": "Ada", "last_name": "Byron", "date_of_birth": "1990-05-01", "attending_doctor": doctor.id}),
+            "",
+            "{not json",
+            json.dumps(["Alan", "Turing"]),
+            json.dumps({"first_name": "Alan", "last_name": "Turing", "date_of_birth": "1912-06-23", "attending_doctor": doctor.id}),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            source = Path(directory) / "patients.ndjson"
+            source.write_text("\n".join(lines) + "\n")
+            errors = Path(directory) / "errors.ndjson"
+            stdout = StringIO()
+            call_command(
+                "import_patients", str(source), "--batch-size", "1", "--created-by", "recept1", "--errors", str(errors),
+                stdout=stdout,
+            )
+            rejected = [json.loads(line) for line in errors.read_text().splitlines()]
+
+        self.assertIn("Imported 2 patients; rejected 2 lines.", stdout.getvalue())
+        self.assertEqual([error["line"] for error in rejected], [3, 4])
+        self.assertEqual(Patient.objects.filter(created_by__user__username="recept1").count(), 2)
+
+
+class IdentifierAllocationTests(APITestCase):
+    def test_record_numbers_are_sequential_and_keep_their_prefixes(self):
+        doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=doctor
+        )
+        cases = [Case.objects.create(patient=patient) for _ in range(3)]
+        numbers = [case.case_number for case in cases]
+
+        self.assertRegex(numbers[0], r"^CASE-\d{8}$")
+        self.assertEqual(numbers, sorted(numbers))
+        self.assertEqual(len(set(numbers)), 3)
+        prescription = Prescription.objects.create(case=cases[0], doctor=doctor, patient=patient, details="Rest")
+        self.assertRegex(prescription.prescription_number, r"^RX-\d{8}$")
+
+    def test_unsaved_records_draw_no_number(self):
+        doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=doctor
+        )
+        first = Case.objects.create(patient=patient)
+        unsaved = [Case(patient=patient) for _ in range(3)]
+        second = Case.objects.create(patient=patient)
+
+        self.assertEqual({case.case_number for case in unsaved}, {""})
+        # Blocks have size 1 off PostgreSQL, so consecutive saves get consecutive numbers.
+        self.assertEqual(int(second.case_number.split("-")[1]), int(first.case_number.split("-")[1]) + 1)
+        first.save()
+        self.assertEqual(Case.objects.get(pk=first.pk).case_number, first.case_number)
+
+    def test_blocks_are_reserved_once_per_block_and_again_after_a_fork(self):
+        allocator = identifiers.BlockAllocator("case")
+        reserved = [[range(1, 4)], [range(51, 54)], [range(101, 104)]]
+        with mock.patch.object(identifiers, "reserve", side_effect=reserved) as reserve:
+            values = [allocator.allocate() for _ in range(4)]
+            self.assertEqual(values, [1, 2, 3, 51])
+            self.assertEqual(reserve.call_count, 2)
+
+            with mock.patch("os.getpid", return_value=allocator.pid + 1):
+                self.assertEqual(allocator.allocate(), 101)
+
+    def test_a_batch_takes_the_rest_of_the_block_and_reserves_the_remainder_at_once(self):
+        allocator = identifiers.BlockAllocator("case")
+        reserved = [[range(1, 4)], [range(51, 54), range(101, 104)]]
+        with mock.patch.object(identifiers, "reserve", side_effect=reserved) as reserve:
+            self.assertEqual(allocator.allocate(), 1)
+            self.assertEqual(allocator.allocate_many(5), [2, 3, 51, 52, 53])
+            self.assertEqual(allocator.allocate_many(2), [101, 102])
+            self.assertEqual([call.args for call in reserve.call_args_list], [("case", 1), ("case", 3)])
+
+    def test_next_numbers_match_next_number_off_postgresql(self):
+        numbers = identifiers.next_numbers("appointment", 3)
+        following = identifiers.next_number("appointment")
+
+        self.assertEqual(len(set(numbers)), 3)
+        self.assertEqual(sorted([*numbers, following]), [*numbers, following])
+        self.assertRegex(following, r"^APT-\d{8}$")
+
+
+class AppointmentSchedulingTests(APITestCase):
+    # 2030-01-07 is a Monday; TIME_ZONE is UTC.
+    MONDAY = datetime(2030, 1, 7, tzinfo=dt_timezone.utc)
+
+    def setUp(self):
+        self.doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        self.other = create_staff("doc2", User.Role.DOCTOR).doctor_profile
+        Doctor.objects.filter(pk=self.doctor.pk).update(specialty="Cardiology")
+        for doctor in (self.doctor, self.other):
+            DoctorSchedule.objects.create(doctor=doctor, weekday=0, starts_at=time(9), ends_at=time(11))
+        self.receptionist_user = create_staff("recept1", User.Role.RECEPTIONIST)
+        self.patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=self.doctor
+        )
+        self.client.force_authenticate(self.receptionist_user)
+
+    def book(self, doctor: Doctor, hour: int, minute: int = 0, duration: int = 30):
+        payload = {
+            "patient": self.patient.id,
+            "doctor": doctor.id,
+            "scheduled_at": (self.MONDAY + timedelta(hours=hour, minutes=minute)).isoformat(),
+            "duration_minutes": duration,
+        }
+        return self.client.post("/api/appointments/", payload, format="json")
+
+    def test_slot_search_skips_booked_time_in_one_bookings_query(self):
+        self.assertEqual(self.book(self.doctor, 9, 30, duration=60).status_code, status.HTTP_201_CREATED)
+        cancelled = self.book(self.doctor, 9)
+        Appointment.objects.filter(pk=cancelled.data["id"]).update(status="CANCELLED")
+
+        params = {
+            "specialty": "cardiology",
+            "start": self.MONDAY.isoformat(),
+            "end": (self.MONDAY + timedelta(days=1)).isoformat(),
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("appointments-slots"), params)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([slot["start"] for slot in response.data], ["2030-01-07T09:00:00Z", "2030-01-07T10:30:00Z"])
+        self.assertEqual({slot["doctor_name"] for slot in response.data}, {"Dr. doc1"})
+        # Schedules, one bookings range query for the doctor batch, doctor names.
+        self.assertEqual(len(queries), 3)
+
+        # An hour long, nothing fits around doc1's 09:30-10:30.
+        both = self.client.get(reverse("appointments-slots"), {**params, "specialty": "", "limit": 3, "duration": 60})
+        self.assertEqual(
+            [(slot["doctor"], slot["start"]) for slot in both.data],
+            [
+                (self.other.id, "2030-01-07T09:00:00Z"),
+                (self.other.id, "2030-01-07T09:30:00Z"),
+                (self.other.id, "2030-01-07T10:00:00Z"),
+            ],
+        )
+
+    def test_overlapping_bookings_of_a_doctor_are_rejected(self):
+        first = self.book(self.doctor, 9, duration=60)
+        self.assertEqual(Appointment.objects.get(pk=first.data["id"]).ends_at, self.MONDAY + timedelta(hours=10))
+
+        clash = self.book(self.doctor, 9, 45)
+        self.assertEqual(clash.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn(first.data["appointment_number"], clash.json()["scheduled_at"][0])
+        self.assertEqual(self.book(self.other, 9, 45).status_code, status.HTTP_201_CREATED)
+        later = self.book(self.doctor, 10)
+        self.assertEqual(later.status_code, status.HTTP_201_CREATED)
+
+        moved = self.client.patch(
+            f"/api/appointments/{later.data['id']}/",
+            {"duration_minutes": 90, "scheduled_at": (self.MONDAY + timedelta(hours=8)).isoformat()},
+            format="json",
+        )
+        self.assertEqual(moved.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.patch(f"/api/appointments/{first.data['id']}/", {"status": "CANCELLED"}, format="json")
+        self.assertEqual(self.book(self.doctor, 9, 15).status_code, status.HTTP_201_CREATED)
+
+
+class JobQueueTests(APITestCase):
+    def setUp(self):
+        self.metrics_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.metrics_dir.cleanup)
+        overrides = self.settings(METRICS_DIR=Path(self.metrics_dir.name), METRICS_FLUSH_INTERVAL=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.calls = []
+        tasks = mock.patch.dict(
+            jobs.TASKS,
+            {"record": jobs.Task(lambda **payload: self.calls.append(payload), 3), "flaky": jobs.Task(self.fail, 2)},
+        )
+        tasks.start()
+        self.addCleanup(tasks.stop)
+
+    @staticmethod
+    def fail() -> None:
+        raise RuntimeError("boom")
+
+    def work(self) -> None:
+        call_command("run_jobs", "--burst", "--threads", "1")
+
+    def test_jobs_are_saved_on_commit_and_run_by_the_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                jobs.enqueue("record", {"x": 1})
+                self.assertFalse(Job.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                jobs.enqueue("record", {"x": 2})
+                raise RuntimeError("rolled back")
+
+        self.work()
+
+        self.assertEqual(self.calls, [{"x": 1}])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts, job.payload), (Job.Status.DONE, 1, {"x": 1}))
+
+    def test_failed_attempts_back_off_then_fail_and_are_counted(self):
+        self.client.force_authenticate(create_staff("admin1", User.Role.ADMIN))
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("admin-jobs-list"), {"name": "flaky"}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        unknown = self.client.post(reverse("admin-jobs-list"), {"name": "nope"}, format="json")
+        self.assertEqual(unknown.status_code, status.HTTP_400_BAD_REQUEST)
+
+        self.work()
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 1))
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn("RuntimeError: boom", job.last_error)
+
+        self.work()
+        self.assertEqual(Job.objects.get(pk=job.pk).attempts, 1)
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.work()
+        self.assertEqual(Job.objects.get(pk=job.pk).status, Job.Status.FAILED)
+
+        body = self.client.get(reverse("metrics")).content.decode()
+        self.assertIn('jobs_total{job="flaky",outcome="retry"} 1', body)
+        self.assertIn('jobs_total{job="flaky",outcome="failed"} 1', body)
+        self.assertIn('job_queue_jobs{status="failed"} 1', body)
+        self.assertIn('job_wait_seconds_count{job="flaky"} 2', body)
+
+    def test_only_jobs_without_a_recent_heartbeat_are_requeued(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            jobs.enqueue("record", {"x": 1})
+            jobs.enqueue("record", {"x": 2})
+        long_running, abandoned = jobs.claim("alive"), jobs.claim("dead")
+        started = timezone.now() - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS * 2)
+        Job.objects.update(started_at=started, heartbeat_at=started)
+        jobs.beat(long_running)
+
+        self.assertEqual(jobs.requeue_stale(), 1)
+        self.assertEqual(Job.objects.get(pk=long_running.pk).status, Job.Status.RUNNING)
+        self.assertEqual(Job.objects.get(pk=abandoned.pk).status, Job.Status.QUEUED)
+
+    def test_running_tasks_send_heartbeats(self):
+        beats = []
+        slow = mock.patch.dict(jobs.TASKS, {"slow": jobs.Task(lambda: sleep(0.2), 1)})
+        with slow, mock.patch.object(jobs, "beat", beats.append), self.settings(JOB_HEARTBEAT_SECONDS=0.02):
+            with self.captureOnCommitCallbacks(execute=True):
+                jobs.enqueue("slow")
+            self.work()
+
+        self.assertGreater(len(beats), 1)
+        self.assertEqual({job.pk for job in beats}, {Job.objects.get().pk})
+        self.assertEqual(Job.objects.get().status, Job.Status.DONE)
+
+
+class PatientExportTests(APITestCase):
+    def setUp(self):
+        self.doctor = create_staff("doc1", User.Role.DOCTOR).doctor_profile
+        self.other_doctor = create_staff("doc2", User.Role.DOCTOR).doctor_profile
+        self.patients = []
+        for index in range(5):
+            doctor = self.doctor if index % 2 == 0 else self.other_doctor
+            patient = Patient.objects.create(
+                first_name=f"P{index}", last_name="Export", date_of_birth=date(1980, 1, 1), attending_doctor=doctor
+            )
+            case = Case.objects.create(patient=patient, name=f"Case {index}")
+            case.assigned_doctors.add(doctor)
+            CaseAttachment.objects.create(case=case, file=f"cases/{index}.pdf", filename=f"{index}.pdf", size=3)
+            prescription = Prescription.objects.create(case=case, doctor=doctor, patient=patient, details="Rest")
+            PrescriptionAttachment.objects.create(prescription=prescription, file=f"rx/{index}.pdf", size=4)
+            Appointment.objects.create(patient=patient, case=case, doctor=doctor)
+            self.patients.append(patient)
+        self.client.force_authenticate(create_staff("admin1", User.Role.ADMIN))
+
+    def export(self, **params):
+        response = self.client.get(reverse("admin-patients-export"), params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return b"".join(response.streaming_content)
+
+    @override_settings(PATIENT_EXPORT_CHUNK_SIZE=2)
+    def test_ndjson_bundles_stream_in_chunks_and_resume_after_a_patient(self):
+        with CaptureQueriesContext(connection) as queries:
+            body = self.export()
+        bundles = [json.loads(line) for line in body.splitlines()]
+
+        self.assertEqual([bundle["patient"]["id"] for bundle in bundles], [patient.id for patient in self.patients])
+        first = bundles[0]
+        case = first["cases"][0]
+        self.assertEqual(case["assigned_doctors"], [self.doctor.id])
+        self.assertEqual([item["file"] for item in case["attachments"]], ["cases/0.pdf"])
+        self.assertEqual([item["size"] for item in case["prescriptions"][0]["attachments"]], [4])
+        self.assertEqual(first["appointments"][0]["case"], case["id"])
+        # One cursor over the patients, then six queries per chunk of two, whatever each patient has.
+        self.assertEqual(len(queries), 1 + 6 * 3)
+
+        resumed = [json.loads(line) for line in self.export(after=self.patients[2].id, doctor=self.doctor.id).splitlines()]
+        self.assertEqual([bundle["patient"]["id"] for bundle in resumed], [self.patients[4].id])
+
+    def test_csv_export_and_command_write_one_row_per_record(self):
+        rows = list(csv.DictReader(StringIO(self.export(type="csv").decode())))
+        self.assertEqual(len(rows), 5 * 4)
+        prescription = next(row for row in rows if row["record"] == "prescription")
+        self.assertEqual(json.loads(prescription["data"])["details"], "Rest")
+
+        with tempfile.TemporaryDirectory() as directory:
+            output = Path(directory) / "patients.ndjson"
+            call_command("export_patients", "--output", str(output), "--doctor", "doc2", stdout=StringIO())
+            exported = [json.loads(line)["patient"]["id"] for line in output.read_text().splitlines()]
+        self.assertEqual(exported, [self.patients[1].id, self.patients[3].id])
+
+        denied = self.client.get(reverse("admin-patients-export"), {"type": "xml"})
+        self.assertEqual(denied.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_queued_export_returns_before_the_job_runs_and_is_served_once_done(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        overrides = override_settings(MEDIA_ROOT=media.name)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        params = {"type": "csv", "doctor": self.doctor.pk}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse("admin-patients-export"), params, format="json")
+
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job = Job.objects.get()
+        self.assertEqual((job.name, job.status), ("export_patients", Job.Status.QUEUED))
+        self.assertEqual(response.data["payload"], job.payload)
+        self.assertFalse(default_storage.exists(job.payload["path"]))
+        self.assertEqual(self.client.get(response["Location"]).status_code, status.HTTP_409_CONFLICT)
+
+        call_command("run_jobs", "--burst", "--threads", "1")
+
+        download = self.client.get(response["Location"])
+        self.assertEqual(download.status_code, status.HTTP_200_OK)
+        self.assertEqual(b"".join(download.streaming_content), self.export(**params))
+        download.close()
+
+        Job.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timedelta(days=settings.JOB_RETENTION_DAYS + 1))
+        jobs.TASKS["purge_finished_jobs"].function()
+        self.assertFalse(Job.objects.filter(pk=job.pk).exists())
+        self.assertFalse(default_storage.exists(job.payload["path"]))
+
+
+class PatientChartTests(APITestCase):
+    def setUp(self):
+        self.doctor_user = create_staff("doc1", User.Role.DOCTOR)
+        self.doctor = self.doctor_user.doctor_profile
+        self.specialist = create_staff("doc2", User.Role.DOCTOR).doctor_profile
+        self.patient = Patient.objects.create(
+            first_name="Ada", last_name="Byron", date_of_birth=date(1990, 5, 1), attending_doctor=self.doctor
+        )
+        self.add_case()
+        Appointment.objects.create(patient=self.patient, doctor=self.specialist)
+        self.client.force_authenticate(self.doctor_user)
+
+    def add_case(self) -> Case:
+        case = Case.objects.create(name="Migraine", patient=self.patient)
+        case.assigned_doctors.set([self.doctor, self.specialist])
+        CaseAttachment.objects.create(case=case, file="cases/scan.pdf", filename="scan.pdf")
+        for index in range(2):
+            prescription = Prescription.objects.create(
+                case=case, doctor=self.doctor, patient=self.patient, details=f"Rx {index}"
+            )
+            PrescriptionAttachment.objects.create(prescription=prescription, file=f"rx/{index}.pdf")
+        Appointment.objects.create(patient=self.patient, case=case, doctor=self.doctor)
+        return case
+
+    def chart(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("patients-chart", args=[self.patient.id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), len(queries)
+
+    def test_chart_renders_the_whole_record_in_a_fixed_number_of_queries(self):
+        chart, baseline = self.chart()
+        case = chart["cases"][0]
+        self.assertEqual(case["assigned_doctors"], [self.doctor.id, self.specialist.id])
+        self.assertEqual(case["patient_name"], "Ada Byron")
+        self.assertEqual(len(case["attachments"]), 1)
+        self.assertEqual([len(rx["attachments"]) for rx in case["prescriptions"]], [1, 1])
+        # Only the appointments this doctor could list themselves.
+        self.assertEqual([row["doctor"] for row in chart["appointments"]], [self.doctor.id])
+
+        for _ in range(3):
+            self.add_case()
+        chart, queries = self.chart()
+        self.assertEqual(len(chart["cases"]), 4)
+        self.assertEqual(sum(len(case["prescriptions"]) for case in chart["cases"]), 8)
+        self.assertEqual(queries, baseline)
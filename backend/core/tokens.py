@@ -0,0 +1,149 @@
+"""Refresh-token blacklist checks served from memory, and expired-token housekeeping."""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow, datetime_from_epoch
+
+
+class BlacklistCache:
+    """Per-worker map of blacklisted JTIs to their expiry.
+
+    The cache catches up with one ``blacklisted_at >= since`` range query at most
+    every ``TOKEN_BLACKLIST_SYNC_INTERVAL`` seconds; tokens blacklisted by this
+    worker are added immediately.  ``since`` trails the previous sync's start by
+    ``TOKEN_BLACKLIST_SYNC_LAG``, so each sync re-reads that window and picks up
+    rows whose transaction committed after a later row had already been seen.
+    (Row ids, and ``blacklisted_at``, are assigned before commit, so neither can
+    serve as an exact high-water mark.)  A periodic full reload picks up rows
+    removed by hand, and expired entries are pruned since simplejwt already
+    rejects those tokens on ``exp``.
+    """
+
+    def __init__(self) -> None:
+        self._expiry: dict[str, datetime] = {}
+        self._since: datetime | None = None
+        self._synced_at = float("-inf")
+        self._reloaded_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def contains(self, jti: str) -> bool:
+        now = time.monotonic()
+        if now - self._reloaded_at >= settings.TOKEN_BLACKLIST_RELOAD_INTERVAL:
+            self.reload()
+        elif now - self._synced_at >= settings.TOKEN_BLACKLIST_SYNC_INTERVAL:
+            self.sync()
+        return jti in self._expiry
+
+    def add(self, jti: str, expires_at: datetime) -> None:
+        with self._lock:
+            self._expiry[jti] = expires_at
+
+    @staticmethod
+    def next_since() -> datetime:
+        """Start of the window the next sync re-reads; taken before this sync's query."""
+
+        return aware_utcnow() - timedelta(seconds=settings.TOKEN_BLACKLIST_SYNC_LAG)
+
+    def sync(self) -> None:
+        with self._lock:
+            since = self._since
+        if since is None:
+            self.reload()
+            return
+        next_since = self.next_since()
+        rows = list(
+            BlacklistedToken.objects.filter(blacklisted_at__gte=since).values_list("token__jti", "token__expires_at")
+        )
+        with self._lock:
+            self._expiry.update(rows)
+            self._since = max(self._since, next_since) if self._since is not None else next_since
+            self._synced_at = time.monotonic()
+        self.prune()
+
+    def reload(self) -> None:
+        next_since = self.next_since()
+        rows = list(
+            BlacklistedToken.objects.filter(token__expires_at__gt=aware_utcnow()).values_list(
+                "token__jti", "token__expires_at"
+            )
+        )
+        with self._lock:
+            self._expiry = dict(rows)
+            self._since = next_since
+            self._synced_at = self._reloaded_at = time.monotonic()
+
+    def prune(self) -> None:
+        now = aware_utcnow()
+        with self._lock:
+            expired = [jti for jti, expires_at in self._expiry.items() if expires_at <= now]
+            for jti in expired:
+                del self._expiry[jti]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._expiry.clear()
+            self._since = None
+            self._synced_at = self._reloaded_at = float("-inf")
+
+
+blacklist_cache = BlacklistCache()
+
+
+class CachedBlacklistRefreshToken(RefreshToken):
+    """Refresh token whose blacklist check reads ``blacklist_cache`` instead of the tables."""
+
+    def check_blacklist(self) -> None:
+        if blacklist_cache.contains(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError(_("Token is blacklisted"))
+
+    def blacklist(self) -> BlacklistedToken:
+        result = super().blacklist()
+        blacklist_cache.add(self.payload[api_settings.JTI_CLAIM], datetime_from_epoch(self.payload["exp"]))
+        return result
+
+
+class CachedBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    token_class = CachedBlacklistRefreshToken
+
+
+def purge_expired_tokens(batch_size: int = 1000, pause: float = 0.05, max_batches: int | None = None) -> int:
+    """Delete expired outstanding tokens (and their blacklist rows) in short transactions.
+
+    Each batch locks at most ``batch_size`` rows, and ``pause`` seconds between
+    batches let login and refresh traffic through.  Returns the number of
+    outstanding tokens removed.
+    """
+
+    cutoff = aware_utcnow()
+    removed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        with transaction.atomic():
+            ids = list(
+                OutstandingToken.objects.filter(expires_at__lte=cutoff)
+                .order_by("expires_at")
+                .values_list("id", flat=True)[:batch_size]
+            )
+            if not ids:
+                break
+            BlacklistedToken.objects.filter(token_id__in=ids).delete()
+            OutstandingToken.objects.filter(id__in=ids).delete()
+        removed += len(ids)
+        batches += 1
+        if len(ids) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+    blacklist_cache.prune()
+    return removed
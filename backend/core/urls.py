@@ -1,20 +1,27 @@
 """URL patterns for the core app."""
-from django.urls import include, path
+from django.conf import settings
+from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 from rest_framework_simplejwt.views import TokenRefreshView
 
+from .async_views import AsyncReadView
 from .views import (
+    AdminJobViewSet,
     AdminPatientViewSet,
     AdminUserViewSet,
     AppointmentViewSet,
     CaseViewSet,
+    DashboardView,
+    DoctorScheduleViewSet,
     DoctorViewSet,
     LoginView,
     LogoutView,
+    MetricsView,
     PatientViewSet,
     PrescriptionViewSet,
     ProfileView,
     SignupView,
+    UploadSessionView,
 )
 
 router = DefaultRouter()
@@ -23,10 +30,12 @@ router.register("doctors", DoctorViewSet, basename="doctors")
 router.register("cases", CaseViewSet, basename="cases")
 router.register("prescriptions", PrescriptionViewSet, basename="prescriptions")
 router.register("appointments", AppointmentViewSet, basename="appointments")
+router.register("schedules", DoctorScheduleViewSet, basename="schedules")
 
 admin_router = DefaultRouter()
 admin_router.register("users", AdminUserViewSet, basename="admin-users")
 admin_router.register("patients", AdminPatientViewSet, basename="admin-patients")
+admin_router.register("jobs", AdminJobViewSet, basename="admin-jobs")
 
 urlpatterns = [
     path("auth/signup/", SignupView.as_view(), name="signup"),
@@ -34,6 +43,22 @@ urlpatterns = [
     path("auth/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
     path("auth/logout/", LogoutView.as_view(), name="logout"),
     path("auth/me/", ProfileView.as_view(), name="profile"),
+    path("admin/metrics/", MetricsView.as_view(), name="metrics"),
+    path("dashboard/", DashboardView.as_view(), name="dashboard"),
+    path("uploads/<uuid:pk>/", UploadSessionView.as_view(), name="upload-session"),
     path("", include(router.urls)),
     path("admin/", include(admin_router.urls)),
 ]
+
+if settings.ASYNC_READ_VIEWS:
+    # List/detail GETs of the record routes answered on the event loop.  The
+    # router's routes behind them keep the URL names, format-suffixed URLs and
+    # list-level actions (the detail pattern only takes numeric ids).
+    urlpatterns = [
+        route
+        for prefix, viewset, _basename in router.registry
+        for route in (
+            path(f"{prefix}/", AsyncReadView.as_view(viewset)),
+            re_path(rf"^{prefix}/(?P<pk>\d+)/$", AsyncReadView.as_view(viewset, detail=True)),
+        )
+    ] + urlpatterns
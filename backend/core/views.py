@@ -1,29 +1,71 @@
 """REST API views for authentication and medical records."""
 from __future__ import annotations
 
+import uuid
+from datetime import timedelta
+from typing import Callable, NamedTuple
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Q
-from rest_framework import generics, status, viewsets
-from rest_framework.exceptions import PermissionDenied
-from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Prefetch, Q, QuerySet
+from django.shortcuts import get_object_or_404
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import generics, mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ParseError, PermissionDenied, ValidationError
+from rest_framework.permissions import SAFE_METHODS, AllowAny, IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from rest_framework.views import APIView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
-from rest_framework_simplejwt.tokens import RefreshToken
-
-from .models import Appointment, Case, Doctor, Patient, Prescription, User
+from rest_framework_simplejwt.views import TokenObtainPairView
+
+from . import attachments, caching, exports, imports, jobs, metrics, scheduling
+from .access import doctor_case_ids, doctor_prescription_ids
+from .conditional import ConditionalGetMixin
+from .models import (
+    Appointment,
+    Case,
+    CaseAccess,
+    Doctor,
+    DoctorSchedule,
+    Job,
+    Patient,
+    Prescription,
+    UploadSession,
+    User,
+)
 from .permissions import IsAdmin, PatientAccessPermission
+from .replicas import ReplicaReadMixin, StickyWritesMixin, read_alias
+from .response_cache import ResponseCacheMixin
 from .serializers import (
     AdminUserDetailSerializer,
     AdminUserUpdateSerializer,
     AppointmentSerializer,
+    CaseAttachmentSerializer,
     CaseSerializer,
+    CaseSummarySerializer,
+    DoctorScheduleSerializer,
     DoctorSerializer,
+    JobSerializer,
+    PatientChartSerializer,
     PatientSerializer,
+    PrescriptionAttachmentSerializer,
     PrescriptionSerializer,
     SignupSerializer,
+    SlotSearchSerializer,
+    SlotSerializer,
+    UploadSessionSerializer,
     UserSerializer,
+    doctor_label_sql,
 )
+from .sync import DeltaSyncMixin, initial_cursor
+from .tokens import CachedBlacklistRefreshToken
 
 User = get_user_model()
 
@@ -61,7 +103,7 @@ class LogoutView(generics.GenericAPIView):
         if not refresh_token:
             return Response({"detail": "Refresh token missing."}, status=status.HTTP_400_BAD_REQUEST)
         try:
-            token = RefreshToken(refresh_token)
+            token = CachedBlacklistRefreshToken(refresh_token)
             token.blacklist()
         except Exception as exc:  # noqa: PERF203 broad exception for token errors
             return Response({"detail": "Invalid token."}, status=status.HTTP_400_BAD_REQUEST)
@@ -78,21 +120,215 @@ class ProfileView(generics.RetrieveAPIView):
         return self.request.user
 
 
-class PatientViewSet(viewsets.ModelViewSet):
+class SparseFieldsetViewMixin:
+    """Forward ``?fields=``/``?expand=`` to the serializer and load only what it renders."""
+
+    # Fixed selection that replaces the query string, for views embedded in
+    # another response (see ``DashboardView``).
+    fieldset: dict | None = None
+
+    def get_fieldset_kwargs(self) -> dict:
+        if self.fieldset is not None:
+            return dict(self.fieldset)
+        request = getattr(self, "request", None)
+        if request is None or request.method not in SAFE_METHODS:
+            return {}
+        selection = {}
+        for param in ("fields", "expand"):
+            raw = request.query_params.get(param)
+            if raw:
+                selection[param] = [name.strip() for name in raw.split(",") if name.strip()]
+        return selection
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        optimize = getattr(self.get_serializer_class(), "optimize_queryset", None)
+        request = getattr(self, "request", None)
+        # A write's instance is re-rendered after save, when prefetches have
+        # been dropped and annotations may be stale; load it plain.
+        if optimize is None or (request is not None and request.method not in SAFE_METHODS):
+            return queryset
+        return optimize(queryset, **self.get_fieldset_kwargs())
+
+    def get_serializer(self, *args, **kwargs):
+        for key, value in self.get_fieldset_kwargs().items():
+            kwargs.setdefault(key, value)
+        return super().get_serializer(*args, **kwargs)
+
+    def list(self, request, *args, **kwargs):
+        queryset, represent = self.list_rows()
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(represent(page))
+        return Response(represent(list(queryset)))
+
+    def list_rows(self) -> tuple[QuerySet, Callable[[list], list]]:
+        """The list query and the function rendering its rows.
+
+        Serializers that opt in with ``values_fast_path`` get a ``.values()``
+        query whose dict rows they render directly, skipping model instances
+        and the per-field serializer machinery.
+        """
+
+        queryset = self.filter_queryset(self.get_queryset())
+        serializer = self.get_serializer()
+        plan = serializer.values_plan() if hasattr(serializer, "values_plan") else None
+        if plan is None:
+            return queryset, lambda rows: self.get_serializer(rows, many=True).data
+        # The paginator reads its keyset position from the ordering columns.
+        ordering = [name.lstrip("-") for name in queryset.model._meta.ordering if isinstance(name, str)]
+        keys = dict.fromkeys([*serializer.values_keys(plan), *ordering, "id"])
+        queryset = queryset.prefetch_related(None).values(*keys)
+        return queryset, lambda rows: serializer.represent_values(rows, plan)
+
+
+class AttachmentViewMixin:
+    """Resumable uploads to, and downloads of, the record's attachments.
+
+    Both actions resolve the record through the viewset's role-scoped queryset,
+    so whoever can see a case or prescription can read and add its attachments.
+    An upload starts here and its bytes then go to ``UploadSessionView``.
+    """
+
+    def get_attachment_owner(self):
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        owner = get_object_or_404(queryset, pk=self.kwargs["pk"])
+        self.check_object_permissions(self.request, owner)
+        return owner
+
+    @action(detail=True, methods=["post"], url_path="uploads", url_name="uploads")
+    def start_upload(self, request, *args, **kwargs):
+        owner = self.get_attachment_owner()
+        serializer = UploadSessionSerializer(data=request.data, context=self.get_serializer_context())
+        serializer.is_valid(raise_exception=True)
+        serializer.save(**{owner._meta.model_name: owner}, created_by=request.user)
+        return Response(serializer.data, status=status.HTTP_201_CREATED, headers={"Location": serializer.data["upload_url"]})
+
+    @action(
+        detail=True,
+        methods=["get"],
+        url_path=r"attachments/(?P<attachment_id>\d+)/download",
+        url_name="attachment-download",
+    )
+    def download_attachment(self, request, *args, attachment_id=None, **kwargs):
+        owner = self.get_attachment_owner()
+        return attachments.serve_attachment(request, get_object_or_404(owner.attachments.select_related("blob"), pk=attachment_id))
+
+
+class UploadSessionView(StickyWritesMixin, APIView):
+    """Status (GET), next chunk (PUT) and cancellation (DELETE) of the caller's upload.
+
+    A PUT body is streamed to disk and may carry ``Content-Range: bytes
+    <start>-<end>/<size>``; without it the chunk continues at the current offset.
+    The chunk completing the file returns the new attachment with 201.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get_session(self) -> UploadSession:
+        return get_object_or_404(UploadSession, pk=self.kwargs["pk"], created_by=self.request.user)
+
+    def get(self, request, *args, **kwargs):
+        return Response(UploadSessionSerializer(self.get_session(), context={"request": request}).data)
+
+    def put(self, request, *args, **kwargs):
+        session = self.get_session()
+        start, length = attachments.chunk_bounds(request, session)
+        # Read the raw stream, never request.data, so the body is not buffered.
+        session = attachments.write_chunk(session, request.stream, start, length)
+        if session.received < session.size:
+            return Response(UploadSessionSerializer(session, context={"request": request}).data)
+        attachment = attachments.complete_upload(session)
+        serializer_class = CaseAttachmentSerializer if session.case_id else PrescriptionAttachmentSerializer
+        return Response(serializer_class(attachment, context={"request": request}).data, status=status.HTTP_201_CREATED)
+
+    def delete(self, request, *args, **kwargs):
+        attachments.discard_upload(self.get_session())
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class AdminJobViewSet(SparseFieldsetViewMixin, mixins.CreateModelMixin, viewsets.ReadOnlyModelViewSet):
+    """Inspect background jobs and queue registered ones (``manage.py run_jobs`` runs them)."""
+
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        params = self.request.query_params
+        if params.get("status"):
+            queryset = queryset.filter(status=params["status"].upper())
+        if params.get("name"):
+            queryset = queryset.filter(name=params["name"])
+        return queryset
+
+
+class MetricsView(APIView):
+    """Expose per-view request metrics in Prometheus text format."""
+
+    permission_classes = [IsAuthenticated, IsAdmin]
+
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.registry.render_prometheus(), content_type="text/plain; version=0.0.4")
+
+
+class PatientViewSet(
+    ReplicaReadMixin, DeltaSyncMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet
+):
     """CRUD endpoint for patient records with role-aware permissions."""
 
-    queryset = Patient.objects.select_related("attending_doctor", "created_by").all()
+    queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated, PatientAccessPermission]
 
     def perform_create(self, serializer: PatientSerializer) -> None:
+        serializer.save(created_by=self.get_creator())
+
+    def get_creator(self):
         if self.request.user.role == User.Role.ADMIN:
-            serializer.save(created_by=None)
-            return
+            return None
         receptionist_profile = getattr(self.request.user, "receptionist_profile", None)
         if receptionist_profile is None:
             raise PermissionDenied("Receptionist profile missing.")
-        serializer.save(created_by=receptionist_profile)
+        return receptionist_profile
+
+    @action(detail=False, methods=["post"], url_path="import", url_name="import")
+    def import_records(self, request, *args, **kwargs):
+        """Bulk-create patients from an uploaded CSV or NDJSON ``file``; see ``core.imports``."""
+
+        upload = request.FILES.get("file")
+        if upload is None:
+            raise ValidationError({"file": ["Upload a CSV or NDJSON file."]})
+        file_format = imports.detect_format(upload.name, upload.content_type)
+        if file_format is None:
+            raise ValidationError({"file": ["Expected a .csv, .ndjson or .jsonl file."]})
+        report = imports.ImportReport(error_limit=settings.PATIENT_IMPORT_ERROR_LIMIT)
+        try:
+            imports.import_patients(
+                upload, file_format, self.get_creator(), batch_size=settings.PATIENT_IMPORT_BATCH_SIZE, report=report
+            )
+        except imports.ImportFileError as exc:
+            raise ParseError(f"{exc} ({report.created} patients imported before it)")
+        return Response(report.as_dict())
+
+    @action(detail=True, methods=["get"], url_path="chart", url_name="chart")
+    def chart(self, request, *args, **kwargs):
+        """The patient with the cases (doctors, prescriptions, attachments) and appointments the user can see.
+
+        One query per relation, however many cases and prescriptions the patient has.
+        """
+
+        cases = CaseViewSet.visible_to(CaseSerializer.optimize_queryset(Case.objects.all()), request.user)
+        appointments = AppointmentViewSet.visible_to(
+            AppointmentSerializer.optimize_queryset(Appointment.objects.all()), request.user
+        )
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(
+            Prefetch("cases", cases), Prefetch("appointments", appointments)
+        )
+        patient = get_object_or_404(queryset, pk=self.kwargs["pk"])
+        self.check_object_permissions(request, patient)
+        return Response(PatientChartSerializer(patient, context=self.get_serializer_context()).data)
 
     def get_queryset(self):
         queryset = super().get_queryset()
@@ -110,11 +346,12 @@ class PatientViewSet(viewsets.ModelViewSet):
         return queryset.none()
 
 
-class AdminUserViewSet(viewsets.ModelViewSet):
+class AdminUserViewSet(StickyWritesMixin, ResponseCacheMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet):
     """Allow administrators to manage staff accounts."""
 
-    queryset = User.objects.all().select_related("doctor_profile", "receptionist_profile")
+    queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsAdmin]
+    response_cache_scopes = ("staff",)
 
     def get_serializer_class(self):
         if self.action in {"update", "partial_update"}:
@@ -141,44 +378,124 @@ class AdminUserViewSet(viewsets.ModelViewSet):
         return Response(data)
 
 
-class AdminPatientViewSet(viewsets.ModelViewSet):
+class AdminPatientViewSet(
+    ReplicaReadMixin, DeltaSyncMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet
+):
     """Admin access to all patient records."""
 
-    queryset = Patient.objects.select_related("attending_doctor", "created_by").all()
+    queryset = Patient.objects.all()
     serializer_class = PatientSerializer
     permission_classes = [IsAuthenticated, IsAdmin]
 
-
-class DoctorViewSet(viewsets.ReadOnlyModelViewSet):
+    @action(detail=False, methods=["get", "post"], url_path="export", url_name="export")
+    def export(self, request, *args, **kwargs):
+        """Stream complete patient bundles as NDJSON or CSV (``?type=``); see ``core.exports``.
+
+        ``?doctor=``/``?receptionist=`` limit it to what that user's patient list
+        shows, and ``?after=<patient id>`` resumes an interrupted export.  A POST
+        with the same parameters queues the export as a background job instead.
+        """
+
+        if request.method == "POST":
+            return self.queue_export(request)
+        params = exports.ExportParamsSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        options = params.validated_data
+        file_format = options.pop("type")
+        queryset = exports.patients_to_export(**options)
+        # The replica alias is reset when the view returns, before the body is read.
+        alias = read_alias.get()
+        if alias is not None:
+            queryset = queryset.using(alias)
+        pieces = exports.export(queryset, file_format, chunk_size=settings.PATIENT_EXPORT_CHUNK_SIZE)
+        if isinstance(request._request, ASGIRequest):
+            pieces = exports.aiterate(pieces)
+        response = StreamingHttpResponse(pieces, content_type=exports.FORMATS[file_format])
+        filename = f"patients-{timezone.now():%Y%m%d-%H%M%S}.{file_format}"
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+    def queue_export(self, request) -> Response:
+        """202 with the ``export_patients`` job; its file is at ``Location`` once the job is done."""
+
+        params = exports.ExportParamsSerializer(data=request.data)
+        params.is_valid(raise_exception=True)
+        filename = f"patients-{timezone.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex}.{params.validated_data['type']}"
+        job = jobs.enqueue("export_patients", {"path": f"exports/{filename}", **params.data})
+        response = Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+        response["Location"] = reverse("admin-patients-export-file", kwargs={"filename": filename})
+        return response
+
+    @action(detail=False, methods=["get"], url_path=r"export/(?P<filename>[\w-]+\.\w+)", url_name="export-file")
+    def export_file(self, request, *args, filename=None, **kwargs):
+        """The file of a queued export, or 409 with its job until the job is done."""
+
+        # Named by file rather than job id: the job row is only saved when the queuing request commits.
+        job = get_object_or_404(Job, name="export_patients", payload__path=f"exports/{filename}")
+        if job.status != Job.Status.DONE:
+            return Response(JobSerializer(job).data, status=status.HTTP_409_CONFLICT)
+        return FileResponse(
+            default_storage.open(job.payload["path"]),
+            as_attachment=True,
+            filename=filename,
+            content_type=exports.FORMATS[job.payload["type"]],
+        )
+
+
+class DoctorViewSet(ResponseCacheMixin, SparseFieldsetViewMixin, viewsets.ReadOnlyModelViewSet):
     """Expose doctor roster for receptionist assignments."""
 
-    queryset = Doctor.objects.select_related("user").all()
+    queryset = Doctor.objects.all()
     serializer_class = DoctorSerializer
     permission_classes = [IsAuthenticated]
+    response_cache_scopes = ("staff",)
+
 
+class DoctorScheduleViewSet(SparseFieldsetViewMixin, viewsets.ModelViewSet):
+    """Doctors' weekly working hours; everyone can read them, administrators maintain them."""
 
-class CaseViewSet(viewsets.ModelViewSet):
+    queryset = DoctorSchedule.objects.all()
+    serializer_class = DoctorScheduleSerializer
+
+    def get_permissions(self):
+        if self.request.method in SAFE_METHODS:
+            return [IsAuthenticated()]
+        return [IsAuthenticated(), IsAdmin()]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        doctor = self.request.query_params.get("doctor")
+        if doctor and doctor.isdigit():
+            queryset = queryset.filter(doctor_id=doctor)
+        return queryset
+
+
+class CaseViewSet(
+    ReplicaReadMixin, AttachmentViewMixin, DeltaSyncMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet
+):
     """Manage medical cases with role sensitive access rules."""
 
-    queryset = (
-        Case.objects.select_related("patient", "created_by__user")
-        .prefetch_related("assigned_doctors__user", "attachments", "prescriptions__attachments")
-        .all()
-    )
+    queryset = Case.objects.all()
     serializer_class = CaseSerializer
     permission_classes = [IsAuthenticated]
+    etag_related = ("patient__updated_at",)
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return CaseSummarySerializer
+        return CaseSerializer
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
+        return self.visible_to(super().get_queryset(), self.request.user)
+
+    @staticmethod
+    def visible_to(queryset: QuerySet, user: User) -> QuerySet:
         if user.role == User.Role.ADMIN:
             return queryset
         if user.role == User.Role.DOCTOR:
             doctor_profile = getattr(user, "doctor_profile", None)
             if doctor_profile:
-                return queryset.filter(
-                    Q(assigned_doctors=doctor_profile) | Q(patient__attending_doctor=doctor_profile)
-                ).distinct()
+                return queryset.filter(id__in=doctor_case_ids(doctor_profile))
             return queryset.none()
         if user.role == User.Role.RECEPTIONIST:
             receptionist_profile = getattr(user, "receptionist_profile", None)
@@ -207,8 +524,7 @@ class CaseViewSet(viewsets.ModelViewSet):
             doctor_profile = getattr(user, "doctor_profile", None)
             if doctor_profile is None:
                 raise PermissionDenied("Doctor profile missing.")
-            assigned_doctors = serializer.instance.assigned_doctors.all()
-            if doctor_profile not in assigned_doctors and serializer.instance.patient.attending_doctor != doctor_profile:
+            if not CaseAccess.objects.filter(doctor=doctor_profile, case=serializer.instance).exists():
                 raise PermissionDenied("You are not assigned to this case.")
             if "assigned_doctors" in serializer.validated_data:
                 incoming = {doc.id for doc in serializer.validated_data["assigned_doctors"]}
@@ -226,14 +542,12 @@ class CaseViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
-class PrescriptionViewSet(viewsets.ModelViewSet):
+class PrescriptionViewSet(
+    ReplicaReadMixin, AttachmentViewMixin, DeltaSyncMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet
+):
     """Manage prescriptions associated with cases."""
 
-    queryset = (
-        Prescription.objects.select_related("case", "doctor__user", "patient")
-        .prefetch_related("attachments")
-        .all()
-    )
+    queryset = Prescription.objects.all()
     serializer_class = PrescriptionSerializer
     permission_classes = [IsAuthenticated]
 
@@ -245,7 +559,7 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
         if user.role == User.Role.DOCTOR:
             doctor_profile = getattr(user, "doctor_profile", None)
             if doctor_profile:
-                return queryset.filter(Q(doctor=doctor_profile) | Q(case__assigned_doctors=doctor_profile)).distinct()
+                return queryset.filter(id__in=doctor_prescription_ids(doctor_profile))
             return queryset.none()
         if user.role == User.Role.RECEPTIONIST:
             receptionist_profile = getattr(user, "receptionist_profile", None)
@@ -255,8 +569,8 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
 
     def perform_create(self, serializer: PrescriptionSerializer) -> None:
         user = self.request.user
-        doctor_profile = getattr(user, "doctor_profile", None)
         if user.role == User.Role.DOCTOR:
+            doctor_profile = getattr(user, "doctor_profile", None)
             if doctor_profile is None:
                 raise PermissionDenied("Doctor profile missing.")
             serializer.save(doctor=doctor_profile)
@@ -278,11 +592,12 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
             doctor_profile = getattr(user, "doctor_profile", None)
             if doctor_profile is None:
                 raise PermissionDenied("Doctor profile missing.")
-            if doctor_profile != serializer.instance.doctor:
+            if doctor_profile.pk != serializer.instance.doctor_id:
                 raise PermissionDenied("You did not author this prescription.")
-            if "case" in serializer.validated_data and serializer.validated_data["case"] != serializer.instance.case:
+            if "case" in serializer.validated_data and serializer.validated_data["case"].pk != serializer.instance.case_id:
                 raise PermissionDenied("Case cannot be reassigned by doctors.")
-            if "patient" in serializer.validated_data and serializer.validated_data["patient"] != serializer.instance.patient:
+            patient = serializer.validated_data.get("patient")
+            if patient is not None and patient.pk != serializer.instance.patient_id:
                 raise PermissionDenied("Patient cannot be changed by doctors.")
             serializer.save(doctor=doctor_profile)
             return
@@ -295,19 +610,21 @@ class PrescriptionViewSet(viewsets.ModelViewSet):
         instance.delete()
 
 
-class AppointmentViewSet(viewsets.ModelViewSet):
+class AppointmentViewSet(
+    ReplicaReadMixin, DeltaSyncMixin, ConditionalGetMixin, SparseFieldsetViewMixin, viewsets.ModelViewSet
+):
     """Manage appointments with role-aware permissions."""
 
-    queryset = (
-        Appointment.objects.select_related("patient", "case", "doctor__user", "created_by__user")
-        .all()
-    )
+    queryset = Appointment.objects.all()
     serializer_class = AppointmentSerializer
     permission_classes = [IsAuthenticated]
+    etag_related = ("patient__updated_at", "case__updated_at")
 
     def get_queryset(self):
-        queryset = super().get_queryset()
-        user = self.request.user
+        return self.visible_to(super().get_queryset(), self.request.user)
+
+    @staticmethod
+    def visible_to(queryset: QuerySet, user: User) -> QuerySet:
         if user.role == User.Role.ADMIN:
             return queryset
         if user.role == User.Role.DOCTOR:
@@ -358,3 +675,119 @@ class AppointmentViewSet(viewsets.ModelViewSet):
             raise PermissionDenied("Only administrators or receptionists can delete appointments.")
         instance.delete()
 
+    @action(detail=False, methods=["get"], url_path="slots", url_name="slots")
+    def slots(self, request):
+        """The earliest free slots in the working hours of the matching doctors (see ``core.scheduling``)."""
+
+        params = SlotSearchSerializer(
+            data={**request.query_params.dict(), "doctor": request.query_params.getlist("doctor")}
+        )
+        params.is_valid(raise_exception=True)
+        search = params.validated_data
+        schedules = DoctorSchedule.objects.all()
+        if search.get("specialty"):
+            schedules = schedules.filter(doctor__specialty__iexact=search["specialty"])
+        if search.get("doctor"):
+            schedules = schedules.filter(doctor_id__in=search["doctor"])
+        found = scheduling.free_slots(
+            schedules, search["start"], search["end"], timedelta(minutes=search["duration"]), search["limit"]
+        )
+        names = dict(
+            Doctor.objects.filter(pk__in={slot.doctor_id for slot in found})
+            .annotate(label=doctor_label_sql())
+            .values_list("pk", "label")
+        )
+        rows = [{**slot._asdict(), "doctor_name": names[slot.doctor_id]} for slot in found]
+        return Response(SlotSerializer(rows, many=True).data)
+
+
+class DashboardSection(NamedTuple):
+    name: str
+    viewset: type
+    url_name: str
+    fieldset: dict
+    aggregates: dict
+
+
+# Per role, the lists its dashboard shows.  Every section costs one aggregate
+# query plus its first page, however many rows the user can see.
+DASHBOARD_SECTIONS = {
+    User.Role.DOCTOR: [
+        DashboardSection(
+            "appointments",
+            AppointmentViewSet,
+            "appointments-list",
+            {},
+            {"appointments_pending": Count("pk", filter=Q(status="PENDING"))},
+        ),
+        DashboardSection("cases", CaseViewSet, "cases-list", {"expand": ["symptoms"]}, {}),
+        DashboardSection("patients", PatientViewSet, "patients-list", {}, {}),
+    ],
+    User.Role.RECEPTIONIST: [
+        DashboardSection("cases", CaseViewSet, "cases-list", {}, {}),
+        DashboardSection("patients", PatientViewSet, "patients-list", {}, {}),
+        DashboardSection("doctors", DoctorViewSet, "doctors-list", {}, {}),
+    ],
+    User.Role.ADMIN: [
+        DashboardSection("users", AdminUserViewSet, "admin-users-list", {}, {}),
+        DashboardSection("patients", AdminPatientViewSet, "admin-patients-list", {}, {}),
+        DashboardSection("doctors", DoctorViewSet, "doctors-list", {}, {}),
+    ],
+}
+
+# Cache scopes (see ``core.caching``) each dashboard reads.
+DASHBOARD_SCOPES = {
+    User.Role.DOCTOR: ("appointments", "cases", "patients"),
+    User.Role.RECEPTIONIST: ("cases", "patients", "staff"),
+    User.Role.ADMIN: ("patients", "staff"),
+}
+
+
+class DashboardView(APIView):
+    """Counts and the first page of every list on the caller's dashboard, in one response.
+
+    Sections reuse the list viewsets, so scoping and representation match the
+    list endpoints and each ``next`` link continues on them.  Payloads are cached
+    per user for ``DASHBOARD_CACHE_TTL`` seconds and dropped on relevant writes.
+    """
+
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, *args, **kwargs):
+        role = request.user.role
+        sections = DASHBOARD_SECTIONS.get(role)
+        if sections is None:
+            raise PermissionDenied("No dashboard for this role.")
+        page_size = request.query_params.get("page_size", "")
+        key = caching.versioned_key("dashboard", DASHBOARD_SCOPES[role], request.user.pk, page_size)
+        data = cache.get(key)
+        if data is None:
+            data = self.build(request, sections)
+            cache.set(key, data, settings.DASHBOARD_CACHE_TTL)
+        return Response(data)
+
+    def build(self, request, sections: list[DashboardSection]) -> dict:
+        # Starting point for ``?updated_since=`` polling of every section.
+        data = {"counts": {}, "sync_cursor": initial_cursor()}
+        for section in sections:
+            view = section.viewset(
+                action="list", request=request, format_kwarg=None, args=(), kwargs={}, fieldset=section.fieldset
+            )
+            queryset = view.get_queryset()
+            data["counts"].update(queryset.order_by().aggregate(**{section.name: Count("pk")}, **section.aggregates))
+
+            paginator = view.paginator
+            page = paginator.paginate_queryset(queryset, request, view=view)
+            # Continue on the section's own list endpoint with the same selection.
+            params = {param: ",".join(names) for param, names in section.fieldset.items()}
+            if request.query_params.get("page_size"):
+                params["page_size"] = request.query_params["page_size"]
+            base_url = request.build_absolute_uri(reverse(section.url_name))
+            for param, value in params.items():
+                base_url = replace_query_param(base_url, param, value)
+            paginator.base_url = base_url
+            data[section.name] = {
+                "results": list(view.get_serializer(page, many=True).data),
+                "next": paginator.get_next_link(),
+            }
+        return data
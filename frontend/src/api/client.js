@@ -42,4 +42,25 @@ client.interceptors.response.use(
   }
 );
 
+// List endpoints are cursor paginated and wrap rows in `results`.
+export const pageResults = (data) => (Array.isArray(data) ? data : data.results);
+
+// Rows of the page at `next` and every page after it (`next` links are absolute URLs).
+export const remainingPages = async (next) => {
+  const rows = [];
+  while (next) {
+    const { data } = await client.get(next);
+    rows.push(...pageResults(data));
+    next = Array.isArray(data) ? null : data.next;
+  }
+  return rows;
+};
+
+// Every row of a list endpoint, following `next` until the last page.
+export const allPages = async (url, params = {}) => {
+  const { data } = await client.get(url, { params });
+  if (Array.isArray(data)) return data;
+  return [...data.results, ...(await remainingPages(data.next))];
+};
+
 export default client;
@@ -4,10 +4,8 @@ import {
   adminCreateUser,
   adminDeletePatient,
   adminDeleteUser,
-  adminListPatients,
-  adminListUsers,
-  listDoctors,
 } from "../utils/authApi.js";
+import { getDashboard, loadRemainingRows } from "../utils/dashboardApi.js";
 
 const initialUserForm = {
   username: "",
@@ -41,14 +39,16 @@ const AdminDashboard = () => {
   useEffect(() => {
     const bootstrap = async () => {
       try {
-        const [userData, patientData, doctorData] = await Promise.all([
-          adminListUsers(),
-          adminListPatients(),
-          listDoctors(),
+        const dashboard = await getDashboard();
+        setUsers(dashboard.users.results);
+        setPatients(dashboard.patients.results);
+        setDoctors(dashboard.doctors.results);
+        setLoading(false);
+        await Promise.all([
+          loadRemainingRows(dashboard.users, setUsers),
+          loadRemainingRows(dashboard.patients, setPatients),
+          loadRemainingRows(dashboard.doctors, setDoctors),
         ]);
-        setUsers(userData);
-        setPatients(patientData);
-        setDoctors(doctorData);
       } catch (error) {
         console.error("Admin bootstrap failed", error);
         setStatusMessage("Unable to load admin data. Please refresh.");
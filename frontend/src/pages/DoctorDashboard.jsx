@@ -1,8 +1,12 @@
-import { useEffect, useMemo, useState } from "react";
+import { useEffect, useMemo, useRef, useState } from "react";
 import { useAuth } from "../state/AuthContext.jsx";
-import { listPatients, updatePatient } from "../utils/authApi.js";
-import { listCases, retrieveCase, updateCase } from "../utils/caseApi.js";
-import { listAppointments, updateAppointment } from "../utils/appointmentApi.js";
+import { retrievePatientChart, updatePatient } from "../utils/authApi.js";
+import { retrieveCase, updateCase } from "../utils/caseApi.js";
+import { updateAppointment } from "../utils/appointmentApi.js";
+import { getDashboard, loadRemainingRows } from "../utils/dashboardApi.js";
+import { applyChanges, fetchChanges } from "../utils/syncApi.js";
+
+const SYNC_INTERVAL_MS = 30000;
 import { createPrescription, listPrescriptions } from "../utils/prescriptionApi.js";
 
 const DoctorDashboard = () => {
@@ -13,9 +17,12 @@ const DoctorDashboard = () => {
   const [appointments, setAppointments] = useState([]);
   const [cases, setCases] = useState([]);
   const [patients, setPatients] = useState([]);
+  const [counts, setCounts] = useState({});
+  const syncCursors = useRef(null);
 
   const [selectedCase, setSelectedCase] = useState(null);
   const [selectedPatient, setSelectedPatient] = useState(null);
+  const [patientChart, setPatientChart] = useState(null);
   const [caseDetailsOpen, setCaseDetailsOpen] = useState(false);
   const [patientDetailsOpen, setPatientDetailsOpen] = useState(false);
 
@@ -40,14 +47,22 @@ const DoctorDashboard = () => {
   useEffect(() => {
     const bootstrap = async () => {
       try {
-        const [appointmentData, caseData, patientData] = await Promise.all([
-          listAppointments(),
-          listCases(),
-          listPatients(),
+        const dashboard = await getDashboard();
+        setAppointments(dashboard.appointments.results);
+        setCases(dashboard.cases.results);
+        setPatients(dashboard.patients.results);
+        setCounts(dashboard.counts);
+        syncCursors.current = {
+          appointments: dashboard.sync_cursor,
+          cases: dashboard.sync_cursor,
+          patients: dashboard.sync_cursor,
+        };
+        setLoading(false);
+        await Promise.all([
+          loadRemainingRows(dashboard.appointments, setAppointments),
+          loadRemainingRows(dashboard.cases, setCases),
+          loadRemainingRows(dashboard.patients, setPatients),
         ]);
-        setAppointments(appointmentData);
-        setCases(caseData);
-        setPatients(patientData);
       } catch (error) {
         console.error("Failed to load doctor dashboard", error);
         setErrorMessage("Unable to load dashboard data. Please refresh.");
@@ -58,6 +73,30 @@ const DoctorDashboard = () => {
     bootstrap();
   }, []);
 
+  useEffect(() => {
+    // Poll the delta feeds instead of refetching whole lists.
+    const feeds = [
+      ["appointments", setAppointments, {}],
+      ["cases", setCases, { expand: "symptoms" }],
+      ["patients", setPatients, {}],
+    ];
+    const timer = setInterval(async () => {
+      if (!syncCursors.current) return;
+      for (const [resource, setRows, params] of feeds) {
+        try {
+          const delta = await fetchChanges(resource, syncCursors.current[resource], params);
+          syncCursors.current[resource] = delta.cursor;
+          if (delta.changed.length || delta.deleted.length) {
+            setRows((current) => applyChanges(current, delta));
+          }
+        } catch (error) {
+          console.error(`Failed to sync ${resource}`, error);
+        }
+      }
+    }, SYNC_INTERVAL_MS);
+    return () => clearInterval(timer);
+  }, []);
+
   const resetMessages = () => {
     setStatusMessage(null);
     setErrorMessage(null);
@@ -96,10 +135,10 @@ const DoctorDashboard = () => {
     });
   }, [appointments, searchQuery]);
 
-  const openCaseDetails = async (caseId) => {
+  const openCaseDetails = async (caseId, loaded = null) => {
     try {
       resetMessages();
-      const caseData = await retrieveCase(caseId);
+      const caseData = loaded ?? (await retrieveCase(caseId));
       setSelectedCase(caseData);
       setCaseFormData({
         name: caseData.name || "",
@@ -121,23 +160,36 @@ const DoctorDashboard = () => {
     setCaseFormData({ name: "", description: "", symptoms: "", details: "" });
   };
 
-  const openPatientDetails = (patientId) => {
+  const openPatientDetails = async (patientId) => {
     const patient = patients.find((p) => p.id === patientId);
     if (!patient) return;
     setSelectedPatient(patient);
+    setPatientChart(null);
     setPatientEditForm({
       first_name: patient.first_name,
       last_name: patient.last_name,
       date_of_birth: patient.date_of_birth,
     });
     setPatientDetailsOpen(true);
+    try {
+      setPatientChart(await retrievePatientChart(patientId));
+    } catch (error) {
+      console.error("Failed to load patient chart", error);
+      setErrorMessage("Unable to load the patient's cases and appointments.");
+    }
   };
 
   const closePatientDetails = () => {
     setSelectedPatient(null);
+    setPatientChart(null);
     setPatientDetailsOpen(false);
   };
 
+  const openChartCase = (caseData) => {
+    closePatientDetails();
+    openCaseDetails(caseData.id, caseData);
+  };
+
   const handleCaseFormChange = (event) => {
     const { name, value } = event.target;
     setCaseFormData((current) => ({ ...current, [name]: value }));
@@ -202,8 +254,13 @@ const DoctorDashboard = () => {
   const handleAppointmentStatusChange = async (appointmentId, newStatus) => {
     resetMessages();
     try {
+      const previous = appointments.find((apt) => apt.id === appointmentId);
       const updated = await updateAppointment(appointmentId, { status: newStatus });
       setAppointments((current) => current.map((apt) => (apt.id === updated.id ? updated : apt)));
+      const pendingDelta = (updated.status === "PENDING") - (previous?.status === "PENDING");
+      if (pendingDelta) {
+        setCounts((current) => ({ ...current, appointments_pending: current.appointments_pending + pendingDelta }));
+      }
       setStatusMessage("Appointment status updated.");
     } catch (error) {
       console.error("Failed to update appointment", error);
@@ -216,9 +273,9 @@ const DoctorDashboard = () => {
   }
 
   const stats = [
-    { label: "Appointments", value: appointments.filter((apt) => apt.status === "PENDING").length, hint: "Pending" },
-    { label: "Active Cases", value: cases.length, hint: "Assigned to you" },
-    { label: "My Patients", value: patients.length, hint: "Under your care" },
+    { label: "Appointments", value: counts.appointments_pending ?? 0, hint: "Pending" },
+    { label: "Active Cases", value: counts.cases ?? cases.length, hint: "Assigned to you" },
+    { label: "My Patients", value: counts.patients ?? patients.length, hint: "Under your care" },
   ];
 
   return (
@@ -444,6 +501,42 @@ const DoctorDashboard = () => {
                   <button type="submit" className="btn btn-primary">Update Patient</button>
                 </div>
               </form>
+              <div className="modal-section">
+                <h3>Cases</h3>
+                {!patientChart ? (
+                  <p>Loading chart...</p>
+                ) : patientChart.cases.length === 0 ? (
+                  <p>No cases on record.</p>
+                ) : (
+                  <ul className="prescription-list">
+                    {patientChart.cases.map((caseItem) => (
+                      <li key={caseItem.id} className="prescription-item">
+                        <strong>{caseItem.case_number}</strong> {caseItem.name}
+                        <p>{caseItem.assigned_doctor_names.join(", ") || "No doctors assigned"}</p>
+                        <small>
+                          {caseItem.prescriptions.length} prescription(s), {caseItem.attachments.length} attachment(s)
+                        </small>
+                        <button type="button" className="btn btn-ghost btn-sm" onClick={() => openChartCase(caseItem)}>Open Case</button>
+                      </li>
+                    ))}
+                  </ul>
+                )}
+              </div>
+
+              {patientChart && patientChart.appointments.length > 0 && (
+                <div className="modal-section">
+                  <h3>Appointments</h3>
+                  <ul className="prescription-list">
+                    {patientChart.appointments.map((apt) => (
+                      <li key={apt.id} className="prescription-item">
+                        <strong>{apt.appointment_number}</strong> {apt.case_name}
+                        <p>{apt.scheduled_at ? new Date(apt.scheduled_at).toLocaleString() : "Not scheduled"} · {apt.status}</p>
+                      </li>
+                    ))}
+                  </ul>
+                </div>
+              )}
+
               <div className="case-metadata">
                 <p><strong>Patient ID:</strong> {selectedPatient.id}</p>
                 <p><strong>Registered:</strong> {new Date(selectedPatient.created_at).toLocaleString()}</p>
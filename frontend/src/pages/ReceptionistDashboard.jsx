@@ -1,6 +1,7 @@
 import { useEffect, useMemo, useState } from "react";
-import { createPatient, listDoctors, listPatients, updatePatient } from "../utils/authApi.js";
-import { createCase, listCases } from "../utils/caseApi.js";
+import { createPatient, updatePatient } from "../utils/authApi.js";
+import { createCase } from "../utils/caseApi.js";
+import { getDashboard, loadRemainingRows } from "../utils/dashboardApi.js";
 
 const defaultPatientForm = {
   first_name: "",
@@ -18,6 +19,7 @@ const ReceptionistDashboard = () => {
   const [cases, setCases] = useState([]);
   const [patients, setPatients] = useState([]);
   const [doctors, setDoctors] = useState([]);
+  const [counts, setCounts] = useState({});
   const [loading, setLoading] = useState(true);
 
   const [caseSearch, setCaseSearch] = useState("");
@@ -41,14 +43,17 @@ const ReceptionistDashboard = () => {
   useEffect(() => {
     const bootstrap = async () => {
       try {
-        const [caseData, patientData, doctorData] = await Promise.all([
-          listCases(),
-          listPatients(),
-          listDoctors(),
+        const dashboard = await getDashboard();
+        setCases(dashboard.cases.results);
+        setPatients(dashboard.patients.results);
+        setDoctors(dashboard.doctors.results);
+        setCounts(dashboard.counts);
+        setLoading(false);
+        await Promise.all([
+          loadRemainingRows(dashboard.cases, setCases),
+          loadRemainingRows(dashboard.patients, setPatients),
+          loadRemainingRows(dashboard.doctors, setDoctors),
         ]);
-        setCases(caseData);
-        setPatients(patientData);
-        setDoctors(doctorData);
       } catch (error) {
         console.error("Failed to load receptionist dashboard", error);
         setErrorMessage("Unable to load dashboard data. Please refresh.");
@@ -141,21 +146,21 @@ const ReceptionistDashboard = () => {
     () => [
       {
         label: "Active cases",
-        value: cases.length,
+        value: counts.cases ?? cases.length,
         hint: "Cases awaiting doctor intake.",
       },
       {
         label: "Registered patients",
-        value: patients.length,
+        value: counts.patients ?? patients.length,
         hint: "Profiles created by your desk.",
       },
       {
         label: "Available doctors",
-        value: doctors.length,
+        value: counts.doctors ?? doctors.length,
         hint: "Doctors ready for assignments.",
       },
     ],
-    [cases.length, patients.length, doctors.length],
+    [counts, cases.length, patients.length, doctors.length],
   );
 
   const selectedPatient = selectedPatientId
@@ -201,6 +206,7 @@ const ReceptionistDashboard = () => {
       }
       const created = await createCase(payload);
       setCases((current) => [created, ...current]);
+      setCounts((current) => ({ ...current, cases: (current.cases ?? 0) + 1 }));
       closeCaseForm();
       setStatusMessage(`Case ${created.case_number} created.`);
     } catch (error) {
@@ -223,6 +229,7 @@ const ReceptionistDashboard = () => {
       };
       const created = await createPatient(payload);
       setPatients((current) => [...current, created]);
+      setCounts((current) => ({ ...current, patients: (current.patients ?? 0) + 1 }));
       closePatientForm();
       setSelectedPatientId(String(created.id));
       setStatusMessage("Patient registered and selected for the case.");
@@ -1,8 +1,7 @@
-import client from "../api/client.js";
+import client, { allPages } from "../api/client.js";
 
 export const listAppointments = async (params = {}) => {
-  const { data } = await client.get("appointments/", { params });
-  return data;
+  return allPages("appointments/", params);
 };
 
 export const retrieveAppointment = async (appointmentId) => {
@@ -23,3 +22,14 @@ export const updateAppointment = async (appointmentId, payload) => {
 export const deleteAppointment = async (appointmentId) => {
   await client.delete(`appointments/${appointmentId}/`);
 };
+
+// Earliest free slots: { specialty, doctor: [ids], start, end, duration, limit }.
+export const findFreeSlots = async ({ doctor = [], ...params } = {}) => {
+  const query = new URLSearchParams();
+  Object.entries(params).forEach(([key, value]) => {
+    if (value !== undefined && value !== null && value !== "") query.append(key, value);
+  });
+  doctor.forEach((id) => query.append("doctor", id));
+  const { data } = await client.get("appointments/slots/", { params: query });
+  return data;
+};
@@ -0,0 +1,36 @@
+import client from "../api/client.js";
+
+const CHUNK_SIZE = 8 * 1024 * 1024;
+
+// Upload `file` to a case or prescription ("cases" / "prescriptions") in
+// resumable chunks. Pass the `session` from an interrupted attempt to continue
+// from the last byte the server stored. Resolves with the new attachment.
+export const uploadAttachment = async (resource, id, file, { label = "", session, onProgress } = {}) => {
+  const { data: current } = session
+    ? await client.get(session.upload_url)
+    : await client.post(`${resource}/${id}/uploads/`, {
+        filename: file.name,
+        size: file.size,
+        label,
+        content_type: file.type,
+      });
+  let offset = current.offset;
+  for (;;) {
+    const end = Math.min(offset + CHUNK_SIZE, file.size);
+    const { status, data } = await client.put(current.upload_url, file.slice(offset, end), {
+      headers: {
+        "Content-Type": "application/octet-stream",
+        "Content-Range": `bytes ${offset}-${end - 1}/${file.size}`,
+      },
+    });
+    onProgress?.(end / file.size, current);
+    if (status === 201) return data;
+    offset = data.offset;
+  }
+};
+
+// Attachment `file` URLs need the bearer token, so fetch them as a Blob.
+export const downloadAttachment = async (attachment) => {
+  const { data } = await client.get(attachment.file, { responseType: "blob" });
+  return data;
+};
@@ -1,4 +1,4 @@
-import client from "../api/client.js";
+import client, { allPages } from "../api/client.js";
 import { clearTokens, getTokens, setTokens } from "./tokenStorage.js";
 
 export const signup = async (payload) => {
@@ -30,8 +30,7 @@ export const getProfile = async () => {
 };
 
 export const listPatients = async () => {
-  const { data } = await client.get("patients/");
-  return data;
+  return allPages("patients/");
 };
 
 export const createPatient = async (payload) => {
@@ -44,14 +43,18 @@ export const updatePatient = async (patientId, payload) => {
   return data;
 };
 
-export const listDoctors = async () => {
-  const { data } = await client.get("doctors/");
+// The patient with their cases (doctors, prescriptions, attachments) and appointments in one request.
+export const retrievePatientChart = async (patientId) => {
+  const { data } = await client.get(`patients/${patientId}/chart/`);
   return data;
 };
 
+export const listDoctors = async () => {
+  return allPages("doctors/");
+};
+
 export const adminListUsers = async () => {
-  const { data } = await client.get("admin/users/");
-  return data;
+  return allPages("admin/users/");
 };
 
 export const adminCreateUser = async (payload) => {
@@ -69,8 +72,7 @@ export const adminDeleteUser = async (userId) => {
 };
 
 export const adminListPatients = async () => {
-  const { data } = await client.get("admin/patients/");
-  return data;
+  return allPages("admin/patients/");
 };
 
 export const adminCreatePatient = async (payload) => {
@@ -1,8 +1,7 @@
-import client from "../api/client.js";
+import client, { allPages } from "../api/client.js";
 
 export const listCases = async (params = {}) => {
-  const { data } = await client.get("cases/", { params });
-  return data;
+  return allPages("cases/", params);
 };
 
 export const retrieveCase = async (caseId) => {
@@ -0,0 +1,18 @@
+import client, { remainingPages } from "../api/client.js";
+
+// Counts plus the first page of every list on the caller's role dashboard.
+export const getDashboard = async (params = {}) => {
+  const { data } = await client.get("dashboard/", { params });
+  return data;
+};
+
+// Append the pages after a dashboard section's first one, skipping rows already present
+// (created locally or delivered by delta sync in the meantime).
+export const loadRemainingRows = async (section, setRows) => {
+  if (!section?.next) return;
+  const rows = await remainingPages(section.next);
+  setRows((current) => {
+    const seen = new Set(current.map((row) => row.id));
+    return [...current, ...rows.filter((row) => !seen.has(row.id))];
+  });
+};
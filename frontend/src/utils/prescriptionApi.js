@@ -1,8 +1,7 @@
-import client from "../api/client.js";
+import client, { allPages } from "../api/client.js";
 
 export const listPrescriptions = async (params = {}) => {
-  const { data } = await client.get("prescriptions/", { params });
-  return data;
+  return allPages("prescriptions/", params);
 };
 
 export const retrievePrescription = async (prescriptionId) => {
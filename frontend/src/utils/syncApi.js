@@ -0,0 +1,30 @@
+import client from "../api/client.js";
+
+// Rows changed and ids removed since `cursor`, following `has_more` until caught up.
+export const fetchChanges = async (resource, cursor, params = {}) => {
+  const changed = [];
+  const deleted = [];
+  let next = cursor;
+  for (;;) {
+    const { data } = await client.get(`${resource}/`, { params: { ...params, updated_since: next } });
+    changed.push(...data.results);
+    deleted.push(...data.deleted);
+    next = data.cursor;
+    if (!data.has_more) break;
+  }
+  return { changed, deleted, cursor: next };
+};
+
+// Merge a delta into rows held in state. A tombstone only evicts a row that was
+// not updated after it (access can be revoked and granted again in one window).
+export const applyChanges = (rows, { changed, deleted }) => {
+  const byId = new Map(rows.map((row) => [row.id, row]));
+  changed.forEach((row) => byId.set(row.id, row));
+  deleted.forEach(({ id, deleted_at: deletedAt }) => {
+    const row = byId.get(id);
+    if (row && !(new Date(row.updated_at) > new Date(deletedAt))) {
+      byId.delete(id);
+    }
+  });
+  return Array.from(byId.values());
+};